@@ -0,0 +1,61 @@
+# Records per second of one rule program run over many records: with run
+# for each record, and with Program.run_batch, in the calling thread and on
+# a pool of threads. With the GIL the threads don't make it faster, they
+# should on a free-threaded build of CPython. Run with:
+# PYTHONPATH=. python benchmarks/batch.py
+import random
+import time
+
+from cyan.interpreter import run
+from cyan.program import compile
+
+N = 20_000
+
+CODE = """fun discount(total) { if total > 500 then total * 0.9 else total }
+fun tax(total, country) { if country == "DE" then total * 1.19 else total }
+let total = tax(discount(price * quantity), country)
+let flagged = total > 2000 or quantity > 40
+"""
+
+random.seed(1)
+records = [
+    {
+        "price": random.randint(1, 100),
+        "quantity": random.randint(1, 50),
+        "country": random.choice(["DE", "FR", "US"]),
+    }
+    for _ in range(N)
+]
+
+
+def with_run(records):
+    for record in records:
+        bindings = "".join(
+            f"let {name} = {value!r}\n" for name, value in record.items()
+        )
+        _, error = run("<rule>", bindings.replace("'", '"') + CODE)
+        assert error is None, error
+
+
+program = compile(CODE, opt_level=2)
+
+
+def with_batch(records, workers):
+    for _, error in program.run_batch(records, result="flagged", workers=workers):
+        assert error is None, error
+
+
+flagged = sum(value for value, _ in program.run_batch(records, result="flagged"))
+print(f"{flagged} of {N} records flagged")
+for name, runs, count in (
+    ("run() per record", lambda: with_run(records[:1000]), 1000),
+    ("run_batch", lambda: with_batch(records, 0), N),
+    ("run_batch, 2 workers", lambda: with_batch(records, 2), N),
+    ("run_batch, 4 workers", lambda: with_batch(records, 4), N),
+):
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        runs()
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:22} {count / best:8.0f} records/s")
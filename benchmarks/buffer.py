@@ -0,0 +1,37 @@
+# Gives a Cyan program a bytearray of 1 MiB up to 1 GiB through a native
+# function, then indexes, slices and sums part of it. The Buffer is a view
+# of the bytearray, so time and memory allocated should stay the same
+# whatever the size (best of 3 runs), run with:
+# PYTHONPATH=. python benchmarks/buffer.py
+import time
+import tracemalloc
+
+from cyan.ffi import native
+from cyan.interpreter import run
+
+payload = bytearray()
+
+
+@native(name="payload")
+def get_payload():
+    return payload
+
+
+CODE = """let b = payload()
+let rest = b[1:]
+out(len(b), b[0], b[-1], len(rest), sum(rest[-1000:]))
+"""
+
+for size in (1 << 20, 1 << 24, 1 << 28, 1 << 30):
+    payload = bytearray(size)
+    payload[-1] = 7
+    best = float("inf")
+    for _ in range(3):
+        tracemalloc.start()
+        start = time.perf_counter()
+        _, error = run("<buffer>", CODE)
+        best = min(best, time.perf_counter() - start)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert error is None, error
+    print(f"{size >> 20:5} MiB: {best * 1000:.2f} ms, {peak / 1024:.1f} KiB allocated")
@@ -0,0 +1,34 @@
+# Time of a call in a loop to a native function registered with
+# cyan.ffi.native, next to a builtin, a Cyan function and the loop alone.
+# A native call should cost about as much as a builtin one, run with:
+# PYTHONPATH=. python benchmarks/native.py
+import math
+import time
+
+from cyan.ffi import native
+from cyan.interpreter import run
+
+N = 200_000
+
+
+@native(pure=True)
+def hypot(x: float, y: float) -> float:
+    return math.hypot(x, y)
+
+
+LOOP = """fun norm(x, y) {{ (x * x + y * y) ** 0.5 }}
+let s = 0
+for i in 0..{n} {{
+    let s = {body}
+}}
+"""
+
+for body in ("i", "Num(i)", "hypot(i, 1)", "norm(i, 1)"):
+    code = LOOP.format(n=N, body=body)
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        _, error = run("<native>", code)
+        best = min(best, time.perf_counter() - start)
+        assert error is None, error
+    print(f"{body:12} {best / N * 1e6:.2f} us per iteration")
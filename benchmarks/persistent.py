@@ -0,0 +1,88 @@
+# Cost of one update of a PersistentVector and a PersistentHashMap of n
+# items, for n from 1000 to 1000000: the nodes it copies, and the time it
+# takes with the cyclic GC off and on. The nodes copied only grow with the
+# depth of the trie, log32 n. With the GC on the time grows with n, as each
+# collection scans all of the nodes kept alive, not only the new ones. Run
+# with: PYTHONPATH=. python benchmarks/persistent.py
+import gc
+import random
+import time
+from functools import partial
+
+import cyan.persistent as persistent
+from cyan.persistent import PersistentHashMap, PersistentVector
+
+UPDATES = 100_000
+
+copied = 0
+
+
+def counting(function):
+    """function, counting the nodes it returns in copied"""
+    def count_copy(*args):
+        global copied
+        copied += 1
+        return function(*args)
+    return count_copy
+
+
+def nodes_copied(update, keys):
+    """Nodes copied by update of each key, on average"""
+    global copied
+    persistent.set_in = counting(set_in)
+    persistent.assoc_in = counting(assoc_in)
+    copied = 0
+    try:
+        for key in keys:
+            update(key)
+    finally:
+        persistent.set_in = set_in
+        persistent.assoc_in = assoc_in
+    return copied / len(keys)
+
+
+def time_per_update(update, keys, collect):
+    """Time of an update of each key, on average, in microseconds"""
+    if not collect:
+        gc.disable()
+    try:
+        start = time.perf_counter()
+        for key in keys:
+            update(key)
+        return (time.perf_counter() - start) / len(keys) * 1e6
+    finally:
+        gc.enable()
+
+
+def set_item(versions, key):
+    versions.append(versions[-1].set(key, -key))
+
+
+def assoc_key(versions, key):
+    versions.append(versions[-1].assoc(key, -key))
+
+
+set_in = persistent.set_in
+assoc_in = persistent.assoc_in
+random.seed(1)
+print(f"{'':12}{'nodes copied':>14}{'us, GC off':>12}{'us, GC on':>11}")
+for n in (1_000, 10_000, 100_000, 1_000_000):
+    vector = PersistentVector.from_iterable(range(n))
+    hash_map = PersistentHashMap.from_items((i, i) for i in range(n))
+    keys = [random.randrange(n) for _ in range(UPDATES)]
+
+    # every version is kept, like the persistent.cyan benchmark does
+    for name, structure, update in (
+        ("PVector", vector, set_item),
+        ("PMap", hash_map, assoc_key),
+    ):
+        results = []
+        for measure in (
+            lambda update: nodes_copied(update, keys[:1000]),
+            lambda update: time_per_update(update, keys, False),
+            lambda update: time_per_update(update, keys, True),
+        ):
+            # the versions of the last measure are let go first
+            versions = [structure]
+            results.append(measure(partial(update, versions)))
+        print(f"{name:8}{n:>8}{results[0]:10.2f}{results[1]:12.2f}{results[2]:11.2f}")
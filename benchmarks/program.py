@@ -0,0 +1,67 @@
+# Latency of running a small program many times: from its code each time
+# with run, and compiled once with cyan.program.compile, then run in one
+# Session or in a new Session each time. Run with:
+# PYTHONPATH=. python benchmarks/program.py
+import io
+import time
+
+from cyan.interpreter import run
+from cyan.program import Session, compile
+
+N = 2000
+
+CODE = """struct Order { price, quantity, country }
+fun discount(order) {
+    if order.price * order.quantity > 100 then 0.1 else 0
+}
+fun tax(order) {
+    if order.country == "DE" then 0.19 else if order.country == "FR" then 0.2 else 0
+}
+let order = Order(price, quantity, country)
+let total = order.price * order.quantity
+let total = total - total * discount(order)
+let total = total + total * tax(order)
+if len(findall("[A-Z]", order.country)) != 2 then out("bad country") else 0
+"""
+BINDINGS = 'let price = 12\nlet quantity = 10\nlet country = "DE"\n'
+
+
+def best_of(runs, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        runs()
+        best = min(best, time.perf_counter() - start)
+    return best / N * 1e6
+
+
+def from_code():
+    for _ in range(N):
+        run("<program>", BINDINGS + CODE)
+
+
+program = compile(CODE)
+variables = {"price": 12, "quantity": 10, "country": "DE"}
+
+
+def one_session():
+    session = Session(stdout=io.StringIO(), variables=variables)
+    for _ in range(N):
+        program.run(session)
+
+
+def new_sessions():
+    for _ in range(N):
+        program.run(Session(stdout=io.StringIO(), variables=variables))
+
+
+session = Session(variables=variables)
+_, error = program.run(session)
+assert error is None, error
+print(f"total {session.get('total')}")
+for name, runs in (
+    ("run(code)", from_code),
+    ("Program, one Session", one_session),
+    ("Program, new Sessions", new_sessions),
+):
+    print(f"{name:22} {best_of(runs):.1f} us per run")
@@ -0,0 +1,90 @@
+# Programs run concurrently in Sessions built on one frozen base Session.
+# First a stress test: many runs on a thread pool, each checking that it
+# only saw its own globals, input and output. Then the throughput for 1 to
+# 8 threads. With the GIL it stays about flat, it should grow with the
+# threads on a free-threaded build of CPython. Run with:
+# PYTHONPATH=. python benchmarks/threads.py
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cyan.program import Session, compile
+
+RUNS = 2000
+
+PRELUDE = """struct Item { name, price }
+let RATE = 0.25
+memo fun fee(price) { price * RATE }
+"""
+
+CODE = """let total = 0
+let item = Item(inp(), n)
+for i in 0..n {
+    let total = total + fee(item.price) + i
+}
+out(item.name, total)
+"""
+
+base = Session()
+_, error = base.run(PRELUDE)
+assert error is None, error
+base.freeze()
+program = compile(CODE)
+
+
+def expected_total(n):
+    return sum(n * 0.25 + i for i in range(n))
+
+
+def run_one(k, capture=True):
+    n = k % 100
+    output = io.StringIO() if capture else None
+    session = Session(output, io.StringIO(f"item{k}\n"), {"n": n}, base=base)
+    _, error = program.run(session)
+    assert error is None, error
+    total = session.get("total")
+    assert total == expected_total(n), (n, total)
+    if capture:
+        assert output.getvalue() == f"item{k} {total}\n", output.getvalue()
+
+
+def stress(threads):
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(run_one, range(RUNS)))
+    # nothing was set in the base
+    assert base.get("RATE") == 0.25
+    for name in ("total", "item", "n"):
+        try:
+            base.get(name)
+        except KeyError:
+            continue
+        raise AssertionError(f"{name} leaked into the base Session")
+
+
+def stress_stdout(threads):
+    """Output of every thread to the process stdout, no line is mixed up"""
+    real_stdout, sys.stdout = sys.stdout, io.StringIO()
+    try:
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(run_one, range(RUNS), [False] * RUNS))
+        lines = sys.stdout.getvalue().splitlines()
+    finally:
+        sys.stdout = real_stdout
+    assert sorted(lines) == sorted(
+        f"item{k} {expected_total(k % 100)}" for k in range(RUNS)
+    )
+
+
+stress(8)
+stress_stdout(8)
+print(f"stress test: {2 * RUNS} runs on 8 threads ok")
+
+for threads in (1, 2, 4, 8):
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(run_one, [20] * RUNS))
+        best = min(best, time.perf_counter() - start)
+    print(f"{threads} threads  {RUNS / best:8.0f} runs/s")
@@ -0,0 +1,84 @@
+# Checks that Vectors and Buffers give the same results with NumPy and
+# with array.array, including integers near 64 bits, Buffers of small
+# integers, inf and nan, then times sum and dot with each. Needs NumPy, run with:
+# PYTHONPATH=. python benchmarks/vector_backends.py
+import array
+import io
+import time
+
+import cyan.vector
+from cyan.ffi import native
+from cyan.program import Session, compile
+
+CASES = """let v = Vector([3000000000, 5, 7])
+out(v * v * v, sum(v * v))
+out(v / 0, 0 / Vector([0, 1]))
+out(Vector([2]) ** 62, Vector([2]) ** 63)
+out(sum(Vector([9223372036854775807, 1])))
+out(dot(Vector([3037000500, 1]), Vector([3037000500, 1])))
+out(dot(buffer("B", [200, 200, 200]), buffer("B", [200, 200, 200])))
+out(sum(buffer("B", [200, 200, 200])), mean(buffer("B", [200, 255])))
+out(sum(buffer("b", [-128, -128])), dot(buffer("b", [-128]), buffer("b", [-128])))
+out(sum(buffer("Q", [18446744073709551615, 1])), max(buffer("h", [-5, 300])))
+out(dot(buffer("h", [30000, 30000]), buffer("h", [30000, 30000])))
+out(Vector([1, 2]) ** -1, Vector([4, 9]) / 2, 10 - Vector([1, 2]), Vector([1, 2]) > 1)
+let inf = Num("inf")
+out(Vector([inf, 1.0]) - inf, Vector([inf, 0.0]) / inf, Vector([inf]) * 0)
+out(Vector([Num("1e308")]) * 10)
+out(Vector([0.0, 1.0]) / 0)
+out(Vector([10.0]) ** 400)
+out(Vector([0.0]) ** -1)
+out(Vector([-8.0]) ** 0.5)
+out(sum(Vector([inf, 0 - inf])), mean(Vector([inf, 0 - inf])), dot(Vector([inf]), Vector([0.0])))
+out(min(Vector([1.0, Num("nan")])), max(buffer("d", [Num("nan"), 1.0])))
+"""
+
+N = 1_000_000
+TIMED = "sum(big()) + dot(big(), big()) + sum(Vector(big()))"
+
+
+@native
+def buffer(kind: str, values: list):
+    return array.array(kind, values)
+
+
+@native
+def big():
+    return bytearray(range(256)) * (N // 256)
+
+
+def run_lines(code):
+    """Output of each line of code, or its error"""
+    output = io.StringIO()
+    session = Session(stdout=output)
+    for line in code.splitlines():
+        _, error = compile(line).run(session)
+        if error is not None:
+            output.write(f"error: {error.info}\n")
+    return output.getvalue()
+
+
+def time_it(code):
+    program = compile(code)
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        value, error = program.run(Session())
+        best = min(best, time.perf_counter() - start)
+        assert error is None, error
+    return value, best
+
+
+assert cyan.vector.numpy is not None, "NumPy isn't installed"
+results = {}
+for backend in ("numpy", "array"):
+    if backend == "array":
+        cyan.vector.numpy = None
+    results[backend] = run_lines(CASES), time_it(TIMED)
+
+print(results["numpy"][0], end="")
+assert results["numpy"][0] == results["array"][0], results["array"][0]
+assert results["numpy"][1][0] == results["array"][1][0]
+print("both backends agree")
+for backend, (_, (value, seconds)) in results.items():
+    print(f"{backend:6} sum, dot and Vector of {N} bytes: {seconds * 1000:.1f} ms")
@@ -3,9 +3,10 @@ import sys
 
 from cyan import __version__
 from cyan.interpreter import run, run_debug
+from cyan.utils import Printer
 
 
-def shell(debug_mode=False):
+def shell(debug_mode=False, opt_level=0):
     print(f"Cyan {__version__} shell on {sys.platform}", end=" ")
 
     if debug_mode:
@@ -26,7 +27,7 @@ def shell(debug_mode=False):
         if text.lstrip() == "":
             continue
 
-        result, error = _run_fn("<stdin>", text)
+        result, error = _run_fn("<stdin>", text, opt_level)
 
         if error:
             print(error)
@@ -34,14 +35,14 @@ def shell(debug_mode=False):
             print(result)
 
 
-def run_file(filename: str, debug_mode: bool):
+def run_file(filename: str, debug_mode: bool, opt_level: int = 0):
     with open(filename) as file:
         src = file.read()
 
     if debug_mode:
-        res = run_debug(filename, src)
+        res = run_debug(filename, src, opt_level)
     else:
-        res = run(filename, src)
+        res = run(filename, src, opt_level)
 
     result, error = res
 
@@ -52,19 +53,37 @@ def run_file(filename: str, debug_mode: bool):
 def main():
     """
     -d
+    -O[level]
+    -b<size>
     --version
     --help
     file
     """
     debug = False
+    opt_level = 0
     argv = sys.argv[1:]
 
     if "-d" in argv:
         debug = True
         argv.remove("-d")
 
+    for arg in argv[:]:
+        if arg.startswith("-O"):
+            level = arg[2:] or "1"
+            if not level.isdigit():
+                print(f"Invalid optimization level: {arg}")
+                sys.exit(1)
+            opt_level = int(level)
+            argv.remove(arg)
+        elif arg.startswith("-b"):
+            if not arg[2:].isdigit():
+                print(f"Invalid output buffer size: {arg}")
+                sys.exit(1)
+            Printer.buffer_size = int(arg[2:])
+            argv.remove(arg)
+
     if not argv:
-        shell(debug_mode=debug)
+        shell(debug_mode=debug, opt_level=opt_level)
 
     if "--version" in argv:
         print(__version__)
@@ -76,11 +95,13 @@ def main():
         print(f"    --version    See Cyan version")
         print(f"    --help       See this message")
         print(f"    -d           Enable debug mode")
+        print(f"    -O[level]    Optimize the code before running, -O is -O1")
+        print(f"    -b<size>     Buffer up to size characters of output, -b0 for none")
         sys.exit(0)
 
     for arg in argv:
         if os.path.exists(arg):
-            run_file(arg, debug_mode=debug)
+            run_file(arg, debug_mode=debug, opt_level=opt_level)
 
 
 if __name__ == "__main__":
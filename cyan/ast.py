@@ -5,8 +5,10 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+from cyan.types import InlineCache
+
 if TYPE_CHECKING:
-    from typing import Optional, TypeVar
+    from typing import Callable, Optional, TypeVar
     from cyan.tokens import Token
     from cyan.utils import Pos
 
@@ -19,14 +21,29 @@ __all__ = (
     "NumberNode",
     "LiteralNode",
     "StringNode",
+    "ListNode",
+    "MapNode",
     "BinOpNode",
     "UnaryOpNode",
     "VarAccessNode",
     "VarAssignNode",
     "IfBlockNode",
     "WhileNode",
+    "ForNode",
+    "ForEachNode",
+    "YieldNode",
     "FuncDefNode",
     "FuncCallNode",
+    "IndexNode",
+    "SliceNode",
+    "StructDefNode",
+    "FieldAccessNode",
+    "LoopInvariantNode",
+    "InductionNode",
+    "InlinedCallNode",
+    "iter_child_nodes",
+    "walk",
+    "yielding_nodes",
 )
 
 
@@ -90,11 +107,37 @@ class StringNode(Node):
         super().set_pos(tok.start_pos, tok.end_pos)
 
 
+class ListNode(Node):
+    def __init__(self, elements: list[Node], pos_start: Pos, pos_end: Pos):
+        self.elements = elements
+        super().set_pos(pos_start, pos_end)
+
+    def __repr__(self):
+        return f"[{', '.join(map(repr, self.elements))}]"
+
+
+class MapNode(Node):
+    def __init__(
+        self, keys: list[Node], values: list[Node], pos_start: Pos, pos_end: Pos
+    ):
+        # kept apart rather than as pairs, so walk() and passes see every node
+        self.keys = keys
+        self.values = values
+        super().set_pos(pos_start, pos_end)
+
+    def __repr__(self):
+        pairs = zip(self.keys, self.values)
+        return "{{{}}}".format(", ".join(f"{key}: {value}" for key, value in pairs))
+
+
 class BinOpNode(Node):
     def __init__(self, left: Node, oper: Optional[Token], right: Node):
         self.left = left
         self.oper = oper
         self.right = right
+        # set by type inference when both operands are known to be of a type
+        # the operation works on: (function of the raw values, result type)
+        self.fast: Optional[tuple[Callable, type]] = None
         super().set_pos(left.start_pos, right.end_pos)
 
     def __repr__(self):
@@ -105,6 +148,7 @@ class UnaryOpNode(Node):
     def __init__(self, oper: Optional[Token], node: Node):
         self.oper = oper
         self.node = node
+        self.fast: Optional[tuple[Callable, type]] = None  # see BinOpNode
         super().set_pos(oper.start_pos, node.end_pos)
 
     def __repr__(self):
@@ -114,6 +158,7 @@ class UnaryOpNode(Node):
 class VarAccessNode(Node):
     def __init__(self, var_name: Optional[Token]):
         self.var_name = var_name
+        self.cache = InlineCache()
         super().set_pos(var_name.start_pos, var_name.end_pos)
 
     def __repr__(self):
@@ -134,6 +179,8 @@ class IfBlockNode(Node):
     def __init__(self, case: tuple[Node, ...], else_expr: Node):
         self.case = case
         self.else_expr = else_expr
+        # the condition is known to be a value whose truth is bool(value)
+        self.plain_cond = False
         super().set_pos(case[0].start_pos)
 
     def __repr__(self):
@@ -144,17 +191,76 @@ class WhileNode(Node):
     def __init__(self, condition: Node, body: Node):
         self.condition = condition
         self.body = body
+        self.plain_cond = False  # see IfBlockNode
+        # names of values cached by LoopInvariantNode and InductionNode in this
+        # loop, they are forgotten every time the loop starts
+        self.hoisted: tuple[str, ...] = ()
         super().set_pos(condition.start_pos, body.end_pos)
 
     def __repr__(self):
         return f"(while {self.condition} do {self.body})"
 
 
+class ForNode(Node):
+    def __init__(
+        self,
+        var_name: Token,
+        start: Node,
+        end: Node,
+        step: Optional[Node],
+        body: Node,
+    ):
+        self.var_name = var_name
+        self.start = start
+        self.end = end
+        self.step = step
+        self.body = body
+        self.hoisted: tuple[str, ...] = ()  # see WhileNode
+        super().set_pos(var_name.start_pos, body.end_pos)
+
+    def __repr__(self):
+        step = f" step {self.step}" if self.step is not None else ""
+        return f"(for {self.var_name.value} in {self.start}..{self.end}{step} do {self.body})"
+
+
+class ForEachNode(Node):
+    def __init__(self, var_name: Token, iterable: Node, body: Node):
+        self.var_name = var_name
+        self.iterable = iterable
+        self.body = body
+        self.hoisted: tuple[str, ...] = ()  # see WhileNode
+        super().set_pos(var_name.start_pos, body.end_pos)
+
+    def __repr__(self):
+        return f"(for {self.var_name.value} in {self.iterable} do {self.body})"
+
+
+class YieldNode(Node):
+    def __init__(self, value: Node, pos_start: Pos):
+        self.value = value
+        super().set_pos(pos_start, value.end_pos)
+
+    def __repr__(self):
+        return f"(yield {self.value})"
+
+
 class FuncDefNode(Node):
     def __init__(self, name: str, parameters: list[Token], body: Node):
         self.name = name or "[lambda]"
         self.parameters = parameters
         self.body = body
+        # a leaf function defines no nested functions, so its scope can never
+        # be captured by a closure and may be recycled after each call
+        self.is_leaf = not any(isinstance(child, FuncDefNode) for child in walk(body))
+        # calling a generator gives a Sequence of the values it yields. Found
+        # before optimizing, as dropping an unreachable yield can't change it
+        self.is_generator = any(
+            isinstance(child, YieldNode) for child in walk(body, scope=True)
+        )
+        # ids of the nodes of body with a yield in them, once it is called
+        self.yielding: Optional[frozenset[int]] = None
+        # "explicit" for `memo fun`, "auto" if the optimizer found it worth it
+        self.memo: Optional[str] = None
 
 
 class FuncCallNode(Node):
@@ -164,3 +270,157 @@ class FuncCallNode(Node):
 
     def __repr__(self):
         return f"(FuncCall:{self.node_to_call})"
+
+
+class IndexNode(Node):
+    def __init__(self, node: Node, index: Node):
+        self.node = node
+        self.index = index
+
+    def __repr__(self):
+        return f"({self.node}[{self.index}])"
+
+
+class SliceNode(Node):
+    def __init__(self, node: Node, start: Optional[Node], end: Optional[Node]):
+        self.node = node
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        start = "" if self.start is None else self.start
+        end = "" if self.end is None else self.end
+        return f"({self.node}[{start}:{end}])"
+
+
+class StructDefNode(Node):
+    def __init__(self, name: str, fields: list[Token], pos_start: Pos, pos_end: Pos):
+        self.name = name
+        self.fields = fields
+        self.field_names = tuple(field.value for field in fields)
+        super().set_pos(pos_start, pos_end)
+
+    def __repr__(self):
+        return f"(struct {self.name} {{{', '.join(self.field_names)}}})"
+
+
+class FieldAccessNode(Node):
+    def __init__(self, node: Node, field: Token):
+        self.node = node
+        self.field = field
+        self.field_name: str = field.value
+        # slot of the field in the Records it's read from, found after parsing
+        # if every struct with the field has it in the same slot
+        self.index: Optional[int] = None
+        super().set_pos(node.start_pos, field.end_pos)
+
+    def __repr__(self):
+        return f"({self.node}.{self.field_name})"
+
+
+class LoopInvariantNode(Node):
+    """
+    Expression that has the same value in every iteration of a loop,
+    evaluated on first use and then kept as name in the scope of the loop.
+    It is only cached if all of callees are pure builtins and none of the
+    names it reads is a mutable object
+    """
+    def __init__(
+        self,
+        name: str,
+        node: Node,
+        callees: tuple[str, ...],
+        reads: tuple[str, ...] = (),
+    ):
+        self.name = name
+        self.node = node
+        self.callees = callees
+        self.reads = reads
+        super().set_pos(node.start_pos, node.end_pos)
+
+    def __repr__(self):
+        return f"(invariant {self.name}: {self.node})"
+
+
+class InductionNode(Node):
+    """
+    `var * factor` or `var ** 2` where var changes by step in each iteration
+    of a loop, updated from its previous value instead of being recomputed.
+    node is the original expression, evaluated when var is not an integer
+    """
+    def __init__(
+        self, name: str, var_name: str, step: int, factor: int, square: bool, node: Node
+    ):
+        self.name = name
+        self.var_name = var_name
+        self.step = step
+        self.factor = factor
+        self.square = square
+        self.node = node
+        super().set_pos(node.start_pos, node.end_pos)
+
+    def __repr__(self):
+        return f"(induction {self.name}: {self.node})"
+
+
+class InlinedCallNode(Node):
+    """
+    Call to the function name, with its body copied in place of the call.
+    The arguments are kept as arg_names in the scope of the call, and body
+    uses them instead of the parameters
+    """
+    def __init__(
+        self, name: str, arg_names: tuple[str, ...], arguments: list[Node], body: Node
+    ):
+        self.name = name
+        self.arg_names = arg_names
+        self.arguments = arguments
+        self.body = body
+
+    def __repr__(self):
+        return f"(inlined {self.name}: {self.body})"
+
+
+def iter_child_nodes(node: Node):
+    """Yield all direct child nodes of node"""
+    for value in vars(node).values():
+        if isinstance(value, Node):
+            yield value
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                if isinstance(item, Node):
+                    yield item
+
+
+def walk(node: Node, scope: bool = False):
+    """
+    Yield node and all of its descendants, in no specified order. With
+    scope, functions defined in node are yielded but not gone into
+    """
+    root = node
+    todo = [node]
+    while todo:
+        node = todo.pop()
+        if not (scope and isinstance(node, FuncDefNode) and node is not root):
+            todo.extend(iter_child_nodes(node))
+        yield node
+
+
+def yielding_nodes(body: Node) -> frozenset[int]:
+    """
+    ids of body and of the nodes in it that have a yield of the function
+    of body in them, not counting functions defined in it
+    """
+    found = set()
+
+    def visit(node: Node) -> bool:
+        has_yield = isinstance(node, YieldNode)
+        for child in iter_child_nodes(node):
+            if not isinstance(child, FuncDefNode) and visit(child):
+                has_yield = True
+        if has_yield:
+            found.add(id(node))
+        return has_yield
+
+    visit(body)
+    return frozenset(found)
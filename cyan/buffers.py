@@ -0,0 +1,82 @@
+"""Buffer, a view of the memory of a Python object that is never copied"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from cyan.types import Object, Number, Bool, index_value, slice_bounds
+
+if TYPE_CHECKING:
+    from typing import Any, Optional
+
+__all__ = ("Buffer",)
+
+# formats of the items of a buffer that can be read as Numbers (or Bools)
+FORMATS = frozenset("bBhHiIlLqQnNefd?")
+
+
+class Buffer(Object):
+    """
+    Flat view of the memory of an object supporting the buffer protocol,
+    like bytes, bytearray, array.array or a numpy array. Nothing is copied:
+    an item is read from the memory when it is indexed, and a slice is a
+    view of the same memory. The owner of the memory can change it, so it
+    is mutable
+    """
+    mutable = True
+
+    def __init__(self, value: memoryview):
+        super().__init__("Buffer")
+        self.value = value
+
+    @classmethod
+    def of(cls, obj: Any) -> Buffer:
+        """Buffer of obj, TypeError if it has no memory a Buffer can view"""
+        view = memoryview(obj)
+        if view.format not in FORMATS:
+            raise TypeError(f"a Buffer can't hold items of format '{view.format}'")
+        if view.ndim != 1:
+            if not view.c_contiguous or view.ndim == 0:
+                raise TypeError("a Buffer has to be of one C-contiguous block")
+            # rows one after the other, still the same memory
+            view = view.cast("B").cast(view.format)
+        return cls(view)
+
+    def __str__(self) -> str:
+        return f"<Buffer of {len(self.value)} '{self.value.format}'>"
+
+    def is_truthy(self) -> Bool:
+        return Bool(len(self.value))
+
+    def equals(self, other: Object) -> bool:
+        return type(other) is Buffer and self.value == other.value
+
+    # boolean operations
+    def compare_eq(self, other: Buffer):
+        if self.is_same_type(other):
+            return Bool(self.equals(other)).set_context(self.ctx), None
+        else:
+            return Object.compare_eq(self, other)
+
+    def compare_ne(self, other: Buffer):
+        if self.is_same_type(other):
+            return Bool(not self.equals(other)).set_context(self.ctx), None
+        else:
+            return Object.compare_ne(self, other)
+
+    # indexing
+    def get_index(self, index: Object):
+        idx, error = index_value(self, index)
+        if error is not None:
+            return None, error
+        box = Bool if self.value.format == "?" else Number
+        return box(self.value[idx]).set_context(self.ctx), None
+
+    def get_slice(self, start: Optional[Object], end: Optional[Object]):
+        bounds, error = slice_bounds(start, end)
+        if error is not None:
+            return None, error
+        return Buffer(self.value[bounds]).set_context(self.ctx), None
+
+    def iterate(self):
+        box = Bool if self.value.format == "?" else Number
+        return (box(item) for item in self.value), None
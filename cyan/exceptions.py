@@ -71,3 +71,22 @@ class InvalidCharacterError(Error):
 class InvalidSyntaxError(Error):
     def __init__(self, start_pos, end_pos, info=""):
         super().__init__("SyntaxError", start_pos, end_pos, info)
+
+
+class SequenceError(Exception):
+    """
+    Raised while taking the next item of a Sequence failed, as the item is
+    taken by Python's iteration which can't give back an RTResult
+    """
+
+    def __init__(self, error: RTError):
+        super().__init__(error.info)
+        self.error = error
+
+
+class CompileError(Exception):
+    """Raised by compile for code that can't be tokenized or parsed"""
+
+    def __init__(self, error: Error):
+        super().__init__(error.info)
+        self.error = error
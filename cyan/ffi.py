@@ -0,0 +1,315 @@
+"""
+Registering Python functions as builtins. Arguments are converted to
+Python values and the result back to a Cyan object, going by the type
+annotations of the function
+"""
+from __future__ import annotations
+
+import inspect
+from array import array
+from typing import TYPE_CHECKING, get_type_hints
+
+from cyan.buffers import Buffer
+from cyan.exceptions import RTError
+from cyan.interpreter import BUILTINS
+from cyan.types import (
+    Object,
+    Number,
+    String,
+    Bool,
+    NoneObj,
+    List,
+    Map,
+    PVector,
+    PMap,
+    Record,
+    BuiltInFunction,
+    CallSignature,
+    Context,
+    RTResult,
+)
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Optional
+    from cyan.types import SymbolMap
+
+__all__ = ("NativeFunction", "native", "to_cyan", "to_python")
+
+
+class ArgumentError(Exception):
+    """Raised for an argument that can't be given to a native function"""
+    def __init__(self, obj: Object, message: str):
+        super().__init__(message)
+        self.obj = obj
+
+
+def to_cyan(value: Any) -> Object:
+    """Cyan object of a Python value, objects are given as they are"""
+    box = BOXES.get(type(value))
+    if box is not None:
+        return box(value)
+    if isinstance(value, Object):
+        return value
+    if isinstance(value, (list, tuple)):
+        return List([to_cyan(item) for item in value])
+    if isinstance(value, dict):
+        map_obj = Map()
+        for key, item in value.items():
+            error = map_obj.set(to_cyan(key), to_cyan(item))
+            if error is not None:
+                raise TypeError(error.info)
+        return map_obj
+    if isinstance(value, bool):  # before int, bools are ints
+        return Bool(value)
+    if isinstance(value, (int, float)):
+        return Number(value)
+    if isinstance(value, str):
+        return String(value)
+    try:
+        # anything with memory of numbers, like a numpy array
+        return Buffer.of(value)
+    except TypeError:
+        pass
+    raise TypeError(f"{type(value).__name__} can't be given to Cyan")
+
+
+# exact type -> Cyan object of a value of it, the fast path of to_cyan
+BOXES: dict[type, Callable[[Any], Object]] = {
+    int: Number,
+    float: Number,
+    str: String,
+    bool: Bool,
+    type(None): lambda _: NoneObj(),
+    # their memory is viewed, not copied
+    bytes: Buffer.of,
+    bytearray: Buffer.of,
+    memoryview: Buffer.of,
+    array: Buffer.of,
+}
+
+
+def to_python(obj: Object) -> Any:
+    """Python value of a Cyan object, objects with no such value are given as is"""
+    kind = type(obj)
+    if kind is Number or kind is String:
+        return obj.value
+    if kind is Bool:
+        return bool(obj.value)
+    if kind is NoneObj:
+        return None
+    if kind is List or kind is PVector:
+        return [to_python(item) for item in obj.iterate()[0]]
+    if kind is Map or kind is PMap:
+        return {to_python(key): to_python(value) for key, value in obj.entries()}
+    if kind is Record:
+        return tuple(to_python(item) for item in obj.value)
+    if kind is Buffer:
+        return obj.value
+    return obj
+
+
+def unbox_int(obj: Object) -> int:
+    if type(obj) is Number and type(obj.value) is int:
+        return obj.value
+    raise ArgumentError(obj, f"an integer, not {obj}")
+
+
+def unbox_float(obj: Object) -> float:
+    if type(obj) is Number:
+        return float(obj.value)
+    raise ArgumentError(obj, f"a Number, not {obj.type_name}")
+
+
+def unbox_str(obj: Object) -> str:
+    if type(obj) is String:
+        return obj.value
+    raise ArgumentError(obj, f"a String, not {obj.type_name}")
+
+
+def unbox_bool(obj: Object) -> bool:
+    if type(obj) is Bool:
+        return bool(obj.value)
+    raise ArgumentError(obj, f"a Bool, not {obj.type_name}")
+
+
+def unbox_list(obj: Object) -> list:
+    if isinstance(obj, (List, PVector)):
+        return to_python(obj)
+    raise ArgumentError(obj, f"a List, not {obj.type_name}")
+
+
+def unbox_dict(obj: Object) -> dict:
+    if isinstance(obj, (Map, PMap)):
+        return to_python(obj)
+    raise ArgumentError(obj, f"a Map, not {obj.type_name}")
+
+
+def unbox_memoryview(obj: Object) -> memoryview:
+    if type(obj) is Buffer:
+        return obj.value
+    raise ArgumentError(obj, f"a Buffer, not {obj.type_name}")
+
+
+# annotation of a parameter -> function giving the Python value of an argument
+UNBOXES: dict[Any, Callable[[Object], Any]] = {
+    int: unbox_int,
+    float: unbox_float,
+    str: unbox_str,
+    bool: unbox_bool,
+    list: unbox_list,
+    dict: unbox_dict,
+    memoryview: unbox_memoryview,
+}
+
+
+def unboxer(annotation: Any) -> Callable[[Object], Any]:
+    unbox = UNBOXES.get(annotation)
+    if unbox is not None:
+        return unbox
+    if isinstance(annotation, type) and issubclass(annotation, Object):
+        # the Cyan object itself, of that type
+        def expect(obj: Object) -> Object:
+            if isinstance(obj, annotation):
+                return obj
+            raise ArgumentError(obj, f"a {annotation.__name__}, not {obj.type_name}")
+
+        return expect
+    return to_python  # not annotated, or not a type with a fast path
+
+
+class NativeFunction(BuiltInFunction):
+    """
+    Builtin made of a Python function, see native. It's arguments are
+    converted to Python values before it is called, and the value it gives
+    back is converted to a Cyan object
+    """
+    def __init__(
+        self,
+        name: str,
+        native_function: Callable,
+        unboxers: tuple[Callable[[Object], Any], ...],
+        rest: Optional[Callable[[Object], Any]] = None,
+        pure: bool = False,
+        n_optional: int = 0,
+    ):
+        n_params = float("inf") if rest is not None else len(unboxers)
+        super().__init__(
+            name,
+            self.call,
+            n_params,
+            pure,
+            CallSignature(
+                len(unboxers), variadic=rest is not None, n_optional=n_optional
+            ),
+        )
+        self.native_function = native_function
+        self.unboxers = unboxers
+        self.rest = rest  # of the arguments after them, if it takes *args
+        # the last n_optional parameters have defaults, see CallSignature
+
+    def __str__(self) -> str:
+        return f"<Native Function {self.name}>"
+
+    def copy(self) -> NativeFunction:
+        # nothing of it changes, only the position and context it's used in
+        copy = object.__new__(NativeFunction)
+        vars(copy).update(vars(self))
+        return copy
+
+    def equals(self, other: Object) -> bool:
+        return (
+            type(other) is NativeFunction
+            and self.native_function is other.native_function
+        )
+
+    def call(self, *args: Object) -> RTResult:
+        try:
+            values = [unbox(arg) for unbox, arg in zip(self.unboxers, args)]
+            if self.rest is not None:
+                values.extend(map(self.rest, args[len(self.unboxers):]))
+        except ArgumentError as error:
+            obj = error.obj
+            return RTResult().failure(
+                RTError(
+                    obj.start_pos,
+                    obj.end_pos,
+                    f"{self.name}() takes {error}",
+                    obj.ctx,
+                )
+            )
+        except Exception as error:  # like a List that holds itself
+            return self.failure(error)
+
+        try:
+            return RTResult().success(to_cyan(self.native_function(*values)))
+        except Exception as error:
+            return self.failure(error)
+
+    def failure(self, error: Exception) -> RTResult:
+        # the position is set to the call by the interpreter
+        return RTResult().failure(
+            RTError(
+                None,
+                None,
+                f"{type(error).__name__} in {self.name}(): {error}",
+                Context(self.name),
+            )
+        )
+
+
+def native(
+    function: Optional[Callable] = None,
+    *,
+    name: Optional[str] = None,
+    pure: bool = False,
+    symbols: Optional[SymbolMap] = None,
+):
+    """
+    Registers a Python function as the builtin name (its own name if not
+    given) in symbols, the builtins by default. It is given back as it
+    was, so it can be used as a decorator, with or without arguments:
+
+        @native(pure=True)
+        def hypot(x: float, y: float) -> float:
+            return math.hypot(x, y)
+
+    Parameters annotated int, float, str, bool, list, dict or memoryview
+    (of a Buffer) are given the Python value of the argument, and one
+    annotated with a Cyan object type is given the object itself. Other
+    parameters are given what to_python gives. Parameters with a default
+    value can be left out of a call. It can take any number of
+    arguments with *args. The value it returns is converted with to_cyan,
+    an exception it raises is a runtime error. pure is whether it has no
+    side effects and gives the same value for the same arguments, like the
+    builtins that are
+    """
+    def register(function: Callable) -> Callable:
+        hints = get_type_hints(function)
+        unboxers = []
+        rest = None
+        n_optional = 0
+        for param in inspect.signature(function).parameters.values():
+            if param.kind == param.VAR_POSITIONAL:
+                rest = unboxer(hints.get(param.name))
+            elif param.kind in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD):
+                unboxers.append(unboxer(hints.get(param.name)))
+                # only the last ones can have defaults
+                n_optional += param.default is not param.empty
+            elif param.default is param.empty:
+                raise TypeError(
+                    f"{function.__name__}: parameter '{param.name}' can't be given"
+                    " from Cyan, only positional parameters can"
+                )
+
+        builtin_name = name or function.__name__
+        (BUILTINS if symbols is None else symbols).set(
+            builtin_name,
+            NativeFunction(
+                builtin_name, function, tuple(unboxers), rest, pure, n_optional
+            ),
+        )
+        return function
+
+    if function is not None:
+        return register(function)
+    return register
@@ -0,0 +1,229 @@
+"""File, and builtins reading and writing files and the standard streams"""
+from __future__ import annotations
+
+import mmap
+import os
+import sys
+from typing import TYPE_CHECKING
+
+from cyan.exceptions import RTError
+from cyan.types import Object, Number, String, NoneObj, RTResult
+from cyan.utils import Printer
+
+if TYPE_CHECKING:
+    from typing import Optional, TextIO
+
+__all__ = (
+    "File",
+    "OutputStream",
+    "STDIN",
+    "STDOUT",
+    "open_file",
+    "expect_file",
+    "source_file",
+    "source_name",
+    "builtin_open",
+    "builtin_read",
+    "builtin_readn",
+    "builtin_write",
+    "builtin_close",
+)
+
+# files are read and written in blocks of this many bytes
+BUFFER_SIZE = 1024 * 1024
+# files at least this big are read whole through a memory map
+MMAP_MIN_SIZE = 4 * 1024 * 1024
+MODES = ("r", "w", "a")
+
+
+class OutputStream:
+    """Output of the program as a file to write to, it goes through Printer"""
+    __slots__ = ()
+    closed = False
+    write = staticmethod(Printer.output)
+
+
+OUTPUT = OutputStream()
+
+
+class File(Object):
+    """Open file, or one of the standard streams"""
+    mutable = True
+
+    def __init__(self, value: TextIO | OutputStream, name: str, mode: str = "r"):
+        super().__init__("File")
+        self.value = value
+        self.name = name
+        self.mode = mode
+
+    def __str__(self) -> str:
+        return f"<File {self.name}>"
+
+    def copy(self) -> File:
+        copy = File(self.value, self.name, self.mode)
+        copy.set_pos(self.start_pos, self.end_pos)
+        copy.set_context(self.ctx)
+        return copy
+
+    def equals(self, other: Object) -> bool:
+        return isinstance(other, File) and self.value is other.value
+
+    def is_standard(self) -> bool:
+        # the streams of a Session are named like the standard ones
+        return self.name in ("<stdin>", "<stdout>")
+
+
+STDIN = File(sys.stdin, "<stdin>")
+STDOUT = File(OUTPUT, "<stdout>", "w")
+
+
+def file_error(obj: Object, message: str) -> RTResult:
+    return RTResult().failure(RTError(obj.start_pos, obj.end_pos, message, obj.ctx))
+
+
+def open_file(
+    path: Object, mode: str = "r", newline: Optional[str] = None
+) -> tuple[Optional[TextIO], Optional[RTError]]:
+    """(file at path opened with a big buffer, None), else (None, error)"""
+    if not isinstance(path, String):
+        return None, RTError(
+            path.start_pos,
+            path.end_pos,
+            f"A file path has to be a String, not {path.type_name}",
+            path.ctx,
+        )
+    try:
+        file = open(
+            path.value, mode, buffering=BUFFER_SIZE, encoding="utf-8", newline=newline
+        )
+        return file, None
+    except OSError as error:
+        return None, RTError(
+            path.start_pos,
+            path.end_pos,
+            f"Can't open '{path.value}': {error.strerror}",
+            path.ctx,
+        )
+
+
+def expect_file(obj: Object, name: str, mode: str) -> Optional[RTResult]:
+    """Failed RTResult if obj isn't a File open for reading or writing"""
+    if not isinstance(obj, File):
+        return file_error(obj, f"{name}() takes a File, not {obj.type_name}")
+    if (mode == "r") != (obj.mode == "r"):
+        action = "read from" if mode == "r" else "write to"
+        return file_error(obj, f"Can't {action} {obj}, it's open for '{obj.mode}'")
+    if obj.value.closed:
+        return file_error(obj, f"{obj} is closed")
+    return None
+
+
+def source_file(
+    source: Object, name: str, newline: Optional[str] = None
+) -> tuple[Optional[TextIO], bool, Optional[RTError]]:
+    """
+    (file to read, whether to close it when done, None) for a File or a
+    path given to a builtin reading it, else (None, False, error)
+    """
+    if isinstance(source, File):
+        failed = expect_file(source, name, "r")
+        if failed is not None:
+            return None, False, failed.error
+        # a File stays open once it's read, it's closed by close()
+        return source.value, False, None
+
+    file, error = open_file(source, "r", newline)
+    return file, True, error
+
+
+def source_name(source: Object) -> str:
+    """How a File or a path given to a builtin reading it is named in errors"""
+    return str(source) if isinstance(source, File) else repr(source.value)
+
+
+def builtin_open(path: Object, mode: Object):
+    if not (isinstance(mode, String) and mode.value in MODES):
+        return file_error(mode, f"File mode has to be one of {', '.join(MODES)}")
+    file, error = open_file(path, mode.value)
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(File(file, repr(path.value), mode.value))
+
+
+def builtin_read(file: Object):
+    failed = expect_file(file, "read", "r")
+    if failed is not None:
+        return failed
+    if file.value is sys.stdin:
+        Printer.flush()
+
+    try:
+        text = read_mapped(file.value)
+        if text is None:
+            text = file.value.read()
+    except (OSError, UnicodeDecodeError) as error:
+        return file_error(file, f"Can't read {file}: {error}")
+    return RTResult().success(String(text))
+
+
+def read_mapped(file: TextIO) -> Optional[str]:
+    """
+    Whole text of a big file nothing was read from yet, decoded straight
+    from a memory map of it instead of copying it into a buffer first.
+    None if the file isn't one that can be mapped
+    """
+    if file is sys.stdin or not file.seekable() or file.tell() != 0:
+        return None
+    fileno = file.fileno()
+    if os.fstat(fileno).st_size < MMAP_MIN_SIZE:
+        return None
+
+    with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as mapped:
+        text = str(mapped, "utf-8")
+    file.seek(0, os.SEEK_END)
+    # mmap doesn't translate line breaks like the file would
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def builtin_readn(file: Object, count: Object):
+    failed = expect_file(file, "readn", "r")
+    if failed is not None:
+        return failed
+    if not (
+        isinstance(count, Number) and type(count.value) is int and count.value >= 0
+    ):
+        return file_error(count, f"readn() takes a count of at least 0, got {count}")
+    if file.value is sys.stdin:
+        Printer.flush()
+
+    try:
+        text = file.value.read(count.value)
+    except (OSError, UnicodeDecodeError) as error:
+        return file_error(file, f"Can't read {file}: {error}")
+    return RTResult().success(String(text))
+
+
+def builtin_write(file: Object, value: Object):
+    failed = expect_file(file, "write", "w")
+    if failed is not None:
+        return failed
+    text = value.value if isinstance(value, String) else str(value)
+    try:
+        file.value.write(text)
+    except OSError as error:
+        return file_error(file, f"Can't write to {file}: {error.strerror}")
+    return RTResult().success(NoneObj())
+
+
+def builtin_close(file: Object):
+    if not isinstance(file, File):
+        return file_error(file, f"close() takes a File, not {file.type_name}")
+    if file.is_standard():
+        return file_error(file, f"{file} can't be closed")
+    try:
+        file.value.close()
+    except OSError as error:
+        return file_error(file, f"Can't close {file}: {error.strerror}")
+    return RTResult().success(NoneObj())
@@ -1,32 +1,128 @@
 """Interpreter, build-in function defs and run function"""
 from __future__ import annotations
+import sys
 import time
+from weakref import WeakSet
 
 # for type hinting
 import cyan.ast as ast
-from typing import Callable
+from typing import TYPE_CHECKING, Callable, Generator
 
 from cyan.tokens import T
 from cyan.utils import Printer
 from cyan.parser import parse_ast
+from cyan.optimizer import optimize
+from cyan.memo import MemoCache, memo_key, MEMO_CACHE_SIZE
+from cyan.vector import (
+    Vector,
+    builtin_vrange,
+    builtin_sum,
+    builtin_min,
+    builtin_max,
+    builtin_mean,
+    builtin_dot,
+)
+from cyan.strings import (
+    builtin_find,
+    builtin_split,
+    builtin_replace,
+    builtin_upper,
+    builtin_lower,
+    builtin_strip,
+    builtin_startswith,
+    builtin_endswith,
+    builtin_join,
+)
+from cyan.sequences import (
+    builtin_range,
+    builtin_lines,
+    builtin_map,
+    builtin_filter,
+    builtin_take,
+    builtin_reduce,
+)
+from cyan.files import (
+    File,
+    STDIN,
+    STDOUT,
+    builtin_open,
+    builtin_read,
+    builtin_readn,
+    builtin_write,
+    builtin_close,
+)
+from cyan.records import (
+    builtin_read_csv,
+    builtin_write_csv,
+    builtin_read_jsonl,
+    builtin_write_jsonl,
+)
+from cyan.regex import (
+    PatternCache,
+    PATTERN_CACHE_SIZE,
+    builtin_match,
+    builtin_search,
+    builtin_findall,
+    builtin_sub,
+    builtin_resplit,
+)
+from cyan.buffers import Buffer
 from cyan.tokenizer import tokenize
-from cyan.exceptions import RTError
+from cyan.exceptions import RTError, SequenceError
 from cyan.types import (
+    BINARY_OPERATIONS,
     RTResult,
     Number,
     Bool,
     String,
+    List,
+    Map,
+    PVector,
+    PMap,
+    Sequence,
     Function,
     BuiltInFunction,
+    Struct,
     NoneObj,
     SymbolMap,
     Context,
+    CallSignature,
+    repr_item,
 )
 
-__all__ = ("Interpreter", "builtin_out", "interpret", "run", "run_debug")
+if TYPE_CHECKING:
+    from cyan.types import Object
+
+__all__ = (
+    "Interpreter",
+    "BUILTINS",
+    "GLOBAL_SYMBOL_MAP",
+    "builtin_out",
+    "interpret",
+    "run",
+    "run_debug",
+)
 
 
 class Interpreter:
+    __slots__ = ("memo_size", "memo_caches", "patterns", "stdin", "stdout")
+
+    def __init__(
+        self,
+        memo_size: int = MEMO_CACHE_SIZE,
+        pattern_cache_size: int = PATTERN_CACHE_SIZE,
+        stdin: File = STDIN,
+        stdout: File = STDOUT,
+    ):
+        # where inp reads lines from and out writes to
+        self.stdin = stdin
+        self.stdout = stdout
+        self.memo_size = memo_size  # max results kept per memoized function
+        # only for the debug summary, a cache goes with the last copy of its
+        # function, like those of a memo fun defined in a function
+        self.memo_caches: WeakSet[MemoCache] = WeakSet()
+        self.patterns = PatternCache(pattern_cache_size)  # of the regex builtins
+
     def visit(self, node: ast.Node, ctx: Context) -> RTResult:
         method_name = f"visit_{type(node).__name__}"
         method: Callable[[ast.Node, Context], RTResult] = getattr(
@@ -94,7 +190,7 @@ class Interpreter:
     def visit_VarAccessNode(node: ast.VarAccessNode, ctx: Context):
         res = RTResult()
         var_name = node.var_name.value
-        value = ctx.symbol_map.get(var_name)
+        value = ctx.symbol_map.lookup(var_name, node.cache)
 
         if value is None:
             return res.failure(
@@ -116,6 +212,85 @@ class Interpreter:
         ctx.symbol_map.set(var_name, value)
         return res.success(value)
 
+    def visit_ListNode(self, node: ast.ListNode, ctx: Context):
+        res = RTResult()
+        elements = []
+        for element_node in node.elements:
+            elements.append(res.register(self.visit(element_node, ctx)))
+            if res.error:
+                return res
+
+        return res.success(
+            List(elements).set_pos(node.start_pos, node.end_pos).set_context(ctx)
+        )
+
+    def visit_MapNode(self, node: ast.MapNode, ctx: Context):
+        res = RTResult()
+        map_obj = Map()
+        for key_node, value_node in zip(node.keys, node.values):
+            key = res.register(self.visit(key_node, ctx))
+            if res.error:
+                return res
+            value = res.register(self.visit(value_node, ctx))
+            if res.error:
+                return res
+
+            error = map_obj.set(key, value)
+            if error is not None:
+                return res.failure(error)
+
+        return res.success(
+            map_obj.set_pos(node.start_pos, node.end_pos).set_context(ctx)
+        )
+
+    def visit_IndexNode(self, node: ast.IndexNode, ctx: Context):
+        res = RTResult()
+        obj = res.register(self.visit(node.node, ctx))
+        if res.error:
+            return res
+        index = res.register(self.visit(node.index, ctx))
+        if res.error:
+            return res
+
+        result, error = obj.get_index(index)
+        if error is not None:
+            return res.failure(error)
+        return res.success(result.set_pos(node.start_pos, node.end_pos))
+
+    def visit_SliceNode(self, node: ast.SliceNode, ctx: Context):
+        res = RTResult()
+        obj = res.register(self.visit(node.node, ctx))
+        if res.error:
+            return res
+
+        bounds = []
+        for bound in (node.start, node.end):
+            if bound is None:
+                bounds.append(None)
+                continue
+            bounds.append(res.register(self.visit(bound, ctx)))
+            if res.error:
+                return res
+
+        result, error = obj.get_slice(*bounds)
+        if error is not None:
+            return res.failure(error)
+        return res.success(result.set_pos(node.start_pos, node.end_pos))
+
+    def visit_FieldAccessNode(self, node: ast.FieldAccessNode, ctx: Context):
+        res = RTResult()
+        obj = res.register(self.visit(node.node, ctx))
+        if res.error:
+            return res
+
+        result, error = obj.get_field(node.field_name, node.index)
+        if error is not None:
+            if error.start_pos is None:  # obj was given by a call
+                error.set_pos(node.start_pos, node.end_pos)
+                error.context = ctx
+            return res.failure(error)
+        return res.success(result.set_pos(node.start_pos, node.end_pos))
+
     def visit_BinOpNode(self, node: ast.BinOpNode, ctx):
         res = RTResult()
         left = res.register(self.visit(node.left, ctx))
@@ -125,39 +300,23 @@ class Interpreter:
         if res.error:
             return res
 
-        oper = node.oper
-        result = None
-        error = None
+        if node.fast is not None:
+            # types are known, skip checking them in the operation methods
+            operation, result_type = node.fast
+            try:
+                result = result_type(operation(left.value, right.value))
+            except ZeroDivisionError:
+                pass  # let the operation method report it
+            else:
+                return res.success(
+                    result.set_context(left.ctx).set_pos(node.start_pos, node.end_pos)
+                )
 
-        # main operations
-        if oper.is_type(T.PLUS):
-            result, error = left.operate_plus(right)
-        elif oper.is_type(T.MINUS):
-            result, error = left.operate_minus(right)
-        elif oper.is_type(T.MUL):
-            result, error = left.operate_mul(right)
-        elif oper.is_type(T.DIV):
-            result, error = left.operate_div(right)
-        elif oper.is_type(T.POW):
-            result, error = left.operate_pow(right)
-        # boolean operations
-        elif oper.is_type(T.EE):
-            result, error = left.compare_eq(right)
-        elif oper.is_type(T.NE):
-            result, error = left.compare_ne(right)
-        elif oper.is_type(T.LT):
-            result, error = left.compare_lt(right)
-        elif oper.is_type(T.GT):
-            result, error = left.compare_gt(right)
-        elif oper.is_type(T.LTE):
-            result, error = left.compare_lte(right)
-        elif oper.is_type(T.GTE):
-            result, error = left.compare_gte(right)
-        # and/or
-        elif oper.is_equals(T.KW, "and"):
-            result, error = left.logic_and(right)
-        elif oper.is_equals(T.KW, "or"):
-            result, error = left.logic_or(right)
+        oper = node.oper
+        operation = BINARY_OPERATIONS[
+            oper.value if oper.tok_type == T.KW else oper.tok_type
+        ]
+        result, error = getattr(left, operation)(right)
 
         if error:
             return res.failure(error.set_pos(node.start_pos, node.end_pos))
@@ -170,6 +329,14 @@ class Interpreter:
         if res.error:
             return res
 
+        if node.fast is not None:
+            operation, result_type = node.fast
+            return res.success(
+                result_type(operation(number.value))
+                .set_context(number.ctx)
+                .set_pos(node.start_pos, node.end_pos)
+            )
+
         error = None
 
         if node.oper.is_type(T.MINUS):
@@ -187,7 +354,7 @@ class Interpreter:
         cond = res.register(self.visit(node.case[0], ctx))
         if res.error:
             return res
-        if cond.is_truthy():
+        if bool(cond.value) if node.plain_cond else cond.is_truthy():
             value = res.register(self.visit(node.case[1], ctx))
         else:
             value = res.register(self.visit(node.else_expr, ctx))
@@ -198,11 +365,16 @@ class Interpreter:
 
     def visit_WhileNode(self, node: ast.WhileNode, ctx: Context):
         res = RTResult()
+        symbols = ctx.symbol_map.symbol_map
+        for name in node.hoisted:
+            symbols.pop(name, None)
+
         cond = res.register(self.visit(node.condition, ctx))
         if res.error:
             return res
 
-        while cond.is_truthy():
+        plain_cond = node.plain_cond
+        while bool(cond.value) if plain_cond else cond.is_truthy():
             value = res.register(self.visit(node.body, ctx))
             if res.error:
                 return res
@@ -210,14 +382,316 @@ class Interpreter:
             if res.error:
                 return res
 
+        for name in node.hoisted:
+            symbols.pop(name, None)
         return res.success(NoneObj())
 
+    def visit_ForNode(self, node: ast.ForNode, ctx: Context):
+        res = RTResult()
+        numbers, error = self.range_of(node, ctx)
+        if error is not None:
+            return res.failure(error)
+
+        symbol_map = ctx.symbol_map
+        for name in node.hoisted:
+            symbol_map.symbol_map.pop(name, None)
+
+        var_name = node.var_name.value
+        body = node.body
+        for i in numbers:
+            symbol_map.set(var_name, Number(i).set_context(ctx))
+            res.register(self.visit(body, ctx))
+            if res.error:
+                return res
+
+        for name in node.hoisted:
+            symbol_map.symbol_map.pop(name, None)
+        return res.success(NoneObj())
+
+    def range_of(self, node: ast.ForNode, ctx: Context):
+        """(range, None) a for loop goes through, (None, error) if it can't"""
+        bounds = []
+        for bound in (node.start, node.end, node.step):
+            if bound is None:  # no step given
+                bounds.append(1)
+                continue
+            res = self.visit(bound, ctx)
+            if res.error:
+                return None, res.error
+            value = res.value
+            if not (isinstance(value, Number) and type(value.value) is int):
+                return None, RTError(
+                    bound.start_pos,
+                    bound.end_pos,
+                    f"Range bounds must be integers, got {value}",
+                    ctx,
+                )
+            bounds.append(value.value)
+
+        if bounds[2] == 0:
+            return None, RTError(
+                node.step.start_pos, node.step.end_pos, "Range step can't be 0", ctx
+            )
+        return range(*bounds), None
+
+    def visit_ForEachNode(self, node: ast.ForEachNode, ctx: Context):
+        res = RTResult()
+        items, error = self.items_of(node, ctx)
+        if error is not None:
+            return res.failure(error)
+
+        symbol_map = ctx.symbol_map
+        for name in node.hoisted:
+            symbol_map.symbol_map.pop(name, None)
+
+        var_name = node.var_name.value
+        body = node.body
+        try:
+            for item in items:
+                symbol_map.set(var_name, item)
+                res.register(self.visit(body, ctx))
+                if res.error:
+                    return res
+        except SequenceError as error:
+            return res.failure(error.error)
+
+        for name in node.hoisted:
+            symbol_map.symbol_map.pop(name, None)
+        return res.success(NoneObj())
+
+    def items_of(self, node: ast.ForEachNode, ctx: Context):
+        """(iterator, None) of what a for loop goes through, else (None, error)"""
+        res = self.visit(node.iterable, ctx)
+        if res.error:
+            return None, res.error
+        return res.value.iterate()
+
     @staticmethod
-    def visit_FuncDefNode(node: ast.FuncDefNode, ctx: Context):
+    def visit_YieldNode(node: ast.YieldNode, ctx: Context):
+        # yields of functions are run by resume, so this one is outside of any
+        return RTResult().failure(
+            RTError(node.start_pos, node.end_pos, "'yield' outside of a function", ctx)
+        )
+
+    # Generators run their body with resume instead of visit. The resume_*
+    # methods are generators giving the value of each yield in the node, and
+    # then returning its RTResult like visit does. Nodes with no yield in
+    # them are just visited, so the body is only paused in the nodes it has
+    # to be, and the caller taking the next item runs it in its own stack
+
+    def resume(
+        self, node: ast.Node, ctx: Context, yielding: frozenset[int]
+    ) -> Generator[Object, None, RTResult]:
+        if id(node) not in yielding:
+            return self.visit(node, ctx)
+        method = getattr(self, f"resume_{type(node).__name__}", None)
+        if method is None:
+            # the value of an expression can't be given while it's paused
+            return RTResult().failure(
+                RTError(
+                    node.start_pos,
+                    node.end_pos,
+                    "yield is not allowed inside an expression",
+                    ctx,
+                )
+            )
+        return (yield from method(node, ctx, yielding))
+
+    def run_generator(
+        self, body: ast.Node, ctx: Context, yielding: frozenset[int]
+    ) -> Generator[Object, None, None]:
+        res = yield from self.resume(body, ctx, yielding)
+        if res.error:
+            raise SequenceError(res.error)
+
+    def resume_StatementsNode(self, node: ast.StatementsNode, ctx, yielding):
         res = RTResult()
+        nodes = []
+
+        for statement in node.statements:
+            value = yield from self.resume(statement, ctx, yielding)
+            nodes.append(res.register(value))
+            if res.error:
+                return res
+
+        if len(nodes) == 1:
+            return res.success(nodes[0])
+        return res
+
+    def resume_YieldNode(self, node: ast.YieldNode, ctx, yielding):
+        res = RTResult()
+        value = res.register(self.visit(node.value, ctx))
+        if res.error:
+            return res
+        yield value
+        return res.success(NoneObj())
+
+    def resume_IfBlockNode(self, node: ast.IfBlockNode, ctx, yielding):
+        res = RTResult()
+        cond = res.register(self.visit(node.case[0], ctx))
+        if res.error:
+            return res
+        branch = (
+            node.case[1]
+            if (bool(cond.value) if node.plain_cond else cond.is_truthy())
+            else node.else_expr
+        )
+        value = yield from self.resume(branch, ctx, yielding)
+        value = res.register(value)
+        if res.error:
+            return res
+        return res.success(value)
+
+    def resume_WhileNode(self, node: ast.WhileNode, ctx, yielding):
+        res = RTResult()
+        symbols = ctx.symbol_map.symbol_map
+        for name in node.hoisted:
+            symbols.pop(name, None)
+
+        cond = res.register(self.visit(node.condition, ctx))
+        if res.error:
+            return res
+
+        plain_cond = node.plain_cond
+        while bool(cond.value) if plain_cond else cond.is_truthy():
+            res.register((yield from self.resume(node.body, ctx, yielding)))
+            if res.error:
+                return res
+            cond = res.register(self.visit(node.condition, ctx))
+            if res.error:
+                return res
+
+        for name in node.hoisted:
+            symbols.pop(name, None)
+        return res.success(NoneObj())
+
+    def resume_ForNode(self, node: ast.ForNode, ctx, yielding):
+        res = RTResult()
+        numbers, error = self.range_of(node, ctx)
+        if error is not None:
+            return res.failure(error)
+
+        symbol_map = ctx.symbol_map
+        for name in node.hoisted:
+            symbol_map.symbol_map.pop(name, None)
+
+        var_name = node.var_name.value
+        for i in numbers:
+            symbol_map.set(var_name, Number(i).set_context(ctx))
+            res.register((yield from self.resume(node.body, ctx, yielding)))
+            if res.error:
+                return res
+
+        for name in node.hoisted:
+            symbol_map.symbol_map.pop(name, None)
+        return res.success(NoneObj())
+
+    def resume_ForEachNode(self, node: ast.ForEachNode, ctx, yielding):
+        res = RTResult()
+        items, error = self.items_of(node, ctx)
+        if error is not None:
+            return res.failure(error)
+
+        symbol_map = ctx.symbol_map
+        for name in node.hoisted:
+            symbol_map.symbol_map.pop(name, None)
+
+        var_name = node.var_name.value
+        try:
+            for item in items:
+                symbol_map.set(var_name, item)
+                res.register((yield from self.resume(node.body, ctx, yielding)))
+                if res.error:
+                    return res
+        except SequenceError as error:
+            return res.failure(error.error)
+
+        for name in node.hoisted:
+            symbol_map.symbol_map.pop(name, None)
+        return res.success(NoneObj())
+
+    def visit_LoopInvariantNode(self, node: ast.LoopInvariantNode, ctx: Context):
+        # hoisted names can't be written in cyan code, so they are kept in the
+        # scope's dict directly, no InlineCache can depend on them
+        symbols = ctx.symbol_map.symbol_map
+        value = symbols.get(node.name)
+
+        if value is None:
+            for callee in node.callees:
+                fn = ctx.symbol_map.get(callee)
+                if not (isinstance(fn, BuiltInFunction) and fn.pure):
+                    symbols[node.name] = value = NOT_CACHED
+                    break
+            else:
+                # a mutable object can change without being given a new value
+                for name in node.reads:
+                    if getattr(ctx.symbol_map.get(name), "mutable", False):
+                        symbols[node.name] = value = NOT_CACHED
+                        break
+                else:
+                    res = self.visit(node.node, ctx)
+                    if res.error:
+                        return res
+                    if res.value is not None and not res.value.mutable:
+                        symbols[node.name] = res.value
+                    else:
+                        symbols[node.name] = NOT_CACHED
+                    return res
+
+        if value is NOT_CACHED:
+            return self.visit(node.node, ctx)
+        return RTResult().success(value.copy().set_pos(node.start_pos, node.end_pos))
+
+    def visit_InductionNode(self, node: ast.InductionNode, ctx: Context):
+        var = ctx.symbol_map.get(node.var_name)
+        # only integers are exact when updated step by step
+        if not (isinstance(var, Number) and type(var.value) is int):
+            return self.visit(node.node, ctx)
+
+        symbols = ctx.symbol_map.symbol_map
+        crr = var.value
+        state = symbols.get(node.name)
+
+        if state is not None and state[0] == crr:
+            value = state[1]
+        elif state is not None and crr - state[0] == node.step:
+            prev, value = state
+            if node.square:
+                value += (2 * prev + node.step) * node.step
+            else:
+                value += node.step * node.factor
+        elif node.square:
+            value = crr * crr
+        else:
+            value = crr * node.factor
+
+        symbols[node.name] = (crr, value)
+        return RTResult().success(
+            Number(value).set_pos(node.start_pos, node.end_pos).set_context(ctx)
+        )
+
+    def visit_FuncDefNode(self, node: ast.FuncDefNode, ctx: Context):
+        res = RTResult()
+        yielding = None
+        if node.is_generator:
+            # found once the body is optimized, it doesn't change after that
+            if node.yielding is None:
+                node.yielding = ast.yielding_nodes(node.body)
+            yielding = node.yielding
+
+        signature = CallSignature(
+            len(node.parameters),
+            param_names=tuple(param.value for param in node.parameters),
+            yielding=yielding,
+        )
+
+        memo = None
+        if node.memo is not None:
+            memo = MemoCache(node.name, node.memo == "explicit", self.memo_size)
+            self.memo_caches.add(memo)
 
         func = (
-            Function(node.name, node.parameters, node.body)
+            Function(node.name, node.parameters, node.body, signature, memo)
             .set_pos(node.start_pos, node.end_pos)
             .set_context(ctx)
         )
@@ -225,25 +699,41 @@ class Interpreter:
 
         return res.success(func)
 
+    @staticmethod
+    def visit_StructDefNode(node: ast.StructDefNode, ctx: Context):
+        struct = (
+            Struct.declare(node.name, node.field_names)
+            .set_pos(node.start_pos, node.end_pos)
+            .set_context(ctx)
+        )
+        ctx.symbol_map.set(node.name, struct)
+        return RTResult().success(struct)
+
     def visit_FuncCallNode(self, node: ast.FuncCallNode, ctx: Context):
         res = RTResult()
-        args = []
+
+        callee = node.node_to_call
+        if type(callee) is ast.VarAccessNode:
+            fn = ctx.symbol_map.lookup(callee.var_name.value, callee.cache)
+            if isinstance(fn, BuiltInFunction) and fn.signature.accepts(
+                len(node.arguments)
+            ):
+                return self.call_builtin(fn, node, ctx)
 
         value_to_call = res.register(self.visit(node.node_to_call, ctx))
         if res.error:
             return res
-        value_to_call = value_to_call.copy().set_pos(node.start_pos, node.end_pos)
+        # visiting the callee already gave a fresh object, no need to copy it
+        value_to_call.set_pos(node.start_pos, node.end_pos)
 
+        args = []
         for arg_node in node.arguments:
             args.append(res.register(self.visit(arg_node, ctx)))
             if res.error:
                 return res
 
         value_to_call: Function
-        return_value = res.register(
-            # value_to_call.execute(args),
-            self.call_function(value_to_call, args)
-        )
+        return_value = res.register(self.call_function(value_to_call, args))
 
         if res.error:
             res.error.set_pos(node.start_pos, node.end_pos)
@@ -251,42 +741,122 @@ class Interpreter:
 
         return res.success(return_value)
 
-    def call_function(self, fn: Function | BuiltInFunction, args) -> RTResult:
+    def call_builtin(
+        self, fn: BuiltInFunction, node: ast.FuncCallNode, ctx: Context
+    ) -> RTResult:
+        """
+        Calls a builtin named by node, that takes as many arguments as it's
+        given. It is called as it is, without copying it or going through
+        call_function, so calling builtins in a loop costs little more than
+        what they do
+        """
         res = RTResult()
+        args = []
+        for arg_node in node.arguments:
+            args.append(res.register(self.visit(arg_node, ctx)))
+            if res.error:
+                return res
 
-        context = Context(
-            fn.name,
-            fn.ctx,
-            fn.start_pos,
-            SymbolMap(getattr(fn.ctx, "symbol_map", None)),
-        )
+        if fn.takes_interpreter:
+            value = res.register(fn.function(self, *args))
+        else:
+            value = res.register(fn.function(*args))
+        if res.error:
+            res.error.set_pos(node.start_pos, node.end_pos)
+            return res
+        return res.success(value)
 
-        if fn.n_params != len(args) and fn.n_params != float("inf"):
+    def visit_InlinedCallNode(self, node: ast.InlinedCallNode, ctx: Context):
+        res = RTResult()
+        args = []
+        for arg_node in node.arguments:
+            args.append(res.register(self.visit(arg_node, ctx)))
+            if res.error:
+                return res
+
+        symbols = ctx.symbol_map.symbol_map
+        for name, arg in zip(node.arg_names, args):
+            symbols[name] = arg
+
+        # only functions defined in the module are inlined, so the frame the
+        # call would have had is a child of the module, in the scope of the call
+        module_ctx = ctx
+        while module_ctx.parent is not None:
+            module_ctx = module_ctx.parent
+        context = Context(node.name, module_ctx, node.start_pos, ctx.symbol_map)
+
+        value = res.register(self.visit(node.body, context))
+        # the arguments are only for the body, they don't stay in the scope
+        for name in node.arg_names:
+            symbols.pop(name, None)
+        if res.error:
+            res.error.set_pos(node.start_pos, node.end_pos)
+            return res
+
+        return res.success(value)
+
+    def call_function(self, fn: Function | BuiltInFunction, args) -> RTResult:
+        res = RTResult()
+        signature = fn.signature
+
+        if not signature.accepts(len(args)):
             return res.failure(
                 RTError(
                     fn.start_pos,
                     fn.end_pos,
                     "{} arguments, {} given into '{}', takes {}".format(
                         "Too many" if len(args) > fn.n_params else "Not enough",
-                        len(args), fn.name, fn.n_params
+                        len(args), fn.name, signature.arity()
                     ),
-                    context,
+                    Context(fn.name, fn.ctx, fn.start_pos),
                 )
             )
 
         if isinstance(fn, BuiltInFunction):
-            # If function is a builtin
-            value = res.register(fn.function(*args))
-            if res.error:
-                return res
+            # If function is a builtin, it doesn't need a scope of its own
+            if fn.takes_interpreter:
+                return fn.function(self, *args)
+            return fn.function(*args)
+
+        if signature.yielding is not None:
+            # the body is run as the items of the Sequence are taken
+            context = Context(
+                fn.name, fn.ctx, fn.start_pos, SymbolMap(fn.ctx.symbol_map)
+            )
+            symbols = context.symbol_map.symbol_map
+            for name, arg in zip(signature.param_names, args):
+                symbols[name] = arg
+            items = self.run_generator(fn.body, context, signature.yielding)
+            return res.success(Sequence(items).set_context(context))
+
+        key = None
+        if fn.memo is not None:
+            if fn.memo.validate(fn):
+                key = memo_key(args)
+            elif fn.memo.strict:
+                return res.failure(
+                    RTError(
+                        fn.start_pos,
+                        fn.end_pos,
+                        f"'{fn.name}' can't be memoized, it {fn.memo.reason}",
+                        Context(fn.name, fn.ctx, fn.start_pos),
+                    )
+                )
 
-            return res.success(value)
+            if key is not None:
+                value = fn.memo.get(key)
+                if value is not None:
+                    return res.success(value.copy())
 
-        # setting parameters to given values
-        for i in range(fn.n_params):
-            parameter = fn.params[i]
-            arg = args[i]
-            context.symbol_map.set(parameter.value, arg)
+        context = Context(
+            fn.name, fn.ctx, fn.start_pos, SymbolMap(fn.ctx.symbol_map)
+        )
+
+        # setting parameters to given values, the scope is new so there
+        # can't be any cached lookup that depends on it yet
+        symbols = context.symbol_map.symbol_map
+        for name, arg in zip(signature.param_names, args):
+            symbols[name] = arg
 
         try:
             value = res.register(self.visit(fn.body, context))
@@ -299,23 +869,41 @@ class Interpreter:
 
         if res.error:
             return res
-        else:
-            return res.success(value)
 
+        # a mutable value would be shared by every call giving it
+        if key is not None and value is not None and not value.mutable:
+            fn.memo.put(key, value)
 
-def builtin_out(*values):
+        return res.success(value)
+
+
+# marks a LoopInvariantNode whose value can't be cached in this run of the loop
+NOT_CACHED = object()
+
+
+def builtin_out(interpreter: Interpreter, *values):
     if len(values) != 1:
-        Printer.output(" ".join(map(str, values)))
+        text = " ".join(map(str, values))
     else:
-        Printer.output(str(values[0]))
-    Printer.output("\n")
+        text = str(values[0])
+    interpreter.stdout.value.write(text + "\n")
     return RTResult().success(NoneObj())
 
 
-def builtin_inp():
+def builtin_inp(interpreter: Interpreter):
+    source = interpreter.stdin.value
+    # none at the end of the input
+    if source is not sys.stdin:
+        line = source.readline()
+        if not line:
+            return RTResult().success(NoneObj())
+        return RTResult().success(String(line[:-1] if line[-1] == "\n" else line))
+
+    # a prompt written before has to be seen before waiting for the input
+    Printer.flush()
     try:
         inp = input()
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, EOFError):
         return RTResult().success(NoneObj())
 
     return RTResult().success(
@@ -323,13 +911,175 @@ def builtin_inp():
     )
 
 
+def builtin_len(obj):
+    if not isinstance(obj, (String, List, Map, Vector, PVector, PMap, Buffer)):
+        return RTResult().failure(
+            RTError(
+                obj.start_pos, obj.end_pos, f"{obj.type_name} has no length", obj.ctx
+            )
+        )
+    # a String knows its length without joining it if it is a rope or a view
+    length = len(obj) if isinstance(obj, String) else len(obj.value)
+    return RTResult().success(Number(length))
+
+
+def builtin_append(lst, value):
+    if not isinstance(lst, List):
+        return RTResult().failure(
+            RTError(
+                lst.start_pos, lst.end_pos, f"Can't append to {lst.type_name}", lst.ctx
+            )
+        )
+    lst.value.append(value)
+    return RTResult().success(NoneObj())
+
+
+def builtin_pop(lst):
+    if not isinstance(lst, List):
+        return RTResult().failure(
+            RTError(
+                lst.start_pos, lst.end_pos, f"Can't pop from {lst.type_name}", lst.ctx
+            )
+        )
+    if not lst.value:
+        return RTResult().failure(
+            RTError(lst.start_pos, lst.end_pos, "Can't pop from an empty List", lst.ctx)
+        )
+    return RTResult().success(lst.value.pop())
+
+
+def expect_map(obj, action: str, persistent: bool = False):
+    """Error unless obj is a Map, or a PMap if persistent ones are fine too"""
+    if isinstance(obj, Map) or (persistent and isinstance(obj, PMap)):
+        return None
+    expected = "Map or PMap" if persistent else "Map"
+    return RTError(
+        obj.start_pos,
+        obj.end_pos,
+        f"Can't {action} {obj.type_name}, only {expected}",
+        obj.ctx,
+    )
+
+
+def builtin_get(map_obj, key):
+    error = expect_map(map_obj, "get from", persistent=True)
+    if error is None:
+        value, error = map_obj.get(key)
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(NoneObj() if value is None else value.copy())
+
+
+def builtin_set(map_obj, key, value):
+    error = expect_map(map_obj, "set in") or map_obj.set(key, value)
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(NoneObj())
+
+
+def builtin_delete(map_obj, key):
+    error = expect_map(map_obj, "delete from")
+    if error is None:
+        hash_key, error = map_obj.key_of(key)
+    if error is None and map_obj.value.pop(hash_key, None) is None:
+        error = RTError(
+            key.start_pos, key.end_pos, f"Key {repr_item(key)} not in Map", key.ctx
+        )
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(NoneObj())
+
+
+def builtin_contains(container, item):
+    if isinstance(container, (Map, PMap)):
+        value, error = container.get(item)
+        if error is not None:
+            return RTResult().failure(error)
+        return RTResult().success(Bool(value is not None))
+    if isinstance(container, (List, PVector)):
+        return RTResult().success(
+            Bool(any(element.equals(item) for element in container.value))
+        )
+    if isinstance(container, String) and isinstance(item, String):
+        text, start, stop = container.span()
+        return RTResult().success(Bool(text.find(item.value, start, stop) != -1))
+    return RTResult().failure(
+        RTError(
+            container.start_pos,
+            container.end_pos,
+            f"Can't look for {item.type_name} in {container.type_name}",
+            container.ctx,
+        )
+    )
+
+
+def builtin_keys(map_obj):
+    error = expect_map(map_obj, "get keys of", persistent=True)
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(List([key.copy() for key, _ in map_obj.entries()]))
+
+
+def builtin_values(map_obj):
+    error = expect_map(map_obj, "get values of", persistent=True)
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(List([value.copy() for _, value in map_obj.entries()]))
+
+
+def builtin_conj(vec, item):
+    if not isinstance(vec, PVector):
+        return RTResult().failure(
+            RTError(
+                vec.start_pos,
+                vec.end_pos,
+                f"Can't conj to {vec.type_name}, only PVector",
+                vec.ctx,
+            )
+        )
+    return RTResult().success(vec.conj(item))
+
+
+def builtin_assoc(coll, key, value):
+    if not isinstance(coll, (PVector, PMap)):
+        return RTResult().failure(
+            RTError(
+                coll.start_pos,
+                coll.end_pos,
+                f"Can't assoc in {coll.type_name}, only PVector or PMap",
+                coll.ctx,
+            )
+        )
+    result, error = coll.assoc(key, value)
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(result)
+
+
+def builtin_dissoc(map_obj, key):
+    if not isinstance(map_obj, PMap):
+        return RTResult().failure(
+            RTError(
+                map_obj.start_pos,
+                map_obj.end_pos,
+                f"Can't dissoc from {map_obj.type_name}, only PMap",
+                map_obj.ctx,
+            )
+        )
+    result, error = map_obj.dissoc(key)
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(result)
+
+
 def interpret(node: ast.Node, context: Context) -> RTResult:
     """Creates an interpreter instance and visits node"""
     interpreter = Interpreter()
+    interpreter.patterns.compile_literals(node)
     return interpreter.visit(node, context)
 
 
-def run(filename: str, code: str):
+def run(filename: str, code: str, opt_level: int = 0):
     """Main run function"""
     tokens, error = tokenize(filename, code)
 
@@ -341,8 +1091,12 @@ def run(filename: str, code: str):
     if parse_error is not None:
         return None, parse_error
 
+    if opt_level > 0:
+        node, _ = optimize(node, opt_level)
+
     context = Context("<module>", symbol_map=GLOBAL_SYMBOL_MAP)
     res = interpret(node, context)
+    Printer.flush()
 
     if res.error:
         return None, res.error
@@ -350,7 +1104,7 @@ def run(filename: str, code: str):
         return res.value, None
 
 
-def run_debug(filename: str, code: str):
+def run_debug(filename: str, code: str, opt_level: int = 0):
     """Main run function, with debug mode on"""
     start_t = time.perf_counter()
     t1 = start_t
@@ -373,12 +1127,30 @@ def run_debug(filename: str, code: str):
     if parse_error is not None:
         return None, parse_error
 
+    if opt_level > 0:
+        t1 = time.perf_counter()
+        node, report = optimize(node, opt_level)
+        t2 = time.perf_counter()
+
+        Printer.time(f"Optimized (-O{opt_level}) {round(t2 - t1, 5)}s")
+        Printer.debug(
+            "OPTIMIZER: ",
+            ", ".join(f"{name} {summary}" for name, summary in report.items()),
+        )
+        Printer.debug("NODE: ", node)
+
     t1 = time.perf_counter()
     context = Context("<module>", symbol_map=GLOBAL_SYMBOL_MAP)
-    res = interpret(node, context)
+    interpreter = Interpreter()
+    interpreter.patterns.compile_literals(node)
+    res = interpreter.visit(node, context)
     t2 = time.perf_counter()
 
     Printer.time(f"Run time {round(t2 - t1, 5)}s, Total {round(t2 - start_t, 5)}s")
+    if interpreter.memo_caches:
+        Printer.debug("MEMO: ", ", ".join(map(str, interpreter.memo_caches)))
+    if interpreter.patterns.hits or interpreter.patterns.misses:
+        Printer.debug("REGEX: ", interpreter.patterns)
 
     if res.error:
         return None, res.error
@@ -386,9 +1158,91 @@ def run_debug(filename: str, code: str):
         return res.value, None
 
 
-GLOBAL_SYMBOL_MAP = SymbolMap()
-GLOBAL_SYMBOL_MAP.set("out", BuiltInFunction("out", builtin_out, float("inf")))
-GLOBAL_SYMBOL_MAP.set("inp", BuiltInFunction("inp", builtin_inp, 0))
-GLOBAL_SYMBOL_MAP.set("Bool", BuiltInFunction("Bool", Bool.converter, 1))
-GLOBAL_SYMBOL_MAP.set("Num", BuiltInFunction("Num", Number.converter, 1))
-GLOBAL_SYMBOL_MAP.set("Str", BuiltInFunction("Str", String.converter, 1))
+# builtins, shared by every scope of globals
+BUILTINS = SymbolMap()
+# out and inp use the streams of the interpreter, see Interpreter
+BUILTINS.set(
+    "out",
+    BuiltInFunction("out", builtin_out, float("inf"), takes_interpreter=True),
+)
+BUILTINS.set("inp", BuiltInFunction("inp", builtin_inp, 0, takes_interpreter=True))
+BUILTINS.set("Bool", BuiltInFunction("Bool", Bool.converter, 1, pure=True))
+BUILTINS.set("Num", BuiltInFunction("Num", Number.converter, 1, pure=True))
+BUILTINS.set("Str", BuiltInFunction("Str", String.converter, 1, pure=True))
+# Lists and Maps can change, so nothing taking or making one is pure
+BUILTINS.set("List", BuiltInFunction("List", List.converter, 1))
+BUILTINS.set("len", BuiltInFunction("len", builtin_len, 1))
+BUILTINS.set("append", BuiltInFunction("append", builtin_append, 2))
+BUILTINS.set("pop", BuiltInFunction("pop", builtin_pop, 1))
+BUILTINS.set("Map", BuiltInFunction("Map", Map.converter, 1))
+BUILTINS.set("get", BuiltInFunction("get", builtin_get, 2))
+BUILTINS.set("set", BuiltInFunction("set", builtin_set, 3))
+BUILTINS.set("delete", BuiltInFunction("delete", builtin_delete, 2))
+BUILTINS.set("contains", BuiltInFunction("contains", builtin_contains, 2))
+BUILTINS.set("keys", BuiltInFunction("keys", builtin_keys, 1))
+BUILTINS.set("values", BuiltInFunction("values", builtin_values, 1))
+# Vectors never change, so these are pure even though Lists can be given to them
+BUILTINS.set("Vector", BuiltInFunction("Vector", Vector.converter, 1, pure=True))
+BUILTINS.set("vrange", BuiltInFunction("vrange", builtin_vrange, 2, pure=True))
+BUILTINS.set("sum", BuiltInFunction("sum", builtin_sum, 1, pure=True))
+BUILTINS.set("min", BuiltInFunction("min", builtin_min, 1, pure=True))
+BUILTINS.set("max", BuiltInFunction("max", builtin_max, 1, pure=True))
+BUILTINS.set("mean", BuiltInFunction("mean", builtin_mean, 1, pure=True))
+BUILTINS.set("dot", BuiltInFunction("dot", builtin_dot, 2, pure=True))
+# PVectors and PMaps never change either, updating one gives a new one
+BUILTINS.set("PVector", BuiltInFunction("PVector", PVector.converter, 1, pure=True))
+BUILTINS.set("PMap", BuiltInFunction("PMap", PMap.converter, 1, pure=True))
+BUILTINS.set("conj", BuiltInFunction("conj", builtin_conj, 2, pure=True))
+BUILTINS.set("assoc", BuiltInFunction("assoc", builtin_assoc, 3, pure=True))
+BUILTINS.set("dissoc", BuiltInFunction("dissoc", builtin_dissoc, 2, pure=True))
+# Strings never change either, but split makes a List
+BUILTINS.set("find", BuiltInFunction("find", builtin_find, 2, pure=True))
+BUILTINS.set("split", BuiltInFunction("split", builtin_split, 2))
+BUILTINS.set("replace", BuiltInFunction("replace", builtin_replace, 3, pure=True))
+BUILTINS.set("upper", BuiltInFunction("upper", builtin_upper, 1, pure=True))
+BUILTINS.set("lower", BuiltInFunction("lower", builtin_lower, 1, pure=True))
+BUILTINS.set("strip", BuiltInFunction("strip", builtin_strip, 1, pure=True))
+BUILTINS.set(
+    "startswith", BuiltInFunction("startswith", builtin_startswith, 2, pure=True)
+)
+BUILTINS.set("endswith", BuiltInFunction("endswith", builtin_endswith, 2, pure=True))
+BUILTINS.set("join", BuiltInFunction("join", builtin_join, 2, pure=True))
+# Sequences are used up as they are gone through, and lines reads a file
+BUILTINS.set("range", BuiltInFunction("range", builtin_range, 2))
+BUILTINS.set("lines", BuiltInFunction("lines", builtin_lines, 1))
+# stages added to a map, filter or take run in the same loop as its own
+BUILTINS.set("map", BuiltInFunction("map", builtin_map, 2, takes_interpreter=True))
+BUILTINS.set(
+    "filter", BuiltInFunction("filter", builtin_filter, 2, takes_interpreter=True)
+)
+BUILTINS.set("take", BuiltInFunction("take", builtin_take, 2))
+BUILTINS.set(
+    "reduce", BuiltInFunction("reduce", builtin_reduce, 3, takes_interpreter=True)
+)
+# reading and writing files, stdin and stdout are Files too
+BUILTINS.set("stdin", STDIN)
+BUILTINS.set("stdout", STDOUT)
+BUILTINS.set("open", BuiltInFunction("open", builtin_open, 2))
+BUILTINS.set("read", BuiltInFunction("read", builtin_read, 1))
+BUILTINS.set("readn", BuiltInFunction("readn", builtin_readn, 2))
+BUILTINS.set("write", BuiltInFunction("write", builtin_write, 2))
+BUILTINS.set("close", BuiltInFunction("close", builtin_close, 1))
+# records are read lazily from CSV and JSON lines files, and written in batches
+BUILTINS.set("read_csv", BuiltInFunction("read_csv", builtin_read_csv, 1))
+BUILTINS.set("write_csv", BuiltInFunction("write_csv", builtin_write_csv, 2))
+BUILTINS.set("read_jsonl", BuiltInFunction("read_jsonl", builtin_read_jsonl, 1))
+BUILTINS.set("write_jsonl", BuiltInFunction("write_jsonl", builtin_write_jsonl, 2))
+# patterns are compiled once per interpreter, see PatternCache
+for name, function, n_params in (
+    ("match", builtin_match, 2),
+    ("search", builtin_search, 2),
+    ("findall", builtin_findall, 2),
+    ("sub", builtin_sub, 3),
+    ("resplit", builtin_resplit, 2),
+):
+    BUILTINS.set(
+        name, BuiltInFunction(name, function, n_params, takes_interpreter=True)
+    )
+
+# globals of programs given to run
+GLOBAL_SYMBOL_MAP = SymbolMap(BUILTINS)
@@ -0,0 +1,192 @@
+"""Purity analysis of functions and caches for memoizing them"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+from weakref import WeakKeyDictionary
+
+import cyan.ast as ast
+from cyan.types import Function, BuiltInFunction, Number, String, Bool, NoneObj
+
+if TYPE_CHECKING:
+    from typing import Optional
+    from cyan.types import Object, SymbolMap
+
+__all__ = ("BodyInfo", "body_info", "check_purity", "memo_key", "MemoCache")
+
+MEMO_CACHE_SIZE = 1024
+
+
+class BodyInfo:
+    """Names a function body reads from outside of it and names it calls"""
+    __slots__ = ("free_names", "callees")
+
+    def __init__(self, free_names: frozenset[str], callees: Optional[frozenset[str]]):
+        self.free_names = free_names
+        self.callees = callees  # None if it calls something that isn't a name
+
+
+_BODY_INFO: WeakKeyDictionary[ast.Node, BodyInfo] = WeakKeyDictionary()
+
+
+def body_info(body: ast.Node, params: list) -> BodyInfo:
+    info = _BODY_INFO.get(body)
+    if info is not None:
+        return info
+
+    local = {param.value for param in params}
+    nodes = list(ast.walk(body))
+    for node in nodes:
+        if isinstance(node, ast.VarAssignNode):
+            local.add(node.var_name.value)
+        elif isinstance(node, (ast.FuncDefNode, ast.StructDefNode)):
+            local.add(node.name)
+        elif isinstance(node, (ast.ForNode, ast.ForEachNode)):
+            local.add(node.var_name.value)
+        elif isinstance(node, ast.InlinedCallNode):
+            local.update(node.arg_names)
+
+    free = set()
+    callees = set()
+    for node in nodes:
+        if isinstance(node, ast.VarAccessNode) and node.var_name.value not in local:
+            free.add(node.var_name.value)
+        elif isinstance(node, ast.FuncCallNode):
+            callee = node.node_to_call
+            # calling a parameter or local can't be checked before the call
+            if isinstance(callee, ast.VarAccessNode) and callee.var_name.value not in local:
+                callees.add(callee.var_name.value)
+            else:
+                callees = None
+                break
+        elif isinstance(node, ast.FuncDefNode):
+            callees = None  # a closure could be called anywhere
+            break
+
+    info = BodyInfo(frozenset(free), None if callees is None else frozenset(callees))
+    _BODY_INFO[body] = info
+    return info
+
+
+def check_purity(
+    fn: Function, snapshot: list, visited: Optional[set] = None
+) -> Optional[str]:
+    """
+    Checks that calling fn can't have side effects: it only calls pure
+    builtins and functions that are pure themselves. Appends (scope, name,
+    value) to snapshot for every name fn and its callees read from outside.
+    Returns what makes fn impure, None if it is pure
+    """
+    if visited is None:
+        visited = set()
+    visited.add(fn.body)
+
+    info = body_info(fn.body, fn.params)
+    if info.callees is None:
+        return "calls a function that is not known before the call"
+
+    scope = fn.ctx.symbol_map
+    for name in info.free_names:
+        value = scope.get(name)
+        if value is not None and value.mutable:
+            return f"reads '{name}', which can change"
+        snapshot.append((scope, name, value))
+
+    for name in info.callees:
+        callee = scope.get(name)
+        if isinstance(callee, BuiltInFunction):
+            if not callee.pure:
+                return f"calls '{name}'"
+        elif isinstance(callee, Function):
+            if callee.body in visited:
+                continue
+            reason = check_purity(callee, snapshot, visited)
+            if reason is not None:
+                return reason
+        else:
+            return f"calls '{name}'"
+
+    return None
+
+
+def memo_key(args: list[Object]) -> Optional[tuple]:
+    """Key of a call with the given arguments, None if they can't be a key"""
+    key = []
+    for arg in args:
+        if not isinstance(arg, (Number, String, Bool, NoneObj)):
+            return None
+        # type of the value too, so 1 and 1.0 are different calls
+        key.append((type(arg), type(arg.value), arg.value))
+    return tuple(key)
+
+
+class MemoCache:
+    """
+    LRU cache of the results of a function, shared by all copies of it.
+    The cached results stay valid for as long as every name the function
+    reads from outside (through its callees too) keeps the same value
+    """
+    __slots__ = (
+        "name",
+        "strict",
+        "max_size",
+        "results",
+        "snapshot",
+        "pure",
+        "reason",
+        "hits",
+        "misses",
+        "__weakref__",
+    )
+
+    def __init__(self, name: str, strict: bool, max_size: int = MEMO_CACHE_SIZE):
+        self.name = name
+        self.strict = strict  # explicitly asked for, being impure is an error
+        self.max_size = max_size
+        self.results: OrderedDict[tuple, Object] = OrderedDict()
+        self.snapshot: Optional[list[tuple[SymbolMap, str, Object]]] = None
+        self.pure = False
+        self.reason: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.hits} hits, {self.misses} misses, {len(self.results)} cached"
+
+    def validate(self, fn: Function) -> bool:
+        """Whether fn can be memoized now, clears the cache if things changed"""
+        snapshot = self.snapshot
+        if snapshot is not None:
+            for scope, name, value in snapshot:
+                if scope.get(name) is not value:
+                    break
+            else:
+                return self.pure
+
+        self.results.clear()
+        # only set once it's whole, another thread can be validating too
+        snapshot = []
+        self.reason = check_purity(fn, snapshot)
+        self.pure = self.reason is None
+        self.snapshot = snapshot
+        return self.pure
+
+    def get(self, key: tuple) -> Optional[Object]:
+        value = self.results.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            self.results.move_to_end(key)
+        except KeyError:
+            pass  # evicted by another thread since
+        return value
+
+    def put(self, key: tuple, value: Object) -> None:
+        self.results[key] = value
+        if len(self.results) > self.max_size:
+            try:
+                self.results.popitem(last=False)
+            except KeyError:
+                pass  # emptied by another thread since
@@ -0,0 +1,1008 @@
+"""AST optimizer, runs a pipeline of passes between parse_ast and interpret"""
+from __future__ import annotations
+
+import copy
+import operator
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+import cyan.ast as ast
+from cyan.tokens import T, Token
+from cyan.types import (
+    BINARY_OPERATIONS,
+    Number,
+    String,
+    Bool,
+    NoneObj,
+    List,
+    Map,
+    Function,
+    Struct,
+)
+from cyan.memo import body_info
+
+if TYPE_CHECKING:
+    from typing import Optional
+    from cyan.types import Object
+    from cyan.utils import Pos
+
+__all__ = (
+    "NodeTransformer",
+    "OptimizationPass",
+    "ConstantFolding",
+    "DeadBranchElimination",
+    "PassElimination",
+    "LoopInvariantHoisting",
+    "StrengthReduction",
+    "FunctionInlining",
+    "AutoMemoization",
+    "TypeInference",
+    "PassReport",
+    "PASSES",
+    "register_pass",
+    "optimize",
+)
+
+# exponents above this aren't folded, so dead code can't blow up parse time
+MAX_FOLDED_EXPONENT = 64
+
+
+class NodeTransformer:
+    """
+    Walks the AST and calls visit_<NodeType> for every node found.
+    Visit methods return the node to put in place of the visited one.
+    """
+
+    def visit(self, node: ast.Node) -> ast.Node:
+        method = getattr(self, f"visit_{type(node).__name__}", self.generic_visit)
+        return method(node)
+
+    def generic_visit(self, node: ast.Node) -> ast.Node:
+        """Visit all children of node, replacing them with the results"""
+        for name, value in vars(node).items():
+            if isinstance(value, ast.Node):
+                setattr(node, name, self.visit(value))
+            elif isinstance(value, (list, tuple)):
+                items = [
+                    self.visit(item) if isinstance(item, ast.Node) else item
+                    for item in value
+                ]
+                setattr(node, name, type(value)(items))
+        return node
+
+
+class OptimizationPass(NodeTransformer):
+    """
+    Base class for optimization passes.
+    A pass runs when the optimization level is at least its level,
+    and counts every change it makes into self.changes
+    """
+    name = "pass"
+    level = 1
+
+    def __init__(self):
+        self.changes = 0
+        self.notes: list[str] = []  # details worth reporting about the changes
+
+    def run(self, node: ast.Node) -> ast.Node:
+        return self.visit(node)
+
+
+def literal_value(node: ast.Node) -> Optional[Object]:
+    """Cyan object a literal node evaluates to, None if node is not a literal"""
+    if isinstance(node, ast.NumberNode):
+        return Number(node.tok.value)
+    if isinstance(node, ast.StringNode):
+        return String(node.tok.value)
+    if isinstance(node, ast.LiteralNode):
+        if node.tok.value == "none":
+            return NoneObj()
+        return Bool(node.tok.value == "true")
+    return None
+
+
+def literal_node(obj: Object, start_pos: Pos, end_pos: Pos) -> Optional[ast.Node]:
+    """Literal node that evaluates to obj, None if obj has no literal form"""
+    if isinstance(obj, Bool):
+        tok = Token(T.LITERAL, str(obj), start_pos, end_pos)
+        return ast.LiteralNode(tok)
+    if isinstance(obj, NoneObj):
+        return ast.LiteralNode(Token(T.LITERAL, "none", start_pos, end_pos))
+    if isinstance(obj, Number):
+        tok_type = T.FLOAT if isinstance(obj.value, float) else T.INT
+        return ast.NumberNode(Token(tok_type, obj.value, start_pos, end_pos))
+    if isinstance(obj, String):
+        return ast.StringNode(Token(T.STRING, obj.value, start_pos, end_pos))
+    return None
+
+
+class ConstantFolding(OptimizationPass):
+    """Evaluates operations on literals, `60 * 60 * 24` becomes `86400`"""
+    name = "constant-folding"
+
+    def visit_BinOpNode(self, node: ast.BinOpNode) -> ast.Node:
+        self.generic_visit(node)
+        left = literal_value(node.left)
+        right = literal_value(node.right)
+        if left is None or right is None:
+            return node
+
+        oper = node.oper
+        if oper.is_type(T.POW) and not (
+            isinstance(right.value, int) and abs(right.value) <= MAX_FOLDED_EXPONENT
+        ):
+            return node
+
+        operation = BINARY_OPERATIONS[
+            oper.value if oper.tok_type == T.KW else oper.tok_type
+        ]
+        result, error = getattr(left, operation)(right)
+        return self.replace(node, result, error)
+
+    def visit_UnaryOpNode(self, node: ast.UnaryOpNode) -> ast.Node:
+        self.generic_visit(node)
+        value = literal_value(node.node)
+        if value is None:
+            return node
+
+        result, error = value, None
+        if node.oper.is_type(T.MINUS):
+            result, error = value.operate_mul(Number(-1))
+        elif node.oper.is_equals(T.KW, "not"):
+            result, error = value.logic_not()
+        return self.replace(node, result, error)
+
+    def replace(self, node: ast.Node, result, error) -> ast.Node:
+        # operations that fail are left for the interpreter to report
+        if error is not None:
+            return node
+        folded = literal_node(result, node.start_pos, node.end_pos)
+        if folded is None:
+            return node
+        self.changes += 1
+        return folded
+
+
+class DeadBranchElimination(OptimizationPass):
+    """
+    Replaces if-blocks having a literal condition with the branch taken,
+    and removes while loops whose condition is a false literal
+    """
+    name = "dead-branch-elimination"
+
+    def visit_IfBlockNode(self, node: ast.IfBlockNode) -> ast.Node:
+        self.generic_visit(node)
+        cond = literal_value(node.case[0])
+        if cond is None:
+            return node
+
+        self.changes += 1
+        return node.case[1] if cond.is_truthy() else node.else_expr
+
+    def visit_WhileNode(self, node: ast.WhileNode) -> ast.Node:
+        self.generic_visit(node)
+        cond = literal_value(node.condition)
+        if cond is None or cond.is_truthy():
+            return node
+
+        # a loop that never runs still evaluates to none
+        self.changes += 1
+        return ast.LiteralNode(Token(T.LITERAL, "none", node.start_pos, node.end_pos))
+
+
+class PassElimination(OptimizationPass):
+    """Drops `pass` statements from blocks"""
+    name = "pass-elimination"
+
+    def visit_StatementsNode(self, node: ast.StatementsNode) -> ast.Node:
+        self.generic_visit(node)
+        statements = [
+            statement
+            for statement in node.statements
+            if not isinstance(statement, ast.PassNode)
+        ]
+        # a block of one statement evaluates to its value, a block of many
+        # doesn't, so only drop them when that can't change the result
+        if len(statements) < 2 or len(statements) == len(node.statements):
+            return node
+
+        self.changes += len(node.statements) - len(statements)
+        node.statements = statements
+        return node
+
+
+def assigned_names(node: ast.Node) -> dict[str, list[ast.Node]]:
+    """All names given a value anywhere inside node, with the nodes doing so"""
+    assigned: dict[str, list[ast.Node]] = {}
+    for child in ast.walk(node):
+        if isinstance(child, ast.VarAssignNode):
+            assigned.setdefault(child.var_name.value, []).append(child)
+        elif isinstance(child, (ast.FuncDefNode, ast.StructDefNode)):
+            assigned.setdefault(child.name, []).append(child)
+        elif isinstance(child, (ast.ForNode, ast.ForEachNode)):
+            assigned.setdefault(child.var_name.value, []).append(child)
+        elif isinstance(child, ast.InlinedCallNode):
+            for name in child.arg_names:
+                assigned.setdefault(name, []).append(child)
+    return assigned
+
+
+def loop_expressions(node: ast.WhileNode | ast.ForNode | ast.ForEachNode):
+    """
+    Yield (parent, attribute name, index, node) for every node run in each
+    iteration of the loop, outside of functions defined in it (they have their
+    own scope) and of values already cached. index is None if the attribute
+    is not a list
+    """
+    # the range of a for loop is only evaluated once
+    todo: list[ast.Node] = [node if isinstance(node, ast.WhileNode) else node.body]
+    while todo:
+        parent = todo.pop()
+        for name, value in vars(parent).items():
+            if isinstance(value, ast.Node):
+                children = ((None, value),)
+            elif isinstance(value, (list, tuple)):
+                children = tuple(
+                    (idx, item)
+                    for idx, item in enumerate(value)
+                    if isinstance(item, ast.Node)
+                )
+            else:
+                continue
+
+            for idx, child in children:
+                if isinstance(
+                    child, (ast.FuncDefNode, ast.LoopInvariantNode, ast.InductionNode)
+                ):
+                    continue
+                yield parent, name, idx, child
+                todo.append(child)
+
+
+def replace_child(parent: ast.Node, name: str, idx: Optional[int], node: ast.Node):
+    if idx is None:
+        setattr(parent, name, node)
+        return
+    items = list(getattr(parent, name))
+    items[idx] = node
+    setattr(parent, name, type(getattr(parent, name))(items))
+
+
+class LoopPass(OptimizationPass):
+    """Base class for passes working on loops, outermost loops first"""
+    level = 2
+    prefix = "$loop"
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def new_name(self) -> str:
+        # `$` can't start an identifier, so it can't clash with cyan code
+        self.count += 1
+        return f"{self.prefix}{self.count}"
+
+    def visit_WhileNode(self, node: ast.WhileNode) -> ast.Node:
+        self.optimize_loop(node, assigned_names(node))
+        return self.generic_visit(node)
+
+    visit_ForNode = visit_WhileNode
+    visit_ForEachNode = visit_WhileNode
+
+    def optimize_loop(
+        self,
+        node: ast.WhileNode | ast.ForNode | ast.ForEachNode,
+        assigned: dict[str, list],
+    ) -> None:
+        raise NotImplementedError
+
+
+class LoopInvariantHoisting(LoopPass):
+    """
+    Caches expressions that don't depend on any variable the loop assigns,
+    so they are evaluated once per run of the loop instead of per iteration
+    """
+    name = "loop-invariant-hoisting"
+    prefix = "$inv"
+
+    def optimize_loop(
+        self,
+        node: ast.WhileNode | ast.ForNode | ast.ForEachNode,
+        assigned: dict[str, list],
+    ) -> None:
+        hoisted = []
+        for parent, name, idx, child in self.candidates(node, assigned):
+            nodes = list(ast.walk(child))
+            callees = tuple(
+                call.node_to_call.var_name.value
+                for call in nodes
+                if isinstance(call, ast.FuncCallNode)
+            )
+            reads = tuple(
+                {
+                    var.var_name.value
+                    for var in nodes
+                    if isinstance(var, ast.VarAccessNode)
+                }
+            )
+            invariant = ast.LoopInvariantNode(self.new_name(), child, callees, reads)
+            replace_child(parent, name, idx, invariant)
+            hoisted.append(invariant.name)
+
+        if hoisted:
+            self.changes += len(hoisted)
+            node.hoisted = (*node.hoisted, *hoisted)
+
+    @staticmethod
+    def candidates(
+        node: ast.WhileNode | ast.ForNode | ast.ForEachNode, assigned: dict[str, list]
+    ):
+        """Largest invariant expressions in node that do any work"""
+        found = []
+        inside_found = set()
+        for parent, name, idx, child in loop_expressions(node):
+            if id(parent) in inside_found:
+                inside_found.add(id(child))
+                continue
+            if isinstance(
+                child, (ast.BinOpNode, ast.UnaryOpNode, ast.FuncCallNode)
+            ) and is_invariant(child, assigned):
+                found.append((parent, name, idx, child))
+                inside_found.add(id(child))
+        return found
+
+
+def is_invariant(node: ast.Node, assigned: dict[str, list]) -> bool:
+    """Whether node always gives the same value while no name in assigned changes"""
+    if isinstance(node, (ast.NumberNode, ast.StringNode, ast.LiteralNode)):
+        return True
+    if isinstance(node, ast.VarAccessNode):
+        return node.var_name.value not in assigned
+    if isinstance(node, ast.BinOpNode):
+        return is_invariant(node.left, assigned) and is_invariant(node.right, assigned)
+    if isinstance(node, ast.UnaryOpNode):
+        return is_invariant(node.node, assigned)
+    if isinstance(node, ast.FuncCallNode):
+        # if the callee turns out not to be a pure builtin, nothing is cached
+        return isinstance(node.node_to_call, ast.VarAccessNode) and all(
+            is_invariant(arg, assigned)
+            for arg in (node.node_to_call, *node.arguments)
+        )
+    return False
+
+
+def int_literal(node: ast.Node) -> Optional[int]:
+    if isinstance(node, ast.NumberNode) and node.tok.is_type(T.INT):
+        return node.tok.value
+    return None
+
+
+class StrengthReduction(LoopPass):
+    """
+    Finds induction variables, assigned only as `let i = i + c` (or `- c`) or
+    by a for loop with a constant step in a loop, and updates `i * k`, `k * i` and `i ** 2` by a constant or linear
+    step in each iteration instead of multiplying
+    """
+    name = "strength-reduction"
+    prefix = "$ind"
+
+    def optimize_loop(
+        self,
+        node: ast.WhileNode | ast.ForNode | ast.ForEachNode,
+        assigned: dict[str, list],
+    ) -> None:
+        steps = {}
+        for var_name, assignments in assigned.items():
+            if len(assignments) == 1:
+                step = self.induction_step(var_name, assignments[0])
+                if step is not None:
+                    steps[var_name] = step
+
+        if not steps:
+            return
+
+        hoisted = []
+        for parent, name, idx, child in list(loop_expressions(node)):
+            reduced = self.reduce(child, steps)
+            if reduced is not None:
+                replace_child(parent, name, idx, reduced)
+                hoisted.append(reduced.name)
+
+        if hoisted:
+            self.changes += len(hoisted)
+            node.hoisted = (*node.hoisted, *hoisted)
+
+    @staticmethod
+    def induction_step(var_name: str, node: ast.Node) -> Optional[int]:
+        if isinstance(node, ast.ForNode):
+            return 1 if node.step is None else int_literal(node.step)
+        if not isinstance(node, ast.VarAssignNode):
+            return None
+        value = node.value
+        if not (
+            isinstance(value, ast.BinOpNode)
+            and value.oper.is_type(T.PLUS, T.MINUS)
+            and isinstance(value.left, ast.VarAccessNode)
+            and value.left.var_name.value == var_name
+        ):
+            return None
+
+        step = int_literal(value.right)
+        if step is None:
+            return None
+        return -step if value.oper.is_type(T.MINUS) else step
+
+    def reduce(self, node: ast.Node, steps: dict[str, int]) -> Optional[ast.Node]:
+        if not isinstance(node, ast.BinOpNode):
+            return None
+        left, right = node.left, node.right
+
+        if node.oper.is_type(T.POW):
+            if (
+                isinstance(left, ast.VarAccessNode)
+                and left.var_name.value in steps
+                and int_literal(right) == 2
+            ):
+                var_name = left.var_name.value
+                return ast.InductionNode(
+                    self.new_name(), var_name, steps[var_name], 1, True, node
+                )
+
+        elif node.oper.is_type(T.MUL):
+            if int_literal(left) is not None:
+                left, right = right, left
+            factor = int_literal(right)
+            if (
+                factor is not None
+                and isinstance(left, ast.VarAccessNode)
+                and left.var_name.value in steps
+            ):
+                var_name = left.var_name.value
+                return ast.InductionNode(
+                    self.new_name(), var_name, steps[var_name], factor, False, node
+                )
+
+        return None
+
+
+def scope_assignments(node: ast.Node) -> dict[str, int]:
+    """How many times each name is given a value in the scope of node"""
+    counts: dict[str, int] = {}
+    todo = [node]
+    while todo:
+        node = todo.pop()
+        if isinstance(node, ast.VarAssignNode):
+            counts[node.var_name.value] = counts.get(node.var_name.value, 0) + 1
+        elif isinstance(node, (ast.ForNode, ast.ForEachNode)):
+            counts[node.var_name.value] = counts.get(node.var_name.value, 0) + 1
+        elif isinstance(node, ast.StructDefNode):
+            counts[node.name] = counts.get(node.name, 0) + 1
+        elif isinstance(node, ast.FuncDefNode):
+            counts[node.name] = counts.get(node.name, 0) + 1
+            continue  # the body is another scope
+        todo.extend(ast.iter_child_nodes(node))
+    return counts
+
+
+class FunctionInlining(OptimizationPass):
+    """
+    Replaces calls to small functions defined in the module with their body.
+    A function is inlined if it is never given another value, its body is a
+    single expression of at most max_size nodes that assigns nothing and has
+    no loops, and it can't end up calling itself
+    """
+    name = "function-inlining"
+    level = 2
+    max_size = 12
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+        # name -> (index of the statement defining it, FuncDefNode, free names)
+        self.candidates: dict[str, tuple[int, ast.FuncDefNode, frozenset]] = {}
+        self.statement_idx = 0
+        self.local_names: frozenset[str] = frozenset()
+
+    def run(self, node: ast.Node) -> ast.Node:
+        if not isinstance(node, ast.StatementsNode):
+            return node
+
+        self.candidates = self.find_candidates(node)
+        if not self.candidates:
+            return node
+
+        for idx, statement in enumerate(node.statements):
+            self.statement_idx = idx
+            node.statements[idx] = self.visit(statement)
+        return node
+
+    def find_candidates(self, module: ast.StatementsNode) -> dict:
+        assignments = scope_assignments(module)
+        candidates = {}
+
+        for idx, statement in enumerate(module.statements):
+            if not (
+                isinstance(statement, ast.FuncDefNode)
+                and assignments.get(statement.name) == 1
+                and statement.is_leaf
+                and statement.memo is None
+                and isinstance(statement.body, ast.StatementsNode)
+                and len(statement.body.statements) == 1
+            ):
+                continue
+
+            nodes = list(ast.walk(statement.body.statements[0]))
+            if len(nodes) > self.max_size or any(
+                isinstance(
+                    node,
+                    (
+                        ast.VarAssignNode,
+                        ast.StructDefNode,
+                        ast.WhileNode,
+                        ast.ForNode,
+                        ast.ForEachNode,
+                        ast.YieldNode,
+                    ),
+                )
+                for node in nodes
+            ):
+                continue
+
+            params = {param.value for param in statement.parameters}
+            free = frozenset(
+                node.var_name.value
+                for node in nodes
+                if isinstance(node, ast.VarAccessNode)
+                and node.var_name.value not in params
+            )
+            candidates[statement.name] = (idx, statement, free)
+
+        # functions that can reach themselves through calls are recursive
+        def reaches(start: str, target: str, seen: set) -> bool:
+            for name in candidates[start][2]:
+                if name == target:
+                    return True
+                if name in candidates and name not in seen:
+                    seen.add(name)
+                    if reaches(name, target, seen):
+                        return True
+            return False
+
+        return {
+            name: candidate
+            for name, candidate in candidates.items()
+            if not reaches(name, name, set())
+        }
+
+    def visit_FuncDefNode(self, node: ast.FuncDefNode) -> ast.Node:
+        outer = self.local_names
+        self.local_names = outer.union(
+            (param.value for param in node.parameters), assigned_names(node.body)
+        )
+        self.generic_visit(node)
+        self.local_names = outer
+        return node
+
+    def visit_FuncCallNode(self, node: ast.FuncCallNode) -> ast.Node:
+        self.generic_visit(node)
+        if not isinstance(node.node_to_call, ast.VarAccessNode):
+            return node
+
+        name = node.node_to_call.var_name.value
+        if name not in self.candidates:
+            return node
+
+        def_idx, func, free = self.candidates[name]
+        if (
+            # it must already be defined when the call happens
+            self.statement_idx <= def_idx
+            or len(node.arguments) != len(func.parameters)
+            # names used in the body must mean the same here as in the module
+            or name in self.local_names
+            or not free.isdisjoint(self.local_names)
+        ):
+            return node
+
+        self.count += 1
+        arg_names = tuple(
+            f"$inl{self.count}_{param.value}" for param in func.parameters
+        )
+        renames = {
+            param.value: arg_name
+            for param, arg_name in zip(func.parameters, arg_names)
+        }
+        body = copy.deepcopy(func.body.statements[0])
+        for child in ast.walk(body):
+            if isinstance(child, ast.VarAccessNode) and child.var_name.value in renames:
+                tok = child.var_name
+                child.var_name = Token(
+                    T.IDENTIFIER, renames[tok.value], tok.start_pos, tok.end_pos
+                )
+
+        self.changes += 1
+        self.notes.append(f"{name} at line {node.start_pos.line_num + 1}")
+        return ast.InlinedCallNode(name, arg_names, node.arguments, body).set_pos(
+            node.start_pos, node.end_pos
+        )
+
+
+class AutoMemoization(OptimizationPass):
+    """
+    Memoizes functions calling themselves, as those are the ones a cache can
+    save the most work for. Whether they are pure is only checked when they
+    are called, if they turn out not to be, they just aren't memoized
+    """
+    name = "auto-memoization"
+    level = 3
+
+    def visit_FuncDefNode(self, node: ast.FuncDefNode) -> ast.Node:
+        self.generic_visit(node)
+        if (
+            node.memo is not None
+            or not node.parameters
+            or not node.is_leaf
+            or node.is_generator  # each call gives a new Sequence to go through
+        ):
+            return node
+
+        callees = body_info(node.body, node.parameters).callees
+        if callees is not None and node.name in callees:
+            node.memo = "auto"
+            self.changes += 1
+            self.notes.append(node.name)
+        return node
+
+
+# (operator, type of both operands) -> (function of the raw values, result type)
+# for every operation whose result only depends on the values once types match.
+# String + String isn't one, String.operate_plus may make a rope instead
+FAST_BINARY_OPERATIONS: dict[tuple[str, type], tuple] = {
+    (T.PLUS, Number): (operator.add, Number),
+    (T.MINUS, Number): (operator.sub, Number),
+    (T.MUL, Number): (operator.mul, Number),
+    (T.DIV, Number): (operator.truediv, Number),
+    (T.POW, Number): (operator.pow, Number),
+    (T.EE, Number): (operator.eq, Bool),
+    (T.NE, Number): (operator.ne, Bool),
+    (T.LT, Number): (operator.lt, Bool),
+    (T.GT, Number): (operator.gt, Bool),
+    (T.LTE, Number): (operator.le, Bool),
+    (T.GTE, Number): (operator.ge, Bool),
+    ("and", Number): (lambda a, b: int(a and b), Bool),
+    ("or", Number): (lambda a, b: int(a or b), Bool),
+    (T.EE, String): (operator.eq, Bool),
+    (T.NE, String): (operator.ne, Bool),
+    ("and", Bool): (lambda a, b: a and b, Bool),
+    ("or", Bool): (lambda a, b: a or b, Bool),
+}
+
+# (operator, type of the operand) -> (function of the raw value, result type)
+FAST_UNARY_OPERATIONS: dict[tuple[str, type], tuple] = {
+    (T.MINUS, Number): (lambda a: a * -1, Number),
+    ("not", Number): (lambda a: int(not a), Bool),
+    ("not", Bool): (operator.not_, Bool),
+}
+
+# types whose value decides if they are truthy, like Bool(value) does
+PLAIN_TRUTH_TYPES = (Number, String, Bool, NoneObj, List, Map)
+
+# types are the classes of cyan objects, None if the type isn't known
+_NOTHING = object()  # type of a name no value was given to (yet)
+
+
+def join_types(a, b):
+    if a is _NOTHING:
+        return b
+    if b is _NOTHING or a is b:
+        return a
+    return None
+
+
+class TypeInference(OptimizationPass):
+    """
+    Infers the types of expressions, to let the interpreter skip type checks
+    of operations and conditions whose operands are known to be of one type.
+
+    A variable has a known type in a scope if every value given to it there
+    has that type. That type is only used where the variable is certain to
+    already have been given a value in the scope, as before that, reading it
+    gives the value of an outer scope, or from an earlier run of the REPL
+    """
+    name = "type-inference"
+    level = 2
+
+    def __init__(self):
+        super().__init__()
+        self.types: dict[int, Optional[type]] = {}
+        self.definite: set[int] = set()  # VarAccessNodes reading an assigned name
+
+    def run(self, node: ast.Node) -> ast.Node:
+        self.types = {}
+        self.definite = set()
+        self.infer_scope(node, ())
+
+        total = len(self.types)
+        typed = sum(1 for typ in self.types.values() if typ is not None)
+        self.notes = [
+            f"{typed} of {total} expressions typed"
+            f" ({round(100 * typed / total) if total else 100}%)"
+        ]
+        return node
+
+    def infer_scope(self, body: ast.Node, params: tuple[str, ...]) -> None:
+        # (name, value node or, if there is none, type of the value)
+        assignments: list[tuple[str, ast.Node | type]] = []
+        functions: list[ast.FuncDefNode] = []
+        self.flow(body, set(params), assignments, functions)
+
+        env: dict[str, object] = {name: None for name in params}
+        for _ in range(len(assignments) + 1):
+            changed = False
+            for name, value in assignments:
+                if isinstance(value, ast.Node):
+                    typ = self.type_of(value, env, False)
+                else:
+                    typ = value
+                new = join_types(env.get(name, _NOTHING), typ)
+                if new is not env.get(name, _NOTHING):
+                    env[name] = new
+                    changed = True
+            if not changed:
+                break
+        else:
+            # didn't settle, don't trust anything
+            env = {name: None for name in env}
+
+        self.type_of(body, env, True)
+
+        for func in functions:
+            self.infer_scope(func.body, tuple(param.value for param in func.parameters))
+
+    def flow(self, node: ast.Node, assigned: set, assignments: list, functions: list) -> set:
+        """
+        Follows the order node is run in, returns the names certainly given a
+        value after it. Collects (name, value node or type) for every value
+        given to a name in the scope, and the functions defined in it
+        """
+        if isinstance(node, ast.VarAccessNode):
+            if node.var_name.value in assigned:
+                self.definite.add(id(node))
+            return assigned
+
+        if isinstance(node, ast.VarAssignNode):
+            assigned = self.flow(node.value, assigned, assignments, functions)
+            assignments.append((node.var_name.value, node.value))
+            return assigned | {node.var_name.value}
+
+        if isinstance(node, ast.FuncDefNode):
+            assignments.append((node.name, Function))
+            functions.append(node)
+            return assigned | {node.name}
+
+        if isinstance(node, ast.StructDefNode):
+            assignments.append((node.name, Struct))
+            return assigned | {node.name}
+
+        if isinstance(node, ast.IfBlockNode):
+            assigned = self.flow(node.case[0], assigned, assignments, functions)
+            then_assigned = self.flow(node.case[1], assigned, assignments, functions)
+            else_assigned = self.flow(node.else_expr, assigned, assignments, functions)
+            return then_assigned & else_assigned
+
+        if isinstance(node, ast.WhileNode):
+            # the body may never run
+            assigned = self.flow(node.condition, assigned, assignments, functions)
+            self.flow(node.body, assigned, assignments, functions)
+            return assigned
+
+        if isinstance(node, ast.ForNode):
+            for bound in (node.start, node.end, node.step):
+                if bound is not None:
+                    assigned = self.flow(bound, assigned, assignments, functions)
+            assignments.append((node.var_name.value, Number))
+            # the body may never run, but the variable is set when it does
+            body_assigned = assigned | {node.var_name.value}
+            self.flow(node.body, body_assigned, assignments, functions)
+            return assigned
+
+        if isinstance(node, ast.ForEachNode):
+            assigned = self.flow(node.iterable, assigned, assignments, functions)
+            # items can be of any type
+            assignments.append((node.var_name.value, None))
+            body_assigned = assigned | {node.var_name.value}
+            self.flow(node.body, body_assigned, assignments, functions)
+            return assigned
+
+        if isinstance(node, ast.InlinedCallNode):
+            for arg, name in zip(node.arguments, node.arg_names):
+                assigned = self.flow(arg, assigned, assignments, functions)
+                assignments.append((name, arg))
+            assigned = assigned | set(node.arg_names)
+            return self.flow(node.body, assigned, assignments, functions)
+
+        if isinstance(node, ast.BinOpNode):
+            assigned = self.flow(node.left, assigned, assignments, functions)
+            return self.flow(node.right, assigned, assignments, functions)
+
+        if isinstance(node, ast.MapNode):
+            for key, value in zip(node.keys, node.values):
+                assigned = self.flow(key, assigned, assignments, functions)
+                assigned = self.flow(value, assigned, assignments, functions)
+            return assigned
+
+        if isinstance(node, ast.FuncCallNode):
+            assigned = self.flow(node.node_to_call, assigned, assignments, functions)
+            for arg in node.arguments:
+                assigned = self.flow(arg, assigned, assignments, functions)
+            return assigned
+
+        for child in ast.iter_child_nodes(node):
+            assigned = self.flow(child, assigned, assignments, functions)
+        return assigned
+
+    def type_of(self, node: ast.Node, env: dict, annotate: bool):
+        """
+        Type of the value of node, _NOTHING if it depends on names with no
+        values yet. With annotate, records the types and specializes node
+        """
+        if isinstance(node, ast.NumberNode):
+            typ = Number
+        elif isinstance(node, ast.StringNode):
+            typ = String
+        elif isinstance(node, ast.LiteralNode):
+            typ = NoneObj if node.tok.value == "none" else Bool
+        elif isinstance(node, ast.ListNode):
+            for element in node.elements:
+                self.type_of(element, env, annotate)
+            typ = List
+        elif isinstance(node, ast.MapNode):
+            for child in ast.iter_child_nodes(node):
+                self.type_of(child, env, annotate)
+            typ = Map
+        elif isinstance(node, ast.VarAccessNode):
+            if id(node) in self.definite:
+                typ = env.get(node.var_name.value, _NOTHING)
+            else:
+                typ = None
+        elif isinstance(node, ast.VarAssignNode):
+            typ = self.type_of(node.value, env, annotate)
+        elif isinstance(node, ast.BinOpNode):
+            typ = self.binary_type(node, env, annotate)
+        elif isinstance(node, ast.UnaryOpNode):
+            typ = self.unary_type(node, env, annotate)
+        elif isinstance(node, ast.IfBlockNode):
+            cond = self.type_of(node.case[0], env, annotate)
+            typ = join_types(
+                self.type_of(node.case[1], env, annotate),
+                self.type_of(node.else_expr, env, annotate),
+            )
+            if annotate and cond in PLAIN_TRUTH_TYPES and not node.plain_cond:
+                node.plain_cond = True
+                self.changes += 1
+        elif isinstance(node, ast.WhileNode):
+            cond = self.type_of(node.condition, env, annotate)
+            self.type_of(node.body, env, annotate)
+            typ = NoneObj
+            if annotate and cond in PLAIN_TRUTH_TYPES and not node.plain_cond:
+                node.plain_cond = True
+                self.changes += 1
+        elif isinstance(node, (ast.ForNode, ast.ForEachNode)):
+            for child in ast.iter_child_nodes(node):
+                self.type_of(child, env, annotate)
+            typ = NoneObj
+        elif isinstance(node, ast.StatementsNode):
+            types = [self.type_of(child, env, annotate) for child in node.statements]
+            # a block of many statements has no value
+            typ = types[0] if len(types) == 1 else None
+        elif isinstance(node, ast.PassNode):
+            typ = NoneObj
+        elif isinstance(node, ast.FuncDefNode):
+            typ = Function  # the body is inferred as a scope of its own
+        elif isinstance(node, ast.StructDefNode):
+            typ = Struct
+        elif isinstance(node, (ast.LoopInvariantNode, ast.InductionNode)):
+            typ = self.type_of(node.node, env, annotate)
+        elif isinstance(node, ast.InlinedCallNode):
+            for arg in node.arguments:
+                self.type_of(arg, env, annotate)
+            typ = self.type_of(node.body, env, annotate)
+        else:
+            for child in ast.iter_child_nodes(node):
+                self.type_of(child, env, annotate)
+            typ = None
+
+        if annotate and not isinstance(node, ast.StatementsNode):
+            self.types[id(node)] = None if typ is _NOTHING else typ
+        return typ
+
+    def binary_type(self, node: ast.BinOpNode, env: dict, annotate: bool):
+        left = self.type_of(node.left, env, annotate)
+        right = self.type_of(node.right, env, annotate)
+        if left is _NOTHING or right is _NOTHING:
+            return _NOTHING
+        if left is None or left is not right:
+            return None
+
+        oper = node.oper
+        fast = FAST_BINARY_OPERATIONS.get(
+            (oper.value if oper.tok_type == T.KW else oper.tok_type, left)
+        )
+        if fast is None:
+            return None
+        if annotate and node.fast is None:
+            node.fast = fast
+            self.changes += 1
+        return fast[1]
+
+    def unary_type(self, node: ast.UnaryOpNode, env: dict, annotate: bool):
+        operand = self.type_of(node.node, env, annotate)
+        if operand is _NOTHING or operand is None:
+            return operand
+
+        oper = node.oper
+        if oper.is_type(T.PLUS):
+            return operand  # unary plus gives back whatever it gets
+        fast = FAST_UNARY_OPERATIONS.get(
+            (oper.value if oper.tok_type == T.KW else oper.tok_type, operand)
+        )
+        if fast is None:
+            return None
+        if annotate and node.fast is None:
+            node.fast = fast
+            self.changes += 1
+        return fast[1]
+
+
+PASSES: list[type[OptimizationPass]] = [
+    ConstantFolding,
+    DeadBranchElimination,
+    PassElimination,
+    FunctionInlining,
+    LoopInvariantHoisting,
+    StrengthReduction,
+    AutoMemoization,
+    TypeInference,
+]
+
+
+def register_pass(cls: type[OptimizationPass]) -> type[OptimizationPass]:
+    """Class decorator adding a pass to the end of the pipeline"""
+    PASSES.append(cls)
+    return cls
+
+
+@dataclass(slots=True)
+class PassReport:
+    """What an optimization pass changed"""
+    changes: int = 0
+    notes: list[str] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        if not self.notes:
+            return str(self.changes)
+        return f"{self.changes} ({', '.join(self.notes)})"
+
+
+def optimize(
+    node: ast.Node, level: int = 1, max_rounds: int = 10
+) -> tuple[ast.Node, dict[str, PassReport]]:
+    """
+    Runs all passes of level up to the given one over node, again and again
+    for as long as they still find something to change.
+    Returns the optimized node and a report of each pass
+    """
+    report: dict[str, PassReport] = {}
+    passes = [cls() for cls in PASSES if cls.level <= level]
+
+    for _ in range(max_rounds):
+        changed = False
+        for opt_pass in passes:
+            before = opt_pass.changes
+            node = opt_pass.run(node)
+            changed = changed or opt_pass.changes != before
+        if not changed:
+            break
+
+    for opt_pass in passes:
+        report[opt_pass.name] = PassReport(opt_pass.changes, opt_pass.notes)
+    return node, report
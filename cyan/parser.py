@@ -139,6 +139,15 @@ class Parser:
             res.register_adv()
             self.advance()
             return res.success(ast.PassNode(s, e))
+
+        if self.crr_tok.is_equals(T.KW, "yield"):
+            pos_start = self.crr_tok.start_pos.copy()
+            res.register_adv()
+            self.advance()
+            value = res.register(self.expr())
+            if res.error:
+                return res
+            return res.success(ast.YieldNode(value, pos_start))
         
         return self.expr()
 
@@ -197,55 +206,135 @@ class Parser:
     def call(self):
         res = ParseResult()
 
-        atom = res.register(self.atom())
+        node = res.register(self.atom())
         if res.error:
             return res
 
-        if self.crr_tok.is_type(T.L_PAREN):
-            args = []
-            res.register_adv()
-            self.advance()
+        while self.crr_tok.is_type(T.L_PAREN, T.L_SQUARE, T.DOT):
+            if self.crr_tok.is_type(T.L_PAREN):
+                node = res.register(self.call_args(node))
+            elif self.crr_tok.is_type(T.L_SQUARE):
+                node = res.register(self.index(node))
+            else:
+                node = res.register(self.field(node))
+            if res.error:
+                return res
+
+        return res.success(node)
+
+    def call_args(self, node):
+        # self.cur_tok is L_PAREN
+        res = ParseResult()
+        args = []
+        res.register_adv()
+        self.advance()
+
+        if not self.crr_tok.is_type(T.R_PAREN):
+            arg = res.register(self.expr())
+            if res.error:
+                return res
+            args.append(arg)
+
+            while self.crr_tok.is_type(T.COMMA):
+                res.register_adv()
+                self.advance()
 
-            if not self.crr_tok.is_type(T.R_PAREN):
                 arg = res.register(self.expr())
                 if res.error:
                     return res
                 args.append(arg)
 
-                while self.crr_tok.is_type(T.COMMA):
-                    res.register_adv()
-                    self.advance()
-
-                    arg = res.register(self.expr())
-                    if res.error:
-                        return res
-                    args.append(arg)
-
-                    if self.crr_tok.is_type(T.R_PAREN):
-                        break
-                    elif not self.crr_tok.is_type(T.COMMA):
-                        return res.failure(
-                            InvalidSyntaxError(
-                                self.crr_tok.start_pos,
-                                self.crr_tok.end_pos,
-                                "Expected ',' or ')'",
-                            )
-                        )
-
-                if not self.crr_tok.is_type(T.R_PAREN):
+                if self.crr_tok.is_type(T.R_PAREN):
+                    break
+                elif not self.crr_tok.is_type(T.COMMA):
                     return res.failure(
                         InvalidSyntaxError(
-                            self.crr_tok.start_pos, self.crr_tok.end_pos, "Expected ')'"
+                            self.crr_tok.start_pos,
+                            self.crr_tok.end_pos,
+                            "Expected ',' or ')'",
                         )
                     )
-            pos_end = self.crr_tok.end_pos.copy()
-            res.register_adv()
-            self.advance()
 
-            return res.success(
-                ast.FuncCallNode(atom, args).set_pos(atom.start_pos, pos_end)
+            if not self.crr_tok.is_type(T.R_PAREN):
+                return res.failure(
+                    InvalidSyntaxError(
+                        self.crr_tok.start_pos, self.crr_tok.end_pos, "Expected ')'"
+                    )
+                )
+        pos_end = self.crr_tok.end_pos.copy()
+        res.register_adv()
+        self.advance()
+
+        return res.success(
+            ast.FuncCallNode(node, args).set_pos(node.start_pos, pos_end)
+        )
+
+    def index(self, node):
+        # self.cur_tok is L_SQUARE
+        res = ParseResult()
+        res.register_adv()
+        self.advance()
+
+        start = None
+        if not self.crr_tok.is_type(T.COLON):
+            start = res.register(self.expr())
+            if res.error:
+                return res
+
+            if self.crr_tok.is_type(T.R_SQUARE):
+                pos_end = self.crr_tok.end_pos.copy()
+                res.register_adv()
+                self.advance()
+                return res.success(
+                    ast.IndexNode(node, start).set_pos(node.start_pos, pos_end)
+                )
+
+        if not self.crr_tok.is_type(T.COLON):
+            return res.failure(
+                InvalidSyntaxError(
+                    self.crr_tok.start_pos, self.crr_tok.end_pos, "Expected ':' or ']'"
+                )
+            )
+        res.register_adv()
+        self.advance()
+
+        end = None
+        if not self.crr_tok.is_type(T.R_SQUARE):
+            end = res.register(self.expr())
+            if res.error:
+                return res
+
+        if not self.crr_tok.is_type(T.R_SQUARE):
+            return res.failure(
+                InvalidSyntaxError(
+                    self.crr_tok.start_pos, self.crr_tok.end_pos, "Expected ']'"
+                )
             )
-        return res.success(atom)
+        pos_end = self.crr_tok.end_pos.copy()
+        res.register_adv()
+        self.advance()
+
+        return res.success(
+            ast.SliceNode(node, start, end).set_pos(node.start_pos, pos_end)
+        )
+
+    def field(self, node):
+        # self.cur_tok is DOT
+        res = ParseResult()
+        res.register_adv()
+        self.advance()
+
+        if not self.crr_tok.is_type(T.IDENTIFIER):
+            return res.failure(
+                InvalidSyntaxError(
+                    self.crr_tok.start_pos, self.crr_tok.end_pos, "Expected field name"
+                )
+            )
+        field = self.crr_tok
+        res.register_adv()
+        self.advance()
+
+        return res.success(ast.FieldAccessNode(node, field))
 
     def atom(self):
         """Smallest portion of cyan grammer"""
@@ -289,6 +378,16 @@ class Parser:
             self.advance()
             return res.success(ast.StringNode(tok))
 
+        elif tok.is_type(T.L_SQUARE):
+            node = res.register(self.list_expr())
+
+            return res.success(node)
+
+        elif tok.is_type(T.L_CPAREN):
+            node = res.register(self.map_expr())
+
+            return res.success(node)
+
         elif tok.is_equals(T.KW, "if"):
             node = res.register(self.if_expr())
 
@@ -299,11 +398,38 @@ class Parser:
 
             return res.success(node)
 
+        elif tok.is_equals(T.KW, "memo"):
+            res.register_adv()
+            self.advance()
+            if not self.crr_tok.is_equals(T.KW, "fun"):
+                return res.failure(
+                    InvalidSyntaxError(
+                        self.crr_tok.start_pos, self.crr_tok.end_pos, "Expected 'fun'"
+                    )
+                )
+            node = res.register(self.func_def())
+            if res.error:
+                return res
+            node.memo = "explicit"
+            node.start_pos = tok.start_pos
+
+            return res.success(node)
+
+        elif tok.is_equals(T.KW, "struct"):
+            node = res.register(self.struct_def())
+
+            return res.success(node)
+
         elif tok.is_equals(T.KW, "while"):
             node = res.register(self.while_expr())
 
             return res.success(node)
 
+        elif tok.is_equals(T.KW, "for"):
+            node = res.register(self.for_expr())
+
+            return res.success(node)
+
         return res.failure(
             InvalidSyntaxError(
                 tok.start_pos,
@@ -312,6 +438,93 @@ class Parser:
             )
         )
 
+    def list_expr(self):
+        # self.cur_tok is L_SQUARE
+        res = ParseResult()
+        pos_start = self.crr_tok.start_pos.copy()
+        res.register_adv()
+        self.advance()
+
+        elements = []
+        if not self.crr_tok.is_type(T.R_SQUARE):
+            element = res.register(self.expr())
+            if res.error:
+                return res
+            elements.append(element)
+
+            while self.crr_tok.is_type(T.COMMA):
+                res.register_adv()
+                self.advance()
+                if self.crr_tok.is_type(T.R_SQUARE):
+                    break
+
+                element = res.register(self.expr())
+                if res.error:
+                    return res
+                elements.append(element)
+
+            if not self.crr_tok.is_type(T.R_SQUARE):
+                return res.failure(
+                    InvalidSyntaxError(
+                        self.crr_tok.start_pos,
+                        self.crr_tok.end_pos,
+                        "Expected ',' or ']'",
+                    )
+                )
+
+        pos_end = self.crr_tok.end_pos.copy()
+        res.register_adv()
+        self.advance()
+
+        return res.success(ast.ListNode(elements, pos_start, pos_end))
+
+    def map_expr(self):
+        # self.cur_tok is L_CPAREN
+        res = ParseResult()
+        pos_start = self.crr_tok.start_pos.copy()
+        res.register_adv()
+        self.advance()
+
+        keys = []
+        values = []
+        while not self.crr_tok.is_type(T.R_CPAREN):
+            key = res.register(self.expr())
+            if res.error:
+                return res
+
+            if not self.crr_tok.is_type(T.COLON):
+                return res.failure(
+                    InvalidSyntaxError(
+                        self.crr_tok.start_pos, self.crr_tok.end_pos, "Expected ':'"
+                    )
+                )
+            res.register_adv()
+            self.advance()
+
+            value = res.register(self.expr())
+            if res.error:
+                return res
+            keys.append(key)
+            values.append(value)
+
+            if self.crr_tok.is_type(T.COMMA):
+                res.register_adv()
+                self.advance()
+            elif not self.crr_tok.is_type(T.R_CPAREN):
+                return res.failure(
+                    InvalidSyntaxError(
+                        self.crr_tok.start_pos,
+                        self.crr_tok.end_pos,
+                        "Expected ',' or '}'",
+                    )
+                )
+
+        pos_end = self.crr_tok.end_pos.copy()
+        res.register_adv()
+        self.advance()
+
+        return res.success(ast.MapNode(keys, values, pos_start, pos_end))
+
     def factor(self):
         res = ParseResult()
         tok = self.crr_tok
@@ -548,6 +761,77 @@ class Parser:
             )
         )
 
+    def struct_def(self):
+        # self.cur_tok is KW:struct
+        res = ParseResult()
+        pos_start = self.crr_tok.start_pos.copy()
+        res.register_adv()
+        self.advance()
+
+        if not self.crr_tok.is_type(T.IDENTIFIER):
+            return res.failure(
+                InvalidSyntaxError(
+                    self.crr_tok.start_pos, self.crr_tok.end_pos, "Expected identifier"
+                )
+            )
+        name = self.crr_tok.value
+        res.register_adv()
+        self.advance()
+
+        if not self.crr_tok.is_type(T.L_CPAREN):
+            return res.failure(
+                InvalidSyntaxError(
+                    self.crr_tok.start_pos, self.crr_tok.end_pos, "Expected '{'"
+                )
+            )
+        res.register_adv()
+        self.advance()
+
+        # field names, separated by commas, can be on lines of their own
+        fields = []
+        while True:
+            while self.crr_tok.is_type(T.NEWLINE):
+                res.register_adv()
+                self.advance()
+            if not self.crr_tok.is_type(T.IDENTIFIER):
+                break
+
+            field = self.crr_tok
+            if any(other.value == field.value for other in fields):
+                return res.failure(
+                    InvalidSyntaxError(
+                        field.start_pos,
+                        field.end_pos,
+                        f"Field '{field.value}' is already in '{name}'",
+                    )
+                )
+            fields.append(field)
+            res.register_adv()
+            self.advance()
+
+            if not self.crr_tok.is_type(T.COMMA):
+                break
+            res.register_adv()
+            self.advance()
+
+        while self.crr_tok.is_type(T.NEWLINE):
+            res.register_adv()
+            self.advance()
+
+        if not self.crr_tok.is_type(T.R_CPAREN):
+            return res.failure(
+                InvalidSyntaxError(
+                    self.crr_tok.start_pos,
+                    self.crr_tok.end_pos,
+                    "Expected ',' or '}'" if fields else "Expected identifier or '}'",
+                )
+            )
+        pos_end = self.crr_tok.end_pos.copy()
+        res.register_adv()
+        self.advance()
+
+        return res.success(ast.StructDefNode(name, fields, pos_start, pos_end))
+
     def while_expr(self):
         # self.cur_tok is KW:while
         res = ParseResult()
@@ -587,8 +871,113 @@ class Parser:
             ast.WhileNode(cond, statements).set_pos(cond.start_pos, p_end)
         )
 
+    def for_expr(self):
+        # self.cur_tok is KW:for
+        res = ParseResult()
+        res.register_adv()
+        p_start = self.crr_tok.start_pos.copy()
+        self.advance()
+
+        if not self.crr_tok.is_type(T.IDENTIFIER):
+            return res.failure(
+                InvalidSyntaxError(
+                    self.crr_tok.start_pos, self.crr_tok.end_pos, "Expected identifier"
+                )
+            )
+        var_name = self.crr_tok
+        res.register_adv()
+        self.advance()
+
+        if not self.crr_tok.is_equals(T.KW, "in"):
+            return res.failure(
+                InvalidSyntaxError(
+                    self.crr_tok.start_pos, self.crr_tok.end_pos, "Expected 'in'"
+                )
+            )
+        res.register_adv()
+        self.advance()
+
+        start = res.register(self.arith_expr())
+        if res.error:
+            return res
+
+        # without `..`, start is something to go through, like a List
+        end = step = None
+        if self.crr_tok.is_type(T.DOT_DOT):
+            res.register_adv()
+            self.advance()
+
+            end = res.register(self.arith_expr())
+            if res.error:
+                return res
+
+        if end is not None and self.crr_tok.is_equals(T.KW, "step"):
+            res.register_adv()
+            self.advance()
+
+            step = res.register(self.arith_expr())
+            if res.error:
+                return res
+
+        if not self.crr_tok.is_type(T.L_CPAREN):
+            return res.failure(
+                InvalidSyntaxError(
+                    self.crr_tok.start_pos,
+                    self.crr_tok.end_pos,
+                    "Expected '{'" if end is not None else "Expected '..' or '{'",
+                )
+            )
+        res.register_adv()
+        self.advance()
+
+        statements = res.register(self.statements())
+        if res.error:
+            return res
+
+        if not self.crr_tok.is_type(T.R_CPAREN):
+            return res.failure(
+                InvalidSyntaxError(
+                    self.crr_tok.start_pos, self.crr_tok.end_pos, "Expected '}'"
+                )
+            )
+        p_end = self.crr_tok.end_pos.copy()
+
+        res.register_adv()
+        self.advance()
+
+        if end is None:
+            return res.success(
+                ast.ForEachNode(var_name, start, statements).set_pos(p_start, p_end)
+            )
+        return res.success(
+            ast.ForNode(var_name, start, end, step, statements).set_pos(p_start, p_end)
+        )
+
+
+def resolve_fields(node: ast.Node) -> None:
+    """
+    Gives every field access in node the slot of its field, if each struct
+    declared in node that has the field has it in the same slot. Reading it
+    from a Record then needs no lookup by name
+    """
+    slots: dict[str, set[int]] = {}
+    accesses = []
+    for child in ast.walk(node):
+        if isinstance(child, ast.StructDefNode):
+            for idx, name in enumerate(child.field_names):
+                slots.setdefault(name, set()).add(idx)
+        elif isinstance(child, ast.FieldAccessNode):
+            accesses.append(child)
+
+    for access in accesses:
+        found = slots.get(access.field_name, ())
+        if len(found) == 1:
+            (access.index,) = found
+
 
 def parse_ast(tokens):
     parser = Parser(tokens)
     res = parser.parse()
+    if res.error is None:
+        resolve_fields(res.node)
     return res.node, res.error
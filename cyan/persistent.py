@@ -0,0 +1,341 @@
+"""
+Persistent vector and hash map. Updating one gives a new version sharing
+all but O(log32 n) nodes with the old one, which stays unchanged
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Hashable, Iterable, Iterator, Optional
+
+__all__ = ("PersistentVector", "PersistentHashMap")
+
+BITS = 5
+WIDTH = 1 << BITS  # children of a node
+MASK = WIDTH - 1
+HASH_MASK = (1 << 64) - 1  # hashes are used as 64 bit unsigned integers
+
+
+class PersistentVector:
+    """
+    32-way trie of tuples holding the items, with the last (up to) 32 items
+    kept in a separate tail so appending usually only copies the tail
+    """
+    __slots__ = ("count", "shift", "root", "tail")
+
+    def __init__(
+        self, count: int = 0, shift: int = BITS, root: tuple = (), tail: tuple = ()
+    ):
+        self.count = count
+        self.shift = shift  # bits of the index used below the root
+        self.root = root
+        self.tail = tail
+
+    @classmethod
+    def from_iterable(cls, items: Iterable) -> PersistentVector:
+        """Builds the trie level by level instead of appending one by one"""
+        items = list(items)
+        count = len(items)
+        tail_offset = cls.tail_offset_of(count)
+
+        nodes = [
+            tuple(items[idx:idx + WIDTH]) for idx in range(0, tail_offset, WIDTH)
+        ]
+        shift = BITS
+        while len(nodes) > WIDTH:
+            nodes = [
+                tuple(nodes[idx:idx + WIDTH]) for idx in range(0, len(nodes), WIDTH)
+            ]
+            shift += BITS
+        return cls(count, shift, tuple(nodes), tuple(items[tail_offset:]))
+
+    @staticmethod
+    def tail_offset_of(count: int) -> int:
+        if count < WIDTH:
+            return 0
+        return ((count - 1) >> BITS) << BITS
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator:
+        for start in range(0, self.tail_offset_of(self.count), WIDTH):
+            yield from self.leaf_for(start)
+        yield from self.tail
+
+    def __getitem__(self, idx: int):
+        if not 0 <= idx < self.count:
+            raise IndexError(idx)
+        return self.leaf_for(idx)[idx & MASK]
+
+    def items_between(self, start: int, stop: int) -> Iterator:
+        """Items from index start up to stop, skipping the leaves before start"""
+        for leaf_start in range(start - (start & MASK), stop, WIDTH):
+            leaf = self.leaf_for(leaf_start)
+            yield from leaf[max(start - leaf_start, 0):stop - leaf_start]
+
+    def leaf_for(self, idx: int) -> tuple:
+        if idx >= self.tail_offset_of(self.count):
+            return self.tail
+        node = self.root
+        level = self.shift
+        while level > 0:
+            node = node[(idx >> level) & MASK]
+            level -= BITS
+        return node
+
+    def append(self, item) -> PersistentVector:
+        count = self.count
+        if count - self.tail_offset_of(count) < WIDTH:
+            tail = self.tail + (item,)
+            return PersistentVector(count + 1, self.shift, self.root, tail)
+
+        # the tail is full, it goes into the trie and a new one is started
+        shift = self.shift
+        if (count >> BITS) > (1 << shift):  # no room left under the root
+            root = (self.root, new_path(shift, self.tail))
+            shift += BITS
+        else:
+            root = self.push_tail(shift, self.root, self.tail)
+        return PersistentVector(count + 1, shift, root, (item,))
+
+    def push_tail(self, level: int, parent: tuple, tail: tuple) -> tuple:
+        sub_idx = ((self.count - 1) >> level) & MASK
+        if level == BITS:
+            child = tail
+        elif sub_idx < len(parent):
+            child = self.push_tail(level - BITS, parent[sub_idx], tail)
+        else:
+            child = new_path(level - BITS, tail)
+        return parent[:sub_idx] + (child,) + parent[sub_idx + 1:]
+
+    def set(self, idx: int, item) -> PersistentVector:
+        """New version with item at idx, appended if idx is the length"""
+        if idx == self.count:
+            return self.append(item)
+        if not 0 <= idx < self.count:
+            raise IndexError(idx)
+
+        if idx >= self.tail_offset_of(self.count):
+            pos = idx & MASK
+            tail = self.tail[:pos] + (item,) + self.tail[pos + 1:]
+            return PersistentVector(self.count, self.shift, self.root, tail)
+
+        root = set_in(self.shift, self.root, idx, item)
+        return PersistentVector(self.count, self.shift, root, self.tail)
+
+
+def new_path(level: int, node: tuple) -> tuple:
+    while level > 0:
+        node = (node,)
+        level -= BITS
+    return node
+
+
+def set_in(level: int, node: tuple, idx: int, item) -> tuple:
+    pos = (idx >> level) & MASK
+    if level == 0:
+        return node[:pos] + (item,) + node[pos + 1:]
+    child = set_in(level - BITS, node[pos], idx, item)
+    return node[:pos] + (child,) + node[pos + 1:]
+
+
+class Leaf:
+    """Entry of a PersistentHashMap"""
+    __slots__ = ("hash", "key", "value")
+
+    def __init__(self, key_hash: int, key: Hashable, value):
+        self.hash = key_hash
+        self.key = key
+        self.value = value
+
+
+class BitmapNode:
+    """
+    Node of the trie of a PersistentHashMap. Bit i of bitmap is set if there
+    is a child for the 5 hash bits i, children only has the ones there are
+    """
+    __slots__ = ("bitmap", "children")
+
+    def __init__(self, bitmap: int, children: tuple):
+        self.bitmap = bitmap
+        self.children = children  # Leaf, BitmapNode or CollisionNode
+
+
+class CollisionNode:
+    """Leaves whose keys have exactly the same hash"""
+    __slots__ = ("hash", "leaves")
+
+    def __init__(self, key_hash: int, leaves: tuple[Leaf, ...]):
+        self.hash = key_hash
+        self.leaves = leaves
+
+
+EMPTY_NODE = BitmapNode(0, ())
+
+
+class PersistentHashMap:
+    """Hash array mapped trie, branching on 5 bits of the hash per level"""
+    __slots__ = ("count", "root")
+
+    def __init__(self, count: int = 0, root: BitmapNode = EMPTY_NODE):
+        self.count = count
+        self.root = root
+
+    @classmethod
+    def from_items(cls, items: Iterable[tuple[Hashable, Any]]) -> PersistentHashMap:
+        result = cls()
+        for key, value in items:
+            result = result.assoc(key, value)
+        return result
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[tuple[Hashable, Any]]:
+        """(key, value) of every entry, in the order of their hashes"""
+        todo = [self.root]
+        while todo:
+            node = todo.pop()
+            if isinstance(node, Leaf):
+                yield node.key, node.value
+            elif isinstance(node, CollisionNode):
+                for leaf in node.leaves:
+                    yield leaf.key, leaf.value
+            else:
+                todo.extend(reversed(node.children))
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.find(key) is not None
+
+    def get(self, key: Hashable, default=None):
+        leaf = self.find(key)
+        return default if leaf is None else leaf.value
+
+    def find(self, key: Hashable) -> Optional[Leaf]:
+        key_hash = hash(key) & HASH_MASK
+        node = self.root
+        shift = 0
+        while True:
+            if isinstance(node, CollisionNode):
+                for leaf in node.leaves:
+                    if leaf.key == key:
+                        return leaf
+                return None
+
+            bit = 1 << ((key_hash >> shift) & MASK)
+            if not node.bitmap & bit:
+                return None
+            child = node.children[(node.bitmap & (bit - 1)).bit_count()]
+            if isinstance(child, Leaf):
+                return child if child.key == key else None
+            node = child
+            shift += BITS
+
+    def assoc(self, key: Hashable, value) -> PersistentHashMap:
+        """New version with key set to value"""
+        leaf = Leaf(hash(key) & HASH_MASK, key, value)
+        root, added = assoc_in(self.root, 0, leaf)
+        return PersistentHashMap(self.count + added, root)
+
+    def dissoc(self, key: Hashable) -> PersistentHashMap:
+        """New version without key, self if key isn't in it"""
+        root = dissoc_in(self.root, 0, hash(key) & HASH_MASK, key)
+        if root is self.root:
+            return self
+        if not isinstance(root, BitmapNode):  # a single entry left
+            root = assoc_in(EMPTY_NODE, 0, root)[0] if root is not None else EMPTY_NODE
+        return PersistentHashMap(self.count - 1, root)
+
+
+def assoc_in(node, shift: int, leaf: Leaf) -> tuple[Any, bool]:
+    """(new version of node with leaf in it, whether the key is new)"""
+    if isinstance(node, CollisionNode):
+        for idx, old in enumerate(node.leaves):
+            if old.key == leaf.key:
+                leaves = node.leaves[:idx] + (leaf,) + node.leaves[idx + 1:]
+                return CollisionNode(node.hash, leaves), False
+        return CollisionNode(node.hash, node.leaves + (leaf,)), True
+
+    bit = 1 << ((leaf.hash >> shift) & MASK)
+    idx = (node.bitmap & (bit - 1)).bit_count()
+    children = node.children
+
+    if not node.bitmap & bit:
+        children = children[:idx] + (leaf,) + children[idx:]
+        return BitmapNode(node.bitmap | bit, children), True
+
+    child = children[idx]
+    if isinstance(child, Leaf):
+        if child.key == leaf.key:
+            new_child, added = leaf, False
+        else:
+            new_child, added = merge_leaves(child, leaf, shift + BITS), True
+    elif isinstance(child, CollisionNode) and child.hash != leaf.hash:
+        # the new key only shares part of the hash, branch above the collision
+        new_child = assoc_in(
+            BitmapNode(1 << ((child.hash >> (shift + BITS)) & MASK), (child,)),
+            shift + BITS,
+            leaf,
+        )[0]
+        added = True
+    else:
+        new_child, added = assoc_in(child, shift + BITS, leaf)
+
+    children = children[:idx] + (new_child,) + children[idx + 1:]
+    return BitmapNode(node.bitmap, children), added
+
+
+def merge_leaves(first: Leaf, second: Leaf, shift: int):
+    if first.hash == second.hash:
+        return CollisionNode(first.hash, (first, second))
+
+    first_bits = (first.hash >> shift) & MASK
+    second_bits = (second.hash >> shift) & MASK
+    if first_bits == second_bits:
+        return BitmapNode(1 << first_bits, (merge_leaves(first, second, shift + BITS),))
+    if first_bits > second_bits:
+        first, second = second, first
+    return BitmapNode((1 << first_bits) | (1 << second_bits), (first, second))
+
+
+def dissoc_in(node, shift: int, key_hash: int, key: Hashable):
+    """
+    New version of node without key: node itself if key isn't in it, None
+    if nothing is left, the only Leaf left if node can be replaced by it
+    """
+    if isinstance(node, CollisionNode):
+        leaves = tuple(leaf for leaf in node.leaves if leaf.key != key)
+        if len(leaves) == len(node.leaves):
+            return node
+        return leaves[0] if len(leaves) == 1 else CollisionNode(node.hash, leaves)
+
+    bit = 1 << ((key_hash >> shift) & MASK)
+    if not node.bitmap & bit:
+        return node
+    idx = (node.bitmap & (bit - 1)).bit_count()
+    child = node.children[idx]
+
+    if isinstance(child, Leaf):
+        if child.key != key:
+            return node
+        new_child = None
+    else:
+        new_child = dissoc_in(child, shift + BITS, key_hash, key)
+        if new_child is child:
+            return node
+
+    if new_child is None:
+        bitmap = node.bitmap & ~bit
+        children = node.children[:idx] + node.children[idx + 1:]
+        if not children:
+            return None
+        if len(children) == 1 and isinstance(children[0], Leaf) and shift:
+            return children[0]  # the parent can hold the leaf itself
+        return BitmapNode(bitmap, children)
+
+    children = node.children[:idx] + (new_child,) + node.children[idx + 1:]
+    if len(children) == 1 and isinstance(new_child, Leaf) and shift:
+        return new_child
+    return BitmapNode(node.bitmap, children)
@@ -0,0 +1,245 @@
+"""
+Programs compiled once and run any number of times, in Sessions, for
+embedding Cyan in Python
+"""
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import TYPE_CHECKING
+
+from cyan.exceptions import CompileError, RTError
+from cyan.ffi import to_cyan, to_python
+from cyan.files import File, STDIN, STDOUT
+from cyan.interpreter import BUILTINS, Interpreter
+from cyan.optimizer import optimize
+from cyan.parser import parse_ast
+from cyan.regex import literal_patterns
+from cyan.tokenizer import tokenize
+from cyan.types import SymbolMap, Context
+from cyan.utils import Printer
+
+if TYPE_CHECKING:
+    import re
+    from typing import Any, Iterable, Iterator, Optional, TextIO
+    import cyan.ast as ast
+    from cyan.exceptions import Error
+
+__all__ = ("Program", "Session", "compile")
+
+# bindings of a batch run by a worker at a time, see Program.run_batch
+CHUNK_SIZE = 1000
+
+
+class Program:
+    """
+    Code that was tokenized, parsed and optimized, see compile. Running it
+    only walks the tree, so it can be run again and again for the cost of
+    running it alone
+    """
+    __slots__ = ("filename", "node", "patterns")
+
+    def __init__(self, filename: str, node: ast.Node):
+        self.filename = filename
+        self.node = node
+        # compiled once here, not by each interpreter it runs in
+        self.patterns: dict[str, re.Pattern] = literal_patterns(node)
+
+    def __repr__(self) -> str:
+        return f"<Program {self.filename}>"
+
+    def run(
+        self, session: Optional[Session] = None
+    ) -> tuple[Any, Optional[Error]]:
+        """
+        (Python value of the program, None), else (None, error). It runs in
+        session, or in a new Session if none is given
+        """
+        if session is None:
+            session = Session()
+        elif session.frozen:
+            raise ValueError("a frozen Session can't be run in, build one on it")
+        interpreter = session.interpreter
+        interpreter.patterns.use_literals(self.patterns)
+        # they are only kept to be reported, the functions of older runs are gone
+        interpreter.memo_caches.clear()
+
+        res = interpreter.visit(self.node, session.context)
+        if interpreter.stdout is STDOUT:
+            Printer.flush()
+
+        if res.error:
+            return None, res.error
+        return to_python(res.value), None
+
+    def run_batch(
+        self,
+        bindings: Iterable[dict[str, Any]],
+        result: Optional[str] = None,
+        base: Optional[Session] = None,
+        stdout: Optional[TextIO] = None,
+        workers: int = 0,
+        chunk_size: int = CHUNK_SIZE,
+    ) -> Iterator[tuple[Any, Optional[Error]]]:
+        """
+        (value, None) or (None, error) for each dict of bindings, in order.
+        Each runs with its bindings as globals, in a scope of its own on
+        top of base, thrown away after it. value is the Python value of the
+        global result, or of the program if not given. A binding that can't
+        be given to Cyan, or a result the program didn't set, is an error of
+        that dict of bindings. With workers, chunks of chunk_size bindings
+        are run by that many threads at once
+        """
+        bindings = iter(bindings)
+        chunks = iter(lambda: list(islice(bindings, chunk_size)), [])
+        run_chunk = partial(self.run_chunk, result=result, base=base, stdout=stdout)
+        if workers <= 0:
+            for chunk in chunks:
+                yield from run_chunk(chunk)
+            return
+
+        with ThreadPoolExecutor(workers) as pool:
+            # a few chunks ahead of the one being given, not all of them
+            running = deque()
+            for chunk in chunks:
+                running.append(pool.submit(run_chunk, chunk))
+                if len(running) > 2 * workers:
+                    yield from running.popleft().result()
+            while running:
+                yield from running.popleft().result()
+
+    def error(self, message: str, context: Context) -> RTError:
+        """Error of a run of the whole program, not of a node in it"""
+        return RTError(self.node.start_pos, self.node.end_pos, message, context)
+
+    def run_chunk(
+        self,
+        chunk: list[dict[str, Any]],
+        result: Optional[str],
+        base: Optional[Session],
+        stdout: Optional[TextIO],
+    ) -> list[tuple[Any, Optional[Error]]]:
+        """Results of run_batch for chunk, all run in one Session"""
+        session = Session(stdout, base=base)
+        interpreter = session.interpreter
+        interpreter.patterns.use_literals(self.patterns)
+
+        results = []
+        for variables in chunk:
+            interpreter.memo_caches.clear()
+            context = Context("<module>", symbol_map=SymbolMap(session.symbols))
+            # a new scope, nothing can have looked anything up in it yet
+            symbols = context.symbol_map.symbol_map
+            try:
+                for name, value in variables.items():
+                    symbols[name] = to_cyan(value)
+            except (TypeError, RecursionError) as error:
+                message = f"Binding '{name}' can't be given to Cyan: {error}"
+                results.append((None, self.error(message, context)))
+                continue
+
+            res = interpreter.visit(self.node, context)
+            if res.error:
+                results.append((None, res.error))
+            elif result is None:
+                results.append((to_python(res.value), None))
+            elif symbols.get(result) is None:
+                message = f"Result '{result}' was not set by the program"
+                results.append((None, self.error(message, context)))
+            else:
+                results.append((to_python(symbols[result]), None))
+
+        if interpreter.stdout is STDOUT:
+            Printer.flush()
+        return results
+
+
+class Session:
+    """
+    Globals that Programs run in, and the streams out and inp write to and
+    read from, stdout and stdin of the process if not given. Globals set by
+    a run are there for the next one. The interpreter, and so the patterns
+    it compiled, is kept from one run to the next.
+
+    Sessions share nothing they can change, so each can run in its own
+    thread. One Session is only run by one thread at a time. A Session can
+    be built on a base, a frozen Session: the globals of base are shared
+    without copying them, and setting one only shadows it in this Session
+    """
+    __slots__ = ("symbols", "context", "interpreter", "frozen")
+
+    def __init__(
+        self,
+        stdout: Optional[TextIO] = None,
+        stdin: Optional[TextIO] = None,
+        variables: Optional[dict[str, Any]] = None,
+        base: Optional[Session] = None,
+    ):
+        if base is not None and not base.frozen:
+            raise ValueError("a Session can only be built on a frozen Session")
+        # builtins are shared, everything set by a program is only in here
+        self.symbols = SymbolMap(BUILTINS if base is None else base.symbols)
+        self.frozen = False
+        self.context = Context("<module>", symbol_map=self.symbols)
+        stdout_file = STDOUT if stdout is None else File(stdout, "<stdout>", "w")
+        stdin_file = STDIN if stdin is None else File(stdin, "<stdin>")
+        self.symbols.set("stdout", stdout_file)
+        self.symbols.set("stdin", stdin_file)
+        self.interpreter = Interpreter(stdin=stdin_file, stdout=stdout_file)
+
+        for name, value in (variables or {}).items():
+            self.set(name, value)
+
+    def freeze(self) -> Session:
+        """
+        Makes this Session read-only, so Sessions can be built on it, see
+        Session. TypeError if a global is a value that can be changed in
+        place, like a List, as they would all share it
+        """
+        for name, value in self.symbols.symbol_map.items():
+            if value.mutable and name not in ("stdout", "stdin"):
+                raise TypeError(
+                    f"global '{name}' is a {value.type_name} that can be changed"
+                    " in place, it can't be shared"
+                )
+        self.frozen = True
+        return self
+
+    def get(self, name: str) -> Any:
+        """Python value of the global name, KeyError if there is none"""
+        value = self.symbols.get(name)
+        if value is None:
+            raise KeyError(name)
+        return to_python(value)
+
+    def set(self, name: str, value: Any) -> None:
+        """Sets the global name to the Cyan object of value, see to_cyan"""
+        if self.frozen:
+            raise ValueError("a frozen Session can't be changed")
+        self.symbols.set(name, to_cyan(value))
+
+    def run(self, program: Program | str) -> tuple[Any, Optional[Error]]:
+        """Runs program, compiling it first if it's code, see Program.run"""
+        if isinstance(program, str):
+            program = compile(program)
+        return program.run(self)
+
+
+def compile(code: str, filename: str = "<program>", opt_level: int = 0) -> Program:
+    """
+    Program of code, optimized at opt_level like the -O option does.
+    CompileError if code can't be tokenized or parsed
+    """
+    tokens, error = tokenize(filename, code)
+    if error is not None:
+        raise CompileError(error)
+
+    node, error = parse_ast(tokens)
+    if error is not None:
+        raise CompileError(error)
+
+    if opt_level > 0:
+        node, _ = optimize(node, opt_level)
+    return Program(filename, node)
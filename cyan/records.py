@@ -0,0 +1,299 @@
+"""Builtins streaming records from and to CSV and JSON lines files"""
+from __future__ import annotations
+
+import csv
+import json
+from typing import TYPE_CHECKING
+
+from cyan.exceptions import RTError, SequenceError
+from cyan.files import expect_file, source_file, source_name
+from cyan.types import (
+    Object,
+    Number,
+    String,
+    Bool,
+    NoneObj,
+    List,
+    Map,
+    PVector,
+    PMap,
+    Sequence,
+    RTResult,
+)
+
+if TYPE_CHECKING:
+    from typing import Iterable, Iterator, Optional, TextIO
+
+__all__ = (
+    "builtin_read_csv",
+    "builtin_write_csv",
+    "builtin_read_jsonl",
+    "builtin_write_jsonl",
+)
+
+# records written with one call to the file
+BATCH_SIZE = 1000
+
+
+class RecordError(Exception):
+    """Raised for a value that can't be written in a record"""
+    def __init__(self, obj: Object, message: str):
+        super().__init__(message)
+        self.obj = obj
+
+
+def read_error(source: Object, line_num: int, message: str) -> SequenceError:
+    return SequenceError(
+        RTError(
+            source.start_pos,
+            source.end_pos,
+            f"Line {line_num} of {source_name(source)}: {message}",
+            source.ctx,
+        )
+    )
+
+
+def builtin_read_csv(source: Object):
+    # csv handles the line breaks itself, including those inside of quotes
+    file, close, error = source_file(source, "read_csv", newline="")
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(Sequence(read_csv(file, source, close)))
+
+
+def read_csv(file: TextIO, source: Object, close: bool) -> Iterator[Map]:
+    """A Map for each row after the first, whose fields are the keys"""
+    reader = csv.reader(file)
+    try:
+        header = next(reader, None)
+        if header is None:
+            return
+        # hashed once, every row shares the key objects
+        keys = [String(name) for name in header]
+        hash_keys = [key.hash_key() for key in keys]
+
+        for row in reader:
+            if len(row) > len(keys):
+                raise read_error(
+                    source,
+                    reader.line_num,
+                    f"{len(row)} fields, the header only has {len(keys)}",
+                )
+            entries = dict(zip(hash_keys, zip(keys, map(String, row))))
+            # missing fields at the end of a row are none
+            for hash_key, key in zip(hash_keys[len(row):], keys[len(row):]):
+                entries[hash_key] = (key, NoneObj())
+            yield Map(entries)
+    except csv.Error as error:
+        raise read_error(source, reader.line_num, str(error))
+    except (OSError, UnicodeDecodeError) as error:
+        raise read_error(source, reader.line_num, f"can't read it, {error}")
+    finally:
+        if close:
+            file.close()
+
+
+def builtin_read_jsonl(source: Object):
+    file, close, error = source_file(source, "read_jsonl")
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(Sequence(read_jsonl(file, source, close)))
+
+
+def read_jsonl(file: TextIO, source: Object, close: bool) -> Iterator[Object]:
+    """The value on each line that isn't blank"""
+    line_num = 0
+    try:
+        for line_num, line in enumerate(file, 1):
+            if not line.isspace():
+                yield from_json(json.loads(line))
+    except json.JSONDecodeError as error:
+        raise read_error(source, line_num, f"invalid JSON, {error.msg}")
+    except (OSError, UnicodeDecodeError) as error:
+        raise read_error(source, line_num, f"can't read it, {error}")
+    finally:
+        if close:
+            file.close()
+
+
+def from_json(value) -> Object:
+    if isinstance(value, str):
+        return String(value)
+    if isinstance(value, bool):  # before int, bools are ints
+        return Bool(value)
+    if isinstance(value, (int, float)):
+        return Number(value)
+    if value is None:
+        return NoneObj()
+    if isinstance(value, list):
+        return List([from_json(item) for item in value])
+
+    entries = {}
+    for key, item in value.items():
+        key = String(key)
+        entries[key.hash_key()] = (key, from_json(item))
+    return Map(entries)
+
+
+def to_json(obj: Object, active: Optional[set[int]] = None):
+    """
+    Python value of obj for json to write. active holds the ids of the
+    Lists and Maps being converted, one that holds itself can't be written
+    """
+    kind = type(obj)
+    if kind is String or kind is Number or kind is Bool:
+        return obj.value
+    if kind is NoneObj:
+        return None
+    if kind is List or kind is Map:
+        # copies of a List or Map share its value
+        if active is None:
+            active = set()
+        elif id(obj.value) in active:
+            raise RecordError(obj, f"Can't write {obj.type_name} as JSON")
+        active.add(id(obj.value))
+        value = to_json_container(obj, kind, active)
+        active.discard(id(obj.value))
+        return value
+    if kind is PVector or kind is PMap:
+        return to_json_container(obj, kind, active)
+    raise RecordError(obj, f"Can't write {obj.type_name} as JSON")
+
+
+def to_json_container(obj: Object, kind: type, active: Optional[set[int]]):
+    if kind is List or kind is PVector:
+        return [to_json(item, active) for item in obj.value]
+
+    entries = {}
+    for key, value in obj.entries():
+        text = json_key(key)
+        if text in entries:
+            raise RecordError(key, f"Two keys of a Map are both {text!r} in JSON")
+        entries[text] = to_json(value, active)
+    return entries
+
+
+def json_key(key: Object) -> str:
+    """Text that key is written as, JSON keys are text"""
+    if type(key) is String:
+        return key.value
+    # json writes numbers, bools and none as such, as "1", "true" and "null"
+    return json.dumps(None if type(key) is NoneObj else key.value, allow_nan=False)
+
+
+def csv_field(obj: Object) -> str:
+    if isinstance(obj, String):
+        return obj.value
+    if isinstance(obj, NoneObj):
+        return ""
+    if isinstance(obj, (Number, Bool)):
+        return str(obj)
+    raise RecordError(obj, f"Can't write {obj.type_name} as a CSV field")
+
+
+def write_records(file: Object, records: Object, name: str, encode) -> RTResult:
+    """
+    Writes what encode gives for each record to file, BATCH_SIZE records
+    at a time, taking records one at a time from a Sequence
+    """
+    failed = expect_file(file, name, "w")
+    if failed is not None:
+        return failed
+    items, error = records.iterate()
+    if error is not None:
+        return RTResult().failure(error)
+
+    batch = []
+    try:
+        for text in encode(items):
+            batch.append(text)
+            if len(batch) == BATCH_SIZE:
+                file.value.write("".join(batch))
+                batch.clear()
+        file.value.write("".join(batch))
+    except SequenceError as error:
+        return RTResult().failure(error.error)
+    except RecordError as error:
+        obj = error.obj
+        return RTResult().failure(
+            RTError(
+                obj.start_pos or records.start_pos,
+                obj.end_pos or records.end_pos,
+                str(error),
+                obj.ctx or records.ctx,
+            )
+        )
+    except OSError as error:
+        return RTResult().failure(
+            RTError(
+                file.start_pos,
+                file.end_pos,
+                f"Can't write to {file}: {error.strerror}",
+                file.ctx,
+            )
+        )
+    return RTResult().success(NoneObj())
+
+
+def builtin_write_csv(file: Object, records: Object):
+    return write_records(file, records, "write_csv", encode_csv)
+
+
+def encode_csv(records: Iterable[Object]) -> Iterator[str]:
+    """
+    Lines of CSV of records, which are Lists of fields or Maps. The keys of
+    the first Map are the header, and the fields of every Map after it
+    """
+    line = LineBuffer()
+    # a file written to translates "\n" to the line break of the platform
+    writer = csv.writer(line, lineterminator="\n")
+    header = None
+    for record in records:
+        if isinstance(record, (Map, PMap)):
+            if header is None:
+                header = [key for key, _ in record.entries()]
+                writer.writerow(map(csv_field, header))
+                yield line.take()
+            # keys of the header are keys of a Map, so get can't fail
+            values = (record.get(key)[0] for key in header)
+            fields = [NoneObj() if value is None else value for value in values]
+        elif isinstance(record, (List, PVector)):
+            fields = record.value
+        else:
+            raise RecordError(
+                record,
+                f"A CSV record has to be a List or a Map, not {record.type_name}",
+            )
+        writer.writerow(map(csv_field, fields))
+        yield line.take()
+
+
+class LineBuffer:
+    """File for csv.writer to write a line to, taken back as a str"""
+    __slots__ = ("text",)
+
+    def __init__(self):
+        self.text = ""
+
+    def write(self, text: str) -> None:
+        self.text = text
+
+    def take(self) -> str:
+        return self.text
+
+
+def builtin_write_jsonl(file: Object, records: Object):
+    return write_records(file, records, "write_jsonl", encode_jsonl)
+
+
+def encode_jsonl(records: Iterable[Object]) -> Iterator[str]:
+    # to_json already stops at a List or Map that holds itself
+    encode = json.JSONEncoder(
+        ensure_ascii=False, check_circular=False, allow_nan=False
+    ).encode
+    for record in records:
+        try:
+            text = encode(to_json(record))
+        except ValueError:
+            raise RecordError(record, "Can't write NaN or Infinity as JSON")
+        yield text + "\n"
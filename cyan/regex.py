@@ -0,0 +1,213 @@
+"""Regular expression builtins, and the cache of the patterns they compile"""
+from __future__ import annotations
+
+import re
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+import cyan.ast as ast
+from cyan.exceptions import RTError
+from cyan.types import Object, String, NoneObj, List, RTResult
+
+if TYPE_CHECKING:
+    from typing import Optional
+    from cyan.interpreter import Interpreter
+
+__all__ = (
+    "PatternCache",
+    "PATTERN_CACHE_SIZE",
+    "literal_patterns",
+    "builtin_match",
+    "builtin_search",
+    "builtin_findall",
+    "builtin_sub",
+    "builtin_resplit",
+)
+
+PATTERN_CACHE_SIZE = 256
+# builtins whose first argument is a pattern
+PATTERN_BUILTINS = frozenset(("match", "search", "findall", "sub", "resplit"))
+
+
+class PatternCache:
+    """
+    LRU cache of compiled patterns of an interpreter. Patterns written as
+    literals in calls to the regex builtins are compiled before the program
+    runs and kept apart, so they are never evicted while it runs
+    """
+    __slots__ = ("max_size", "patterns", "literals", "hits", "misses")
+
+    def __init__(self, max_size: int = PATTERN_CACHE_SIZE):
+        self.max_size = max_size
+        self.patterns: OrderedDict[str, re.Pattern] = OrderedDict()
+        self.literals: dict[str, re.Pattern] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __str__(self) -> str:
+        return (
+            f"patterns: {self.hits} hits, {self.misses} misses,"
+            f" {len(self.literals)} literal, {len(self.patterns)} cached"
+        )
+
+    def compile_literals(self, node: ast.Node) -> None:
+        self.literals.update(literal_patterns(node))
+
+    def use_literals(self, literals: dict[str, re.Pattern]) -> None:
+        """
+        Uses literals, compiled by literal_patterns, instead of the ones of
+        the program that ran before, so they don't pile up in a Session
+        running many programs. literals isn't changed
+        """
+        self.literals = literals
+
+    def get(self, pattern: Object) -> tuple[Optional[re.Pattern], Optional[RTError]]:
+        """(compiled pattern, None), else (None, error)"""
+        if not isinstance(pattern, String):
+            return None, RTError(
+                pattern.start_pos,
+                pattern.end_pos,
+                f"A pattern has to be a String, not {pattern.type_name}",
+                pattern.ctx,
+            )
+
+        text = pattern.value
+        compiled = self.literals.get(text)
+        if compiled is not None:
+            self.hits += 1
+            return compiled, None
+        compiled = self.patterns.get(text)
+        if compiled is not None:
+            self.hits += 1
+            self.patterns.move_to_end(text)
+            return compiled, None
+
+        self.misses += 1
+        try:
+            compiled = re.compile(text)
+        except re.error as error:
+            return None, RTError(
+                pattern.start_pos,
+                pattern.end_pos,
+                f"Invalid pattern {pattern.value!r}: {error}",
+                pattern.ctx,
+            )
+        self.patterns[text] = compiled
+        if len(self.patterns) > self.max_size:
+            self.patterns.popitem(last=False)
+        return compiled, None
+
+
+def literal_patterns(node: ast.Node) -> dict[str, re.Pattern]:
+    """Compiled patterns written as literals in calls to the regex builtins"""
+    literals = {}
+    for child in ast.walk(node):
+        if not (
+            isinstance(child, ast.FuncCallNode)
+            and isinstance(child.node_to_call, ast.VarAccessNode)
+            and child.node_to_call.var_name.value in PATTERN_BUILTINS
+            and child.arguments
+            and isinstance(child.arguments[0], ast.StringNode)
+        ):
+            continue
+        text = child.arguments[0].tok.value
+        try:
+            literals[text] = re.compile(text)
+        except re.error:
+            pass  # it's reported when the call is run
+    return literals
+
+
+def expect_string(obj: Object, name: str) -> Optional[RTError]:
+    if isinstance(obj, String):
+        return None
+    return RTError(
+        obj.start_pos,
+        obj.end_pos,
+        f"{name}() takes a String, not {obj.type_name}",
+        obj.ctx,
+    )
+
+
+def match_groups(found: Optional[re.Match]) -> Object:
+    """List of the whole match and its groups, none if nothing matched"""
+    if found is None:
+        return NoneObj()
+    text = found.string
+    groups = []
+    for idx in range(found.re.groups + 1):
+        start, end = found.span(idx)
+        # views of the text, a group that didn't match is none
+        groups.append(NoneObj() if start == -1 else String.view(text, start, end))
+    return List(groups)
+
+
+def builtin_match(interpreter: Interpreter, pattern: Object, string: Object):
+    compiled, error = interpreter.patterns.get(pattern)
+    if error is None:
+        error = expect_string(string, "match")
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(match_groups(compiled.match(string.value)))
+
+
+def builtin_search(interpreter: Interpreter, pattern: Object, string: Object):
+    compiled, error = interpreter.patterns.get(pattern)
+    if error is None:
+        error = expect_string(string, "search")
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(match_groups(compiled.search(string.value)))
+
+
+def builtin_findall(interpreter: Interpreter, pattern: Object, string: Object):
+    compiled, error = interpreter.patterns.get(pattern)
+    if error is None:
+        error = expect_string(string, "findall")
+    if error is not None:
+        return RTResult().failure(error)
+
+    # the group of each match if the pattern has one, a List of them if more
+    found = compiled.findall(string.value)
+    if compiled.groups > 1:
+        items = [List([String(group) for group in groups]) for groups in found]
+    else:
+        items = [String(text) for text in found]
+    return RTResult().success(List(items))
+
+
+def builtin_sub(
+    interpreter: Interpreter, pattern: Object, replacement: Object, string: Object
+):
+    compiled, error = interpreter.patterns.get(pattern)
+    if error is None:
+        error = expect_string(replacement, "sub") or expect_string(string, "sub")
+    if error is not None:
+        return RTResult().failure(error)
+
+    try:
+        text = compiled.sub(replacement.value, string.value)
+    except re.error as error:  # a bad group reference in replacement
+        return RTResult().failure(
+            RTError(
+                replacement.start_pos,
+                replacement.end_pos,
+                f"Invalid replacement {replacement.value!r}: {error}",
+                replacement.ctx,
+            )
+        )
+    return RTResult().success(String(text))
+
+
+def builtin_resplit(interpreter: Interpreter, pattern: Object, string: Object):
+    compiled, error = interpreter.patterns.get(pattern)
+    if error is None:
+        error = expect_string(string, "resplit")
+    if error is not None:
+        return RTResult().failure(error)
+
+    # a group in the pattern is kept in the parts, none if it didn't match
+    parts = compiled.split(string.value)
+    return RTResult().success(
+        List([NoneObj() if part is None else String(part) for part in parts])
+    )
@@ -0,0 +1,256 @@
+"""Builtins making lazy Sequences, whose items are only made when taken"""
+from __future__ import annotations
+
+from functools import partial
+from inspect import getgeneratorstate, GEN_CREATED
+from typing import TYPE_CHECKING
+
+from cyan.exceptions import RTError, SequenceError
+from cyan.files import source_file, source_name
+from cyan.types import (
+    Object,
+    Number,
+    String,
+    NoneObj,
+    Sequence,
+    Function,
+    BuiltInFunction,
+    RTResult,
+)
+from cyan.utils import Printer
+
+if TYPE_CHECKING:
+    from typing import Callable, Iterator, Optional, TextIO
+    from cyan.interpreter import Interpreter
+
+__all__ = (
+    "Pipeline",
+    "builtin_range",
+    "builtin_lines",
+    "builtin_map",
+    "builtin_filter",
+    "builtin_take",
+    "builtin_reduce",
+)
+
+# kinds of stages of a Pipeline
+MAP, FILTER, TAKE = range(3)
+
+
+def builtin_range(start: Object, end: Object):
+    for bound in (start, end):
+        if not (isinstance(bound, Number) and type(bound.value) is int):
+            return RTResult().failure(
+                RTError(
+                    bound.start_pos,
+                    bound.end_pos,
+                    f"Range bounds must be integers, got {bound}",
+                    bound.ctx,
+                )
+            )
+    numbers = (Number(i) for i in range(start.value, end.value))
+    return RTResult().success(Sequence(numbers))
+
+
+def builtin_lines(source: Object):
+    file, close, error = source_file(source, "lines")
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(Sequence(read_lines(file, source, close)))
+
+
+def read_lines(file: TextIO, source: Object, close: bool) -> Iterator[String]:
+    """Lines of file without their line breaks, only one is kept in memory"""
+    # a prompt has to be seen before waiting for a line typed in
+    interactive = file.isatty()
+    try:
+        while True:
+            if interactive:
+                Printer.flush()
+            line = file.readline()
+            if not line:
+                return
+            yield String(line[:-1] if line[-1] == "\n" else line)
+    except (OSError, UnicodeDecodeError, ValueError) as error:
+        raise SequenceError(
+            RTError(
+                source.start_pos,
+                source.end_pos,
+                f"Can't read {source_name(source)}: {error}",
+                source.ctx,
+            )
+        )
+    finally:
+        if close:
+            file.close()
+
+
+class Pipeline(Sequence):
+    """
+    Sequence of map, filter and take stages over the items of source. A stage
+    added to a Pipeline makes a new one over the same source, so all stages
+    run in one loop, without a Sequence in between each of them
+    """
+    def __init__(
+        self,
+        value: Iterator[Object],
+        source: Iterator[Object],
+        stages: tuple[tuple[int, Callable | int], ...],
+        counts: tuple[Optional[list[int]], ...],
+    ):
+        super().__init__(value)
+        self.source = source
+        # (MAP or FILTER, function called with an item) or (TAKE, count)
+        self.stages = stages
+        # [items left] of each TAKE stage, None for the others, see run_stages
+        self.counts = counts
+
+    def copy(self) -> Pipeline:
+        copy = Pipeline(self.value, self.source, self.stages, self.counts)
+        copy.set_pos(self.start_pos, self.end_pos)
+        copy.set_context(self.ctx)
+        return copy
+
+
+def run_stages(
+    source: Iterator[Object],
+    stages: tuple[tuple[int, Callable | int], ...],
+    counts: tuple[Optional[list[int]], ...],
+) -> Iterator[Object]:
+    """
+    Items of source after stages. The items left of a take are shared with
+    the Pipelines made from the same one, so that taking items from either
+    counts for both, like if each was a Sequence over the one before. An
+    item more isn't taken from source once one of them is used up
+    """
+    takes = [count for count in counts if count is not None]
+    for count in takes:
+        if count[0] <= 0:
+            return
+
+    for item in source:
+        for (kind, stage), count in zip(stages, counts):
+            if kind == MAP:
+                item = stage(item)
+            elif kind == FILTER:
+                if not stage(item).is_truthy():
+                    break
+            else:
+                count[0] -= 1
+        else:
+            yield item
+        for count in takes:
+            if count[0] <= 0:
+                return
+
+
+def add_stage(
+    items: Object, kind: int, stage: Callable | int
+) -> tuple[Optional[Pipeline], Optional[RTError]]:
+    """(Pipeline giving the items after stage, None), else (None, error)"""
+    count = [stage] if kind == TAKE else None
+    if isinstance(items, Pipeline) and getgeneratorstate(items.value) == GEN_CREATED:
+        # nothing was taken from it yet, so its stages can run in the new one
+        source = items.source
+        stages = (*items.stages, (kind, stage))
+        counts = (*items.counts, count)
+    else:
+        source, error = items.iterate()
+        if error is not None:
+            return None, error
+        stages = ((kind, stage),)
+        counts = (count,)
+    return Pipeline(run_stages(source, stages, counts), source, stages, counts), None
+
+
+def caller(
+    interpreter: Interpreter, fn: Object, n_args: int, name: str
+) -> tuple[Optional[Callable], Optional[RTError]]:
+    """
+    (function calling fn with n_args items, None), else (None, error). It
+    raises SequenceError if the call fails. Builtins are called directly,
+    without going through call_function
+    """
+    if not (
+        isinstance(fn, (Function, BuiltInFunction)) and fn.signature.accepts(n_args)
+    ):
+        return None, RTError(
+            fn.start_pos,
+            fn.end_pos,
+            f"{name}() takes a function of {n_args} argument"
+            f"{'' if n_args == 1 else 's'}, not {fn}",
+            fn.ctx,
+        )
+
+    if isinstance(fn, BuiltInFunction):
+        function = fn.function
+        if fn.takes_interpreter:
+            function = partial(function, interpreter)
+    else:
+        call_function = interpreter.call_function
+
+        def function(*args):
+            return call_function(fn, args)
+
+    def call(*args):
+        res = function(*args)
+        if res.error:
+            if res.error.start_pos is None:  # set to the call, there is none here
+                res.error.set_pos(fn.start_pos, fn.end_pos)
+            raise SequenceError(res.error)
+        # a body of many statements has no value
+        return NoneObj() if res.value is None else res.value
+
+    return call, None
+
+
+def builtin_map(interpreter: Interpreter, fn: Object, items: Object):
+    call, error = caller(interpreter, fn, 1, "map")
+    if error is None:
+        pipeline, error = add_stage(items, MAP, call)
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(pipeline)
+
+
+def builtin_filter(interpreter: Interpreter, fn: Object, items: Object):
+    call, error = caller(interpreter, fn, 1, "filter")
+    if error is None:
+        pipeline, error = add_stage(items, FILTER, call)
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(pipeline)
+
+
+def builtin_take(count: Object, items: Object):
+    if not (isinstance(count, Number) and type(count.value) is int):
+        return RTResult().failure(
+            RTError(
+                count.start_pos,
+                count.end_pos,
+                f"take() takes an integer count, got {count}",
+                count.ctx,
+            )
+        )
+    pipeline, error = add_stage(items, TAKE, count.value)
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(pipeline)
+
+
+def builtin_reduce(
+    interpreter: Interpreter, fn: Object, items: Object, initial: Object
+):
+    call, error = caller(interpreter, fn, 2, "reduce")
+    if error is None:
+        items, error = items.iterate()
+    if error is not None:
+        return RTResult().failure(error)
+
+    value = initial
+    try:
+        for item in items:
+            value = call(value, item)
+    except SequenceError as error:
+        return RTResult().failure(error.error)
+    return RTResult().success(value)
@@ -0,0 +1,145 @@
+"""Builtins working on Strings, done by Python's str methods"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from cyan.exceptions import RTError
+from cyan.types import Object, Bool, Number, String, List, PVector, RTResult
+
+if TYPE_CHECKING:
+    from typing import Optional
+
+__all__ = (
+    "builtin_find",
+    "builtin_split",
+    "builtin_replace",
+    "builtin_upper",
+    "builtin_lower",
+    "builtin_strip",
+    "builtin_startswith",
+    "builtin_endswith",
+    "builtin_join",
+)
+
+
+def expect_strings(name: str, *objs: Object) -> Optional[RTError]:
+    for obj in objs:
+        if not isinstance(obj, String):
+            return RTError(
+                obj.start_pos,
+                obj.end_pos,
+                f"{name}() takes Strings, not {obj.type_name}",
+                obj.ctx,
+            )
+    return None
+
+
+def builtin_find(string: Object, sub: Object):
+    error = expect_strings("find", string, sub)
+    if error is not None:
+        return RTResult().failure(error)
+    # searched in place, so finding in a slice doesn't copy it
+    text, start, stop = string.span()
+    idx = text.find(sub.value, start, stop)
+    return RTResult().success(Number(idx if idx == -1 else idx - start))
+
+
+def builtin_split(string: Object, sep: Object):
+    error = expect_strings("split", string, sep)
+    if error is not None:
+        return RTResult().failure(error)
+    if not sep.value:
+        return RTResult().failure(
+            RTError(
+                sep.start_pos, sep.end_pos, "Can't split by an empty String", sep.ctx
+            )
+        )
+
+    # the pieces are views of the text, none of it is copied
+    text, start, stop = string.span()
+    sep = sep.value
+    pieces = []
+    while (end := text.find(sep, start, stop)) != -1:
+        pieces.append(String.view(text, start, end))
+        start = end + len(sep)
+    pieces.append(String.view(text, start, stop))
+    return RTResult().success(List(pieces))
+
+
+def builtin_replace(string: Object, old: Object, new: Object):
+    error = expect_strings("replace", string, old, new)
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(String(string.value.replace(old.value, new.value)))
+
+
+def builtin_upper(string: Object):
+    error = expect_strings("upper", string)
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(String(string.value.upper()))
+
+
+def builtin_lower(string: Object):
+    error = expect_strings("lower", string)
+    if error is not None:
+        return RTResult().failure(error)
+    return RTResult().success(String(string.value.lower()))
+
+
+def builtin_strip(string: Object):
+    error = expect_strings("strip", string)
+    if error is not None:
+        return RTResult().failure(error)
+
+    text, start, stop = string.span()
+    while start < stop and text[start].isspace():
+        start += 1
+    while stop > start and text[stop - 1].isspace():
+        stop -= 1
+    return RTResult().success(String.view(text, start, stop))
+
+
+def builtin_startswith(string: Object, prefix: Object):
+    error = expect_strings("startswith", string, prefix)
+    if error is not None:
+        return RTResult().failure(error)
+    text, start, stop = string.span()
+    return RTResult().success(Bool(text.startswith(prefix.value, start, stop)))
+
+
+def builtin_endswith(string: Object, suffix: Object):
+    error = expect_strings("endswith", string, suffix)
+    if error is not None:
+        return RTResult().failure(error)
+    text, start, stop = string.span()
+    return RTResult().success(Bool(text.endswith(suffix.value, start, stop)))
+
+
+def builtin_join(items: Object, sep: Object):
+    error = expect_strings("join", sep)
+    if error is not None:
+        return RTResult().failure(error)
+    if not isinstance(items, (List, PVector)):
+        return RTResult().failure(
+            RTError(
+                items.start_pos,
+                items.end_pos,
+                f"join() takes a List or a PVector, not {items.type_name}",
+                items.ctx,
+            )
+        )
+
+    pieces = []
+    for item in items.value:
+        if not isinstance(item, String):
+            return RTResult().failure(
+                RTError(
+                    items.start_pos,
+                    items.end_pos,
+                    f"join() can only join Strings, not {item.type_name}",
+                    items.ctx,
+                )
+            )
+        pieces.append(item.value)
+    return RTResult().success(String(sep.value.join(pieces)))
@@ -12,6 +12,8 @@ CHAR_TOKEN_MAP: dict[str, str] = {
     ")": T.R_PAREN,
     "{": T.L_CPAREN,
     "}": T.R_CPAREN,
+    "[": T.L_SQUARE,
+    "]": T.R_SQUARE,
     ":": T.COLON,
     ";": T.SEMI_COLON,
     ",": T.COMMA,
@@ -19,7 +21,10 @@ CHAR_TOKEN_MAP: dict[str, str] = {
 
 LITERALS = frozenset(["true", "false", "none"])
 KEYWORDS = frozenset(
-    ["let", "and", "or", "not", "if", "then", "elif", "else", "while", "fun", "pass"]
+    [
+        "let", "and", "or", "not", "if", "then", "elif", "else", "while", "fun",
+        "memo", "pass", "for", "in", "step", "yield", "struct",
+    ]
 )
 
 TokenResult = tuple[Token, None] | tuple[None, InvalidSyntaxError]
@@ -47,6 +52,10 @@ class Tokenizer:
 
         self.char = self.text[self.pos.idx]
 
+    def next_char(self) -> str | None:
+        idx = self.pos.idx + 1
+        return self.text[idx] if idx < self.text_length else None
+
     def get_number(self) -> Token:
         num_str = ""
         dot_count = 0
@@ -54,7 +63,7 @@ class Tokenizer:
 
         while self.char is not None and self.char.isnumeric() or self.char == ".":
             if self.char == ".":
-                if dot_count == 1:
+                if dot_count == 1 or self.next_char() == ".":  # 1..2 is a range
                     break
                 dot_count += 1
                 num_str += "."
@@ -109,6 +118,17 @@ class Tokenizer:
         self.advance()
         return None, InvalidSyntaxError(start_pos, self.pos.copy(), "Invalid Syntax")
 
+    def get_dot(self) -> Token:
+        tok_type = T.DOT
+        start_pos = self.pos.copy()
+        self.advance()
+
+        if self.char == ".":
+            tok_type = T.DOT_DOT
+            self.advance()
+
+        return Token(tok_type, start_pos=start_pos, end_pos=self.pos.copy())
+
     def get_equals(self) -> Token:
         tok_type = T.EQ
         start_pos = self.pos.copy()
@@ -188,6 +208,9 @@ class Tokenizer:
                 if error is not None:
                     return [], error
                 tokens.append(token)
+            elif self.char == ".":
+                tokens.append(self.get_dot())
+                continue
             elif self.char == "=":
                 tokens.append(self.get_equals())
             elif self.char == "<":
@@ -29,6 +29,8 @@ class T:
     R_PAREN = "R_PAREN"  # )
     L_CPAREN = "L_CPAREN"  # {
     R_CPAREN = "R_CPAREN"  # }
+    L_SQUARE = "L_SQUARE"  # [
+    R_SQUARE = "R_SQUARE"  # ]
 
     LITERAL = "LITERAL"        # literal value like true, false and none
     IDENTIFIER = "IDENTIFIER"  # constructed only with english alphabets
@@ -37,6 +39,8 @@ class T:
     COLON = "COLON"  # :
     SEMI_COLON = "SEMI_COLON"  # ;
     COMMA = "COMMA"            # ,
+    DOT = "DOT"                # .
+    DOT_DOT = "DOT_DOT"        # ..
     NEWLINE = "NEWLINE"        # \n
 
     EOF = "EOF"  # end of file
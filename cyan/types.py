@@ -2,14 +2,20 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import cached_property, wraps
+from itertools import islice
+from threading import get_ident
 from typing import TYPE_CHECKING
-from cyan.exceptions import RTError
+from cyan.exceptions import RTError, SequenceError
+from cyan.persistent import PersistentVector, PersistentHashMap
+from cyan.tokens import T
 
 if TYPE_CHECKING:
-    from typing import Optional, TypeVar, Any, TypeAlias, Callable
+    from typing import Optional, TypeVar, Any, TypeAlias, Callable, Iterable, Iterator
     from cyan.ast import Node
     from cyan.tokens import Token
     from cyan.utils import Pos
+    from cyan.memo import MemoCache
 
     ObjectSelf = TypeVar("ObjectSelf", bound="Object")
     OperationResult: TypeAlias = tuple[ObjectSelf, None]
@@ -19,6 +25,7 @@ if TYPE_CHECKING:
 
 
 __all__ = (
+    "BINARY_OPERATIONS",
     "RTResult",
     "Context",
     "SymbolMap",
@@ -26,11 +33,39 @@ __all__ = (
     "Bool",
     "Number",
     "String",
+    "List",
+    "Map",
+    "PVector",
+    "PMap",
+    "Sequence",
+    "Record",
     "Function",
     "BuiltInFunction",
+    "Struct",
+    "StructType",
+    "CallSignature",
+    "InlineCache",
 )
 
 
+# operator token type (or keyword) -> Object method implementing it
+BINARY_OPERATIONS: dict[str, str] = {
+    T.PLUS: "operate_plus",
+    T.MINUS: "operate_minus",
+    T.MUL: "operate_mul",
+    T.DIV: "operate_div",
+    T.POW: "operate_pow",
+    T.EE: "compare_eq",
+    T.NE: "compare_ne",
+    T.LT: "compare_lt",
+    T.GT: "compare_gt",
+    T.LTE: "compare_lte",
+    T.GTE: "compare_gte",
+    "and": "logic_and",
+    "or": "logic_or",
+}
+
+
 class RTResult:
     """Run-Time Result, used with Interpreter"""
     __slots__ = ("value", "error")
@@ -59,6 +94,10 @@ class Object:
     ctx: Optional[Context] = None
     start_pos: Optional[Pos] = None
     end_pos: Optional[Pos] = None
+    # whether the value can change after creation, values of mutable objects
+    # are shared by their copies and can't be cached by the optimizer
+    mutable = False
+    hashable = False  # whether it can be a key of a Map
 
     def __init__(self, name="Object"):
         self.type_name: str = name
@@ -96,6 +135,17 @@ class Object:
     def is_truthy(self) -> Bool:
         return Bool(True)
 
+    def equals(self, other: Object) -> bool:
+        """Whether self and other are the same type and have the same value"""
+        return type(self) is type(other) and self.value == other.value
+
+    def hash_key(self) -> Optional[tuple]:
+        """
+        Key standing for self in a dict, keys of objects that equal each
+        other are the same. None if self can't be a key
+        """
+        return (type(self), self.value) if self.hashable else None
+
     # arithmetic operations
     def operate_plus(self, other) -> OperationResult | OperationError:
         return self.operation_not_supported("+ operator", other)
@@ -141,6 +191,44 @@ class Object:
     def logic_not(self) -> BooleanOperationResult | OperationError:
         return self.operation_not_supported("'not' logic", self)
 
+    # indexing
+    def get_index(self, index: Object) -> OperationResult | OperationError:
+        return None, RTError(
+            self.start_pos, self.end_pos, f"{self.type_name} can't be indexed", self.ctx
+        )
+
+    def get_slice(
+        self, start: Optional[Object], end: Optional[Object]
+    ) -> OperationResult | OperationError:
+        return None, RTError(
+            self.start_pos, self.end_pos, f"{self.type_name} can't be sliced", self.ctx
+        )
+
+    def get_field(
+        self, name: str, index: Optional[int] = None
+    ) -> OperationResult | OperationError:
+        """Value of the field name, index is the slot it's likely to be in"""
+        return None, RTError(
+            self.start_pos, self.end_pos, f"{self.type_name} has no fields", self.ctx
+        )
+
+    def iterate(self) -> tuple[Iterator[Object], None] | OperationError:
+        """Iterator of the items a for loop goes through"""
+        return None, RTError(
+            self.start_pos, self.end_pos, f"{self.type_name} is not iterable", self.ctx
+        )
+
+    def reflect(self, method: str, other: Object) -> OperationResult | OperationError:
+        """
+        Does the operation of method with self on the left for other types
+        that know how to (like a Vector broadcasting a Number), through their
+        reflected_<method>. Makes the not supported error if other doesn't
+        """
+        reflected = getattr(other, f"reflected_{method}", None)
+        if reflected is None:
+            return getattr(Object, method)(self, other)
+        return reflected(self)
+
     def operation_not_supported(self, operation: str, other: Object) -> OperationError:
         return None, RTError(
             self.start_pos,
@@ -151,6 +239,8 @@ class Object:
 
 
 class NoneObj(Object):
+    hashable = True
+
     def __init__(self):
         super().__init__("NoneObj")
 
@@ -166,6 +256,8 @@ class NoneObj(Object):
 
 
 class Bool(Object):
+    hashable = True
+
     def __init__(self, value):
         super().__init__("Bool")
         self.value: bool = bool(value)
@@ -199,6 +291,8 @@ class Bool(Object):
 
 
 class Number(Object):
+    hashable = True
+
     def __init__(self, value):
         super().__init__("Number")
         self.value = value
@@ -235,19 +329,19 @@ class Number(Object):
         if self.is_same_type(other):
             return Number(self.value + other.value).set_context(self.ctx), None
         else:
-            return Object.operate_plus(self, other)  # makes not supported error
+            return self.reflect("operate_plus", other)
 
     def operate_minus(self, other: Number):
         if self.is_same_type(other):
             return Number(self.value - other.value).set_context(self.ctx), None
         else:
-            return Object.operate_minus(self, other)  # makes not supported error
+            return self.reflect("operate_minus", other)
 
     def operate_mul(self, other: Number):
         if self.is_same_type(other):
             return Number(self.value * other.value).set_context(self.ctx), None
         else:
-            return Object.operate_mul(self, other)  # makes not supported error
+            return self.reflect("operate_mul", other)
 
     def operate_div(self, other: Number):
         if self.is_same_type(other):
@@ -257,50 +351,50 @@ class Number(Object):
                 )
             return Number(self.value / other.value).set_context(self.ctx), None
         else:
-            return Object.operate_div(self, other)  # makes not supported error
+            return self.reflect("operate_div", other)
 
     def operate_pow(self, other: Number):
         if self.is_same_type(other):
             return Number(self.value**other.value).set_context(self.ctx), None
         else:
-            return Object.operate_pow(self, other)  # makes not supported error
+            return self.reflect("operate_pow", other)
 
     # boolean operations
     def compare_eq(self, other: Number):
         if self.is_same_type(other):
             return Bool(self.value == other.value).set_context(self.ctx), None
         else:
-            return Object.compare_eq(self, other)  # makes not supported error
+            return self.reflect("compare_eq", other)
 
     def compare_ne(self, other: Number):
         if self.is_same_type(other):
             return Bool(self.value != other.value).set_context(self.ctx), None
         else:
-            return Object.compare_ne(self, other)  # makes not supported error
+            return self.reflect("compare_ne", other)
 
     def compare_gt(self, other: Number):
         if self.is_same_type(other):
             return Bool(self.value > other.value).set_context(self.ctx), None
         else:
-            return Object.compare_gt(self, other)  # makes not supported error
+            return self.reflect("compare_gt", other)
 
     def compare_lt(self, other: Number):
         if self.is_same_type(other):
             return Bool(self.value < other.value).set_context(self.ctx), None
         else:
-            return Object.compare_lt(self, other)  # makes not supported error
+            return self.reflect("compare_lt", other)
 
     def compare_gte(self, other: Number):
         if self.is_same_type(other):
             return Bool(self.value >= other.value).set_context(self.ctx), None
         else:
-            return Object.compare_gte(self, other)  # makes not supported error
+            return self.reflect("compare_gte", other)
 
     def compare_lte(self, other: Number):
         if self.is_same_type(other):
             return Bool(self.value <= other.value).set_context(self.ctx), None
         else:
-            return Object.compare_lte(self, other)  # makes not supported error
+            return self.reflect("compare_lte", other)
 
     # logical operations
     def logic_and(self, other: Number):
@@ -320,10 +414,61 @@ class Number(Object):
 
 
 class String(Object):
+    """
+    Text. A String made by `+` of long strings is a rope: the pieces are
+    kept in a list and only joined when value is first needed, so adding
+    to a String in a loop doesn't copy all of it every time. A slice is a
+    view of the text it was cut from, only copied when value is needed
+    """
+    hashable = True
+    # pieces of a rope, shared with the ropes made by adding to it. This one
+    # is made of the first n_parts of them, so it never sees later pieces
+    parts: Optional[list[str]] = None
+    n_parts = 0
+    # a view is source[start:start + length]
+    source: Optional[str] = None
+    start = 0
+    length: Optional[int] = None  # of ropes and views, known before joining
+
     def __init__(self, value: str):
         super().__init__("String")
         self.value = value
 
+    @classmethod
+    def rope(cls, parts: list[str], n_parts: int, length: int) -> String:
+        string = cls.__new__(cls)
+        Object.__init__(string, "String")
+        string.parts = parts
+        string.n_parts = n_parts
+        string.length = length
+        return string
+
+    @classmethod
+    def view(cls, source: str, start: int, stop: int) -> String:
+        string = cls.__new__(cls)
+        Object.__init__(string, "String")
+        string.source = source
+        string.start = start
+        string.length = stop - start
+        return string
+
+    @cached_property
+    def value(self) -> str:
+        # only called for ropes and views, other Strings set value when made
+        if self.source is not None:
+            return self.source[self.start:self.start + self.length]
+        return "".join(islice(self.parts, self.n_parts))
+
+    def __len__(self) -> int:
+        return len(self.value) if self.length is None else self.length
+
+    def span(self) -> tuple[str, int, int]:
+        """(text, start, stop) such that self is text[start:stop], no copying"""
+        if self.source is not None:
+            return self.source, self.start, self.start + self.length
+        value = self.value
+        return value, 0, len(value)
+
     def __repr__(self) -> str:
         return f"'{self.value}'"
 
@@ -337,12 +482,18 @@ class String(Object):
         if obj is None:
             value = ""
         elif isinstance(obj, String):
-            value = obj.value
+            return res.success(obj.copy().set_pos(None, None))
         else:
-            value = obj
+            value = str(obj)
 
         return res.success(String(value))
 
+    def copy(self) -> ObjectSelf:
+        # shares the rope or view, and value if it was already joined
+        copy = object.__new__(String)
+        vars(copy).update(vars(self))
+        return copy
+
     def is_truthy(self) -> Bool:
         return Bool(self.value)
 
@@ -369,11 +520,30 @@ class String(Object):
 
     # arithmetic operations
     def operate_plus(self, other: String):
-        if self.is_same_type(other):
-            return String(self.value + other.value).set_context(self.ctx), None
-        else:
+        if not self.is_same_type(other):
             return Object.operate_plus(self, other)
 
+        length = len(self) + len(other)
+        value = other.value
+        if self.parts is None:
+            if length < ROPE_MIN_LENGTH:
+                return String(self.value + value).set_context(self.ctx), None
+            parts = [self.value, value]
+            return String.rope(parts, 2, length).set_context(self.ctx), None
+
+        parts = self.parts
+        n_parts = self.n_parts
+        in_place = len(parts) == n_parts  # nothing was added to self yet
+        if in_place:
+            # another thread can add to the same rope at once, only the String
+            # whose piece lands right after self's gets the rope
+            parts.append(value)
+            in_place = parts[n_parts] is value
+        if not in_place:
+            parts = parts[:n_parts]
+            parts.append(value)
+        return String.rope(parts, n_parts + 1, length).set_context(self.ctx), None
+
     # boolean operations
     def compare_eq(self, other: String):
         return Bool(self.value == other.value).set_context(self.ctx), None
@@ -381,22 +551,648 @@ class String(Object):
     def compare_ne(self, other: String):
         return Bool(self.value != other.value).set_context(self.ctx), None
 
+    # indexing
+    def get_index(self, index: Object):
+        length = len(self)
+        idx, error = index_value(self, index, length)
+        if error is not None:
+            return None, error
+        text, offset, _ = self.span()
+        return String(text[offset + idx % length]).set_context(self.ctx), None
+
+    def get_slice(self, start: Optional[Object], end: Optional[Object]):
+        bounds, error = slice_bounds(start, end)
+        if error is not None:
+            return None, error
+        first, stop, _ = bounds.indices(len(self))
+        text, offset, _ = self.span()
+        view = String.view(text, offset + first, offset + max(first, stop))
+        return view.set_context(self.ctx), None
+
+    def iterate(self):
+        return (String(char) for char in self.value), None
+
+
+# Strings at least this long are added as ropes, shorter ones are just copied
+ROPE_MIN_LENGTH = 256
+
+
+def recursive_str(placeholder: str):
+    """
+    Makes __str__ give placeholder for an object inside of itself, like
+    reprlib.recursive_repr. Copies share their value, so it's what's checked
+    """
+    def decorator(method: Callable[[Object], str]) -> Callable[[Object], str]:
+        showing = set()
+
+        @wraps(method)
+        def wrapper(self: Object) -> str:
+            key = (id(self.value), get_ident())
+            if key in showing:
+                return placeholder
+            showing.add(key)
+            try:
+                return method(self)
+            finally:
+                showing.discard(key)
+
+        return wrapper
+
+    return decorator
+
+
+class List(Object):
+    """Mutable sequence of cyan objects, copies share the same items"""
+    mutable = True
+
+    def __init__(self, value: Optional[list[Object]] = None):
+        super().__init__("List")
+        self.value: list[Object] = [] if value is None else value
+
+    @recursive_str("[...]")
+    def __str__(self) -> str:
+        return "[{}]".format(", ".join(map(repr_item, self.value)))
+
+    @staticmethod
+    def converter(obj: Object) -> RTResult:
+        items, error = obj.iterate()
+        if error is not None:
+            return RTResult().failure(
+                RTError(
+                    obj.start_pos,
+                    obj.end_pos,
+                    f"Cannot convert {obj.type_name} to List",
+                    obj.ctx,
+                )
+            )
+        try:
+            return RTResult().success(List(list(items)))
+        except SequenceError as error:
+            return RTResult().failure(error.error)
+
+    def is_truthy(self) -> Bool:
+        return Bool(self.value)
+
+    def equals(self, other: Object) -> bool:
+        return (
+            type(other) is List
+            and len(self.value) == len(other.value)
+            and all(a.equals(b) for a, b in zip(self.value, other.value))
+        )
+
+    # arithmetic operations
+    def operate_plus(self, other: List):
+        if self.is_same_type(other):
+            return List(self.value + other.value).set_context(self.ctx), None
+        else:
+            return Object.operate_plus(self, other)
+
+    # boolean operations
+    def compare_eq(self, other: List):
+        if self.is_same_type(other):
+            return Bool(self.equals(other)).set_context(self.ctx), None
+        else:
+            return Object.compare_eq(self, other)
+
+    def compare_ne(self, other: List):
+        if self.is_same_type(other):
+            return Bool(not self.equals(other)).set_context(self.ctx), None
+        else:
+            return Object.compare_ne(self, other)
+
+    # indexing
+    def get_index(self, index: Object):
+        idx, error = index_value(self, index)
+        if error is not None:
+            return None, error
+        return self.value[idx].copy(), None
+
+    def get_slice(self, start: Optional[Object], end: Optional[Object]):
+        bounds, error = slice_bounds(start, end)
+        if error is not None:
+            return None, error
+        return List(self.value[bounds]).set_context(self.ctx), None
+
+    def iterate(self):
+        return iter(self.value), None
+
+
+class Map(Object):
+    """
+    Mutable mapping of keys to values, copies share the same entries.
+    Keys are looked up by their hash_key, so equal keys are the same key
+    """
+    mutable = True
+
+    def __init__(self, value: Optional[dict[tuple, tuple[Object, Object]]] = None):
+        super().__init__("Map")
+        # hash key -> (key, value)
+        self.value: dict[tuple, tuple[Object, Object]] = {} if value is None else value
+
+    @recursive_str("{...}")
+    def __str__(self) -> str:
+        return "{{{}}}".format(
+            ", ".join(
+                f"{repr_item(key)}: {repr_item(value)}"
+                for key, value in self.value.values()
+            )
+        )
+
+    @staticmethod
+    def converter(obj: Object) -> RTResult:
+        if isinstance(obj, Map):
+            return RTResult().success(Map(dict(obj.value)))
+        return RTResult().failure(
+            RTError(
+                obj.start_pos,
+                obj.end_pos,
+                f"Cannot convert {obj.type_name} to Map",
+                obj.ctx,
+            )
+        )
+
+    def is_truthy(self) -> Bool:
+        return Bool(self.value)
+
+    def equals(self, other: Object) -> bool:
+        if type(other) is not Map or len(self.value) != len(other.value):
+            return False
+        for key, (_, value) in self.value.items():
+            entry = other.value.get(key)
+            if entry is None or not value.equals(entry[1]):
+                return False
+        return True
+
+    def key_of(self, key: Object) -> tuple[tuple, None] | OperationError:
+        hash_key = key.hash_key()
+        if hash_key is None:
+            return None, RTError(
+                key.start_pos,
+                key.end_pos,
+                f"{self.type_name} keys must be Number, String, Bool or none, "
+                f"not {key.type_name}",
+                key.ctx,
+            )
+        return hash_key, None
+
+    def entries(self) -> Iterable[tuple[Object, Object]]:
+        """(key, value) of every entry"""
+        return self.value.values()
+
+    def get(self, key: Object) -> tuple[Optional[Object], None] | OperationError:
+        """Value of key, None if key is not in the map"""
+        hash_key, error = self.key_of(key)
+        if error is not None:
+            return None, error
+        entry = self.value.get(hash_key)
+        return (None if entry is None else entry[1]), None
+
+    def set(self, key: Object, value: Object) -> Optional[RTError]:
+        hash_key, error = self.key_of(key)
+        if error is not None:
+            return error
+        entry = self.value.get(hash_key)
+        # an equal key that is already there is kept, like dict does
+        self.value[hash_key] = (key if entry is None else entry[0], value)
+        return None
+
+    # boolean operations
+    def compare_eq(self, other: Map):
+        if self.is_same_type(other):
+            return Bool(self.equals(other)).set_context(self.ctx), None
+        else:
+            return Object.compare_eq(self, other)
+
+    def compare_ne(self, other: Map):
+        if self.is_same_type(other):
+            return Bool(not self.equals(other)).set_context(self.ctx), None
+        else:
+            return Object.compare_ne(self, other)
+
+    # indexing
+    def get_index(self, index: Object):
+        value, error = self.get(index)
+        if error is not None:
+            return None, error
+        if value is None:
+            return None, RTError(
+                index.start_pos,
+                index.end_pos,
+                f"Key {repr_item(index)} not in {self.type_name}",
+                index.ctx,
+            )
+        return value.copy(), None
+
+    def iterate(self):
+        # the keys it has now, adding keys while going through them is fine
+        return iter([key for key, _ in self.entries()]), None
+
+
+class PVector(Object):
+    """
+    Persistent sequence of cyan objects. It never changes, assoc and conj
+    give a new PVector sharing most of its storage with the old one.
+    It is only mutable if it holds mutable objects
+    """
+
+    def __init__(self, value: Optional[PersistentVector] = None, mutable: bool = False):
+        super().__init__("PVector")
+        self.value: PersistentVector = PersistentVector() if value is None else value
+        self.mutable = mutable
+
+    def copy(self) -> ObjectSelf:
+        copy = PVector(self.value, self.mutable)
+        copy.set_pos(self.start_pos, self.end_pos)
+        copy.set_context(self.ctx)
+        return copy
+
+    def __str__(self) -> str:
+        return "PVector[{}]".format(", ".join(map(repr_item, self.value)))
+
+    @staticmethod
+    def converter(obj: Object) -> RTResult:
+        if isinstance(obj, PVector):
+            return RTResult().success(obj.copy())
+        if isinstance(obj, List):
+            items = [item.copy() for item in obj.value]
+            value = PersistentVector.from_iterable(items)
+            return RTResult().success(
+                PVector(value, any(item.mutable for item in items))
+            )
+        return RTResult().failure(
+            RTError(
+                obj.start_pos,
+                obj.end_pos,
+                f"Cannot convert {obj.type_name} to PVector",
+                obj.ctx,
+            )
+        )
+
+    def is_truthy(self) -> Bool:
+        return Bool(len(self.value))
+
+    def equals(self, other: Object) -> bool:
+        return (
+            type(other) is PVector
+            and len(self.value) == len(other.value)
+            and all(a.equals(b) for a, b in zip(self.value, other.value))
+        )
+
+    def conj(self, item: Object) -> PVector:
+        """New version with item appended"""
+        mutable = self.mutable or item.mutable
+        return PVector(self.value.append(item), mutable).set_context(self.ctx)
+
+    def assoc(self, index: Object, item: Object) -> OperationResult | OperationError:
+        """New version with item at index, appended if index is the length"""
+        if isinstance(index, Number) and index.value == len(self.value):
+            return self.conj(item), None
+        idx, error = index_value(self, index)
+        if error is not None:
+            return None, error
+        value = self.value.set(idx % len(self.value), item)
+        mutable = self.mutable or item.mutable
+        return PVector(value, mutable).set_context(self.ctx), None
+
+    # boolean operations
+    def compare_eq(self, other: PVector):
+        if self.is_same_type(other):
+            return Bool(self.equals(other)).set_context(self.ctx), None
+        else:
+            return Object.compare_eq(self, other)
+
+    def compare_ne(self, other: PVector):
+        if self.is_same_type(other):
+            return Bool(not self.equals(other)).set_context(self.ctx), None
+        else:
+            return Object.compare_ne(self, other)
+
+    # indexing
+    def get_index(self, index: Object):
+        idx, error = index_value(self, index)
+        if error is not None:
+            return None, error
+        return self.value[idx % len(self.value)].copy(), None
+
+    def get_slice(self, start: Optional[Object], end: Optional[Object]):
+        bounds, error = slice_bounds(start, end)
+        if error is not None:
+            return None, error
+        items = self.value.items_between(*bounds.indices(len(self.value))[:2])
+        value = PersistentVector.from_iterable(items)
+        return PVector(value, self.mutable).set_context(self.ctx), None
+
+    def iterate(self):
+        return iter(self.value), None
+
+
+class PMap(Object):
+    """
+    Persistent mapping of keys to values, keys work like in a Map. It never
+    changes, assoc and dissoc give a new PMap sharing most of its storage
+    with the old one. It is only mutable if it holds mutable objects
+    """
+
+    def __init__(
+        self, value: Optional[PersistentHashMap] = None, mutable: bool = False
+    ):
+        super().__init__("PMap")
+        # hash key -> (key, value)
+        self.value: PersistentHashMap = PersistentHashMap() if value is None else value
+        self.mutable = mutable
+
+    def copy(self) -> ObjectSelf:
+        copy = PMap(self.value, self.mutable)
+        copy.set_pos(self.start_pos, self.end_pos)
+        copy.set_context(self.ctx)
+        return copy
+
+    def __str__(self) -> str:
+        return "PMap{{{}}}".format(
+            ", ".join(
+                f"{repr_item(key)}: {repr_item(value)}"
+                for _, (key, value) in self.value
+            )
+        )
+
+    @staticmethod
+    def converter(obj: Object) -> RTResult:
+        if isinstance(obj, PMap):
+            return RTResult().success(obj.copy())
+        if isinstance(obj, Map):
+            entries = [
+                (hash_key, (key.copy(), value.copy()))
+                for hash_key, (key, value) in obj.value.items()
+            ]
+            mutable = any(value.mutable for _, (_, value) in entries)
+            return RTResult().success(
+                PMap(PersistentHashMap.from_items(entries), mutable)
+            )
+        return RTResult().failure(
+            RTError(
+                obj.start_pos,
+                obj.end_pos,
+                f"Cannot convert {obj.type_name} to PMap",
+                obj.ctx,
+            )
+        )
+
+    def is_truthy(self) -> Bool:
+        return Bool(len(self.value))
+
+    def equals(self, other: Object) -> bool:
+        if type(other) is not PMap or len(self.value) != len(other.value):
+            return False
+        for hash_key, (_, value) in self.value:
+            entry = other.value.get(hash_key)
+            if entry is None or not value.equals(entry[1]):
+                return False
+        return True
+
+    key_of = Map.key_of
+
+    def entries(self) -> Iterator[tuple[Object, Object]]:
+        """(key, value) of every entry"""
+        return (entry for _, entry in self.value)
+
+    def get(self, key: Object) -> tuple[Optional[Object], None] | OperationError:
+        """Value of key, None if key is not in the map"""
+        hash_key, error = self.key_of(key)
+        if error is not None:
+            return None, error
+        entry = self.value.get(hash_key)
+        return (None if entry is None else entry[1]), None
+
+    def assoc(self, key: Object, value: Object) -> OperationResult | OperationError:
+        """New version with key set to value"""
+        hash_key, error = self.key_of(key)
+        if error is not None:
+            return None, error
+        entry = self.value.get(hash_key)
+        key = key if entry is None else entry[0]  # kept like Map.set does
+        mutable = self.mutable or value.mutable
+        value = self.value.assoc(hash_key, (key, value))
+        return PMap(value, mutable).set_context(self.ctx), None
+
+    def dissoc(self, key: Object) -> OperationResult | OperationError:
+        """New version without key"""
+        hash_key, error = self.key_of(key)
+        if error is not None:
+            return None, error
+        value = self.value.dissoc(hash_key)
+        return PMap(value, self.mutable).set_context(self.ctx), None
+
+    # boolean operations
+    def compare_eq(self, other: PMap):
+        if self.is_same_type(other):
+            return Bool(self.equals(other)).set_context(self.ctx), None
+        else:
+            return Object.compare_eq(self, other)
+
+    def compare_ne(self, other: PMap):
+        if self.is_same_type(other):
+            return Bool(not self.equals(other)).set_context(self.ctx), None
+        else:
+            return Object.compare_ne(self, other)
+
+    # indexing
+    get_index = Map.get_index
+
+    def iterate(self):
+        return (key for key, _ in self.entries()), None
+
+
+class Sequence(Object):
+    """
+    Lazy sequence, each item is only made when it is taken. It can be gone
+    through once, copies share the position in it
+    """
+    mutable = True
+
+    def __init__(self, value: Iterator[Object]):
+        super().__init__("Sequence")
+        # raises SequenceError if making the next item fails
+        self.value = value
+
+    def __str__(self) -> str:
+        return "<Sequence>"
+
+    def iterate(self):
+        return self.value, None
+
+
+class Record(Object):
+    """
+    Value of a struct, its fields are kept in a tuple in the order they
+    were declared. It never changes, so it's only mutable if it holds
+    mutable objects
+    """
+    def __init__(self, struct_type: StructType, value: tuple[Object, ...]):
+        super().__init__(struct_type.name)
+        self.struct_type = struct_type
+        self.value = value
+        self.mutable = any(item.mutable for item in value)
+
+    def __str__(self) -> str:
+        return "{}({})".format(
+            self.type_name,
+            ", ".join(
+                f"{name}={repr_item(item)}"
+                for name, item in zip(self.struct_type.fields, self.value)
+            ),
+        )
+
+    def copy(self) -> ObjectSelf:
+        # shares the fields, they never change
+        copy = object.__new__(Record)
+        vars(copy).update(vars(self))
+        return copy
+
+    def equals(self, other: Object) -> bool:
+        return (
+            type(other) is Record
+            and self.struct_type is other.struct_type
+            and all(a.equals(b) for a, b in zip(self.value, other.value))
+        )
+
+    def get_field(self, name: str, index: Optional[int] = None):
+        fields = self.struct_type.fields
+        if index is None or index >= len(fields) or fields[index] != name:
+            index = self.struct_type.slots.get(name)
+            if index is None:
+                return None, RTError(
+                    self.start_pos,
+                    self.end_pos,
+                    f"{self.type_name} has no field '{name}'",
+                    self.ctx,
+                )
+        return self.value[index].copy(), None
+
+    # boolean operations
+    def compare_eq(self, other: Record):
+        if self.is_same_type(other):
+            return Bool(self.equals(other)).set_context(self.ctx), None
+        else:
+            return Object.compare_eq(self, other)
+
+    def compare_ne(self, other: Record):
+        if self.is_same_type(other):
+            return Bool(not self.equals(other)).set_context(self.ctx), None
+        else:
+            return Object.compare_ne(self, other)
+
+
+def repr_item(obj: Object) -> str:
+    """How obj is shown inside of a collection"""
+    return repr(obj) if isinstance(obj, String) else str(obj)
+
+
+def index_value(
+    obj: Object, index: Object, length: Optional[int] = None
+) -> tuple[int, None] | OperationError:
+    """
+    Index into obj.value that index stands for, negatives count from the
+    end. length is the length of obj if it isn't len(obj.value)
+    """
+    if not (isinstance(index, Number) and type(index.value) is int):
+        return None, RTError(
+            index.start_pos,
+            index.end_pos,
+            f"Indexes must be integers, not {index.type_name}",
+            index.ctx,
+        )
+    idx = index.value
+    if length is None:
+        length = len(obj.value)
+    if not -length <= idx < length:
+        return None, RTError(
+            index.start_pos,
+            index.end_pos,
+            f"{obj.type_name} index {idx} out of range",
+            index.ctx,
+        )
+    return idx, None
+
+
+def slice_bounds(
+    start: Optional[Object], end: Optional[Object]
+) -> tuple[slice, None] | OperationError:
+    bounds = []
+    for bound in (start, end):
+        if bound is None:
+            bounds.append(None)
+        elif isinstance(bound, Number) and type(bound.value) is int:
+            bounds.append(bound.value)
+        else:
+            return None, RTError(
+                bound.start_pos,
+                bound.end_pos,
+                f"Slice bounds must be integers, not {bound.type_name}",
+                bound.ctx,
+            )
+    return slice(*bounds), None
+
+
+@dataclass(slots=True, frozen=True)
+class CallSignature:
+    """Arity and scope info of a callable, computed once when it is defined"""
+    n_params: int
+    variadic: bool = False
+    param_names: tuple[str, ...] = ()
+    # for generators, ids of the nodes of the body with a yield in them
+    yielding: Optional[frozenset[int]] = None
+    # last parameters that can be left out, they have default values
+    n_optional: int = 0
+
+    def accepts(self, n_args: int) -> bool:
+        return (
+            n_args == self.n_params
+            or self.variadic
+            or self.n_params - self.n_optional <= n_args < self.n_params
+        )
+
+    def arity(self) -> str:
+        """How many arguments it takes, for errors"""
+        if self.n_optional:
+            return f"{self.n_params - self.n_optional} to {self.n_params}"
+        return str(self.n_params)
+
 
 class Function(Object):
     """User-defined cyan function"""
-    def __init__(self, name: str, parameters: list[Token], body: Node):
+    def __init__(
+        self,
+        name: str,
+        parameters: list[Token],
+        body: Node,
+        signature: Optional[CallSignature] = None,
+        memo: Optional[MemoCache] = None,
+    ):
         super().__init__("Function")
         self.name = name
         self.params = parameters
-        self.n_params = len(parameters)  # can be inf
+        self.n_params = len(parameters)
         self.body = body
+        if signature is None:
+            signature = CallSignature(
+                self.n_params, param_names=tuple(param.value for param in parameters)
+            )
+        self.signature = signature
+        self.memo = memo  # cache of results, if the function is memoized
 
     def __str__(self) -> str:
         return f"<Function {self.name}>"
 
+    def equals(self, other: Object) -> bool:
+        return (
+            type(other) is Function
+            and self.body is other.body
+            and self.ctx is other.ctx
+        )
+
     def copy(self) -> ObjectSelf:
         return (
-            Function(self.name, self.params, self.body)
+            Function(self.name, self.params, self.body, self.signature, self.memo)
             .set_context(self.ctx)
             .set_pos(self.start_pos, self.end_pos)
         )
@@ -408,24 +1204,89 @@ class BuiltInFunction(Object):
         name: str,
         function: Callable[[Object | tuple[Object]], RTResult],
         n_params: int,
+        pure: bool = False,
+        signature: Optional[CallSignature] = None,
+        takes_interpreter: bool = False,
     ):
         super().__init__("BuiltInFunction")
         self.name = name
         self.function = function  # a function that has to return RTResult object
         self.n_params = n_params  # can be inf
+        self.pure = pure  # no side effects, same arguments give the same result
+        # given the interpreter before the arguments, to call functions with it
+        self.takes_interpreter = takes_interpreter
+        if signature is None:
+            variadic = n_params == float("inf")
+            signature = CallSignature(0 if variadic else n_params, variadic)
+        self.signature = signature
 
     def __str__(self) -> str:
         return f"<Built-in Function {self.name}>"
 
+    def equals(self, other: Object) -> bool:
+        return type(other) is BuiltInFunction and self.function is other.function
+
     def copy(self) -> ObjectSelf:
         return (
-            BuiltInFunction(self.name, self.function, self.n_params)
+            BuiltInFunction(
+                self.name,
+                self.function,
+                self.n_params,
+                self.pure,
+                self.signature,
+                self.takes_interpreter,
+            )
             .set_context(self.ctx)
             .set_pos(self.start_pos, self.end_pos)
         )
 
 
-@dataclass(slots=True, frozen=True)
+@dataclass(slots=True, frozen=True, eq=False)
+class StructType:
+    """Name and fields of a struct declaration, shared by all of its Records"""
+    name: str
+    fields: tuple[str, ...]
+    slots: dict[str, int]  # field name -> index of its value in a Record
+
+
+class Struct(BuiltInFunction):
+    """Declared struct, called with the value of each field to make a Record"""
+    def __init__(
+        self, struct_type: StructType, signature: Optional[CallSignature] = None
+    ):
+        super().__init__(
+            struct_type.name,
+            self.construct,
+            len(struct_type.fields),
+            pure=True,
+            signature=signature,
+        )
+        self.type_name = "Struct"
+        self.struct_type = struct_type
+
+    @classmethod
+    def declare(cls, name: str, fields: tuple[str, ...]) -> Struct:
+        slots = {field: idx for idx, field in enumerate(fields)}
+        return cls(StructType(name, fields, slots))
+
+    def __str__(self) -> str:
+        return f"<Struct {self.name}>"
+
+    def construct(self, *values: Object) -> RTResult:
+        return RTResult().success(Record(self.struct_type, values))
+
+    def equals(self, other: Object) -> bool:
+        return type(other) is Struct and self.struct_type is other.struct_type
+
+    def copy(self) -> ObjectSelf:
+        return (
+            Struct(self.struct_type, self.signature)
+            .set_context(self.ctx)
+            .set_pos(self.start_pos, self.end_pos)
+        )
+
+
+@dataclass(slots=True)
 class Context:
     """Stores info about different scopes in cyan code"""
     name: str
@@ -436,11 +1297,12 @@ class Context:
 
 class SymbolMap:
     """Stores values of identifiers in cyan code"""
-    __slots__ = ("symbol_map", "parent")
+    __slots__ = ("symbol_map", "parent", "version")
 
     def __init__(self, parent=None):
         self.symbol_map: dict[str, Any] = {}
         self.parent = parent
+        self.version = 0  # bumped on every change, see InlineCache
 
     def get(self, name: str):
         value = self.symbol_map.get(name, None)
@@ -449,10 +1311,60 @@ class SymbolMap:
         else:
             return value
 
+    def lookup(self, name: str, cache: InlineCache):
+        """
+        get, but lookups that go past this scope are remembered in cache
+        and reused for as long as none of the scopes walked has changed
+        """
+        value = self.symbol_map.get(name, None)
+        if value is not None or self.parent is None:
+            return value
+
+        guards, value = cache.entry
+        if guards and guards[0][0] is self.parent:
+            for scope, version in guards:
+                if scope.version != version:
+                    break
+            else:
+                return value
+
+        guards = []
+        scope = self.parent
+        while scope is not None:
+            guards.append((scope, scope.version))
+            value = scope.symbol_map.get(name, None)
+            if value is not None:
+                # set at once, a thread reading it never sees half of it
+                cache.entry = (tuple(guards), value)
+                return value
+            scope = scope.parent
+
+        return None
+
     def set(self, name: str, value) -> None:
         """set value of an identifier"""
         self.symbol_map[name] = value
+        self.version += 1
 
     def remove(self, name: str) -> None:
         """delete an identifers value"""
         del self.symbol_map[name]
+        self.version += 1
+
+    def clear(self) -> None:
+        """delete all identifiers of this scope, parents are left untouched"""
+        self.symbol_map.clear()
+        self.version += 1
+
+
+class InlineCache:
+    """
+    Result of a non-local name lookup, kept at the site of the lookup.
+    entry is (guards, value), guards holds (scope, version) for each scope
+    walked, from the parent of the scope the lookup started in up to the one
+    the name was found in. A Program run by many threads shares it
+    """
+    __slots__ = ("entry",)
+
+    def __init__(self):
+        self.entry: tuple[tuple[tuple[SymbolMap, int], ...], Any] = ((), None)
@@ -1,7 +1,9 @@
 """Utilities.
 
 Pos or position class, pos_highlight function and Printer"""
+import atexit
 import sys
+import threading
 from dataclasses import dataclass
 
 __all__ = ("Pos", "pos_highlight", "Printer")
@@ -78,12 +80,23 @@ class _CLR:
 class Printer:
     """
     Manager for printing stuff.
-    Indicates different types of prints with different console colors
+    Indicates different types of prints with different console colors.
+    Output of cyan code is kept in a buffer and written when it has
+    buffer_size characters, before reading input and at exit. Lines written
+    by programs running in different threads are never mixed up
     """
     __slots__ = ()
+    # None until the first output, then 0 (no buffer) if stdout is a terminal
+    buffer_size = None
+    default_buffer_size = 64 * 1024
+    _pending: list[str] = []
+    _pending_size = 0
+    # programs can run in many threads, see cyan.program.Session
+    _lock = threading.Lock()
 
     @staticmethod
     def debug(*values) -> None:
+        Printer.flush()
         print(end=_CLR.DEBUG_CLR)
         print(*values)
         print(end=_CLR.RESET)
@@ -91,16 +104,37 @@ class Printer:
     @staticmethod
     def error(*values) -> None:
         """Internal Error"""
+        Printer.flush()
         print(end=_CLR.ERROR_CLR)
         print(*values)
         print(end=_CLR.RESET)
 
-    @staticmethod
-    def output(text, end="") -> None:
-        sys.stdout.write(text + end)
+    @classmethod
+    def output(cls, text, end="") -> None:
+        if cls.buffer_size is None:
+            cls.buffer_size = 0 if sys.stdout.isatty() else cls.default_buffer_size
+        with cls._lock:
+            cls._pending.append(text + end)
+            cls._pending_size += len(text) + len(end)
+            full = cls._pending_size >= cls.buffer_size
+        if full:
+            cls.flush()
+
+    @classmethod
+    def flush(cls) -> None:
+        with cls._lock:
+            if cls._pending:
+                sys.stdout.write("".join(cls._pending))
+                cls._pending.clear()
+                cls._pending_size = 0
+            sys.stdout.flush()
 
     @staticmethod
     def time(title):
+        Printer.flush()
         print(end=_CLR.TIME_CLR)
         print(title)
         print(end=_CLR.RESET)
+
+
+atexit.register(Printer.flush)
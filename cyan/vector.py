@@ -0,0 +1,529 @@
+"""Vector, an array of numbers whose operations work on all elements at once"""
+from __future__ import annotations
+
+import math
+import operator
+from array import array
+from functools import partial
+from itertools import repeat
+from typing import TYPE_CHECKING
+
+from cyan.buffers import Buffer
+from cyan.exceptions import RTError, SequenceError
+from cyan.types import (
+    Object,
+    Number,
+    Bool,
+    List,
+    Sequence,
+    RTResult,
+    index_value,
+    slice_bounds,
+)
+
+try:
+    import numpy
+except ImportError:  # optional, vectors are stored in an array.array without it
+    numpy = None
+
+if TYPE_CHECKING:
+    from typing import Optional
+
+__all__ = (
+    "Vector",
+    "builtin_vrange",
+    "builtin_sum",
+    "builtin_min",
+    "builtin_max",
+    "builtin_mean",
+    "builtin_dot",
+)
+
+# kinds of vectors, typecodes of array.array
+INT = "q"
+FLOAT = "d"
+
+# integers of a Vector are 64 bits, like the elements of its storage
+INT_MAX = 2**63 - 1
+
+# Object method -> function of the values, for numbers and arrays alike
+ELEMENTWISE_OPERATIONS = {
+    "operate_plus": operator.add,
+    "operate_minus": operator.sub,
+    "operate_mul": operator.mul,
+    "operate_div": operator.truediv,
+    "operate_pow": operator.pow,
+    "compare_eq": operator.eq,
+    "compare_ne": operator.ne,
+    "compare_gt": operator.gt,
+    "compare_lt": operator.lt,
+    "compare_gte": operator.ge,
+    "compare_lte": operator.le,
+}
+
+
+def make_storage(values, kind: str):
+    """Contiguous storage of values, a numpy array if numpy is installed"""
+    if numpy is not None:
+        return numpy.array(values, dtype=numpy.int64 if kind == INT else numpy.float64)
+    return array(kind, values)
+
+
+def storage_kind(data) -> str:
+    if numpy is not None:
+        return INT if data.dtype.kind in "iub" else FLOAT
+    return data.typecode
+
+
+def result_kind(method: str, left_kind: str, right_kind: str, right) -> str:
+    if method.startswith("compare_"):
+        return INT  # 1 where the comparison is true, 0 where it isn't
+    if method == "operate_div":
+        return FLOAT
+    if left_kind == FLOAT or right_kind == FLOAT:
+        return FLOAT
+    if method == "operate_pow" and (
+        right < 0 if isinstance(right, int) else has_negative(right)
+    ):
+        return FLOAT
+    return INT
+
+
+def has_negative(data) -> bool:
+    if numpy is not None:
+        return bool((data < 0).any())
+    return any(value < 0 for value in data)
+
+
+def apply(function, left, right, kind: str):
+    """
+    function applied to each pair of elements, numbers are broadcast.
+    OverflowError if an integer doesn't fit in 64 bits, ZeroDivisionError
+    for a division by zero. Both storages fail or give nan and inf where
+    Python floats do
+    """
+    if numpy is not None:
+        if kind == FLOAT and function is operator.pow:
+            # numpy refuses negative powers of integers
+            left = numpy.asarray(left, dtype=numpy.float64)
+        if function is operator.truediv and numpy.any(right == 0):
+            raise ZeroDivisionError("division by zero")
+        with numpy.errstate(all="ignore"):
+            result = function(left, right)
+        if result.dtype.kind == "b":
+            return result.astype(numpy.int64)
+        if kind == INT:
+            check_overflow(function, left, right)
+        elif function is operator.pow:
+            check_float_pow(left, right, result)
+        return result
+
+    if isinstance(left, array) and isinstance(right, array):
+        values = map(function, left, right)
+    elif isinstance(left, array):
+        values = map(function, left, repeat(right))
+    else:
+        values = map(function, repeat(left), right)
+    return array(kind, values)
+
+
+def check_float_pow(left, right, result) -> None:
+    """
+    Raises what ** of Python floats does, where numpy gave inf or nan for
+    finite numbers: OverflowError, ZeroDivisionError for 0 to a negative
+    power, TypeError for a negative number to a fraction, which is complex
+    """
+    with numpy.errstate(all="ignore"):
+        failed = ~numpy.isfinite(result) & numpy.isfinite(left) & numpy.isfinite(right)
+    if not failed.any():
+        return
+    idx = int(failed.argmax())
+    base = left[idx] if numpy.ndim(left) else left
+    exponent = right[idx] if numpy.ndim(right) else right
+    if isinstance(float(base) ** float(exponent), complex):
+        raise TypeError("must be real number, not complex")
+
+
+def check_overflow(function, left, right) -> None:
+    """
+    OverflowError if function of integer numpy storage wrapped around.
+    Where the result computed with floats is near the limit, it's computed
+    again with Python integers, which never wrap
+    """
+    estimate = function(
+        numpy.asarray(left, dtype=numpy.float64),
+        numpy.asarray(right, dtype=numpy.float64),
+    )
+    if not len(estimate) or numpy.abs(estimate).max() < 2.0**62:
+        return
+    exact = function(numpy.asarray(left, dtype=object), right)
+    if any(not -INT_MAX - 1 <= value <= INT_MAX for value in exact):
+        raise OverflowError("Integer too large for a Vector")
+
+
+def int_bound(data) -> int:
+    """Largest absolute value of integer numpy storage"""
+    return max(-int(data.min()), int(data.max())) if len(data) else 0
+
+
+class Vector(Object):
+    """
+    Fixed array of integers or of floats. Operations with another Vector or
+    a Number are done on every element, without visiting a node for each
+    one. Vectors never change once made, so copies can share the storage
+    """
+
+    def __init__(self, value):
+        super().__init__("Vector")
+        self.value = value  # numpy.ndarray or array.array
+
+    def __str__(self) -> str:
+        return "Vector[{}]".format(", ".join(map(str, self.value.tolist())))
+
+    @staticmethod
+    def converter(obj: Object) -> RTResult:
+        if isinstance(obj, Vector):
+            return RTResult().success(Vector(obj.value))
+        if isinstance(obj, Buffer):
+            # copied, so the Vector doesn't change with the memory of the Buffer
+            kind = FLOAT if obj.value.format in "efd" else INT
+            return RTResult().success(Vector(make_storage(obj.value, kind)))
+
+        if not isinstance(obj, List):
+            return RTResult().failure(
+                RTError(
+                    obj.start_pos,
+                    obj.end_pos,
+                    f"Cannot convert {obj.type_name} to Vector",
+                    obj.ctx,
+                )
+            )
+
+        values = []
+        kind = INT
+        for item in obj.value:
+            if not isinstance(item, Number):
+                return RTResult().failure(
+                    RTError(
+                        obj.start_pos,
+                        obj.end_pos,
+                        f"Vectors can only hold Numbers, not {item.type_name}",
+                        obj.ctx,
+                    )
+                )
+            if type(item.value) is not int:
+                kind = FLOAT
+            values.append(item.value)
+
+        try:
+            return RTResult().success(Vector(make_storage(values, kind)))
+        except OverflowError:
+            return RTResult().failure(
+                RTError(
+                    obj.start_pos,
+                    obj.end_pos,
+                    "Integer too large for a Vector",
+                    obj.ctx,
+                )
+            )
+
+    @property
+    def kind(self) -> str:
+        return storage_kind(self.value)
+
+    def is_truthy(self) -> Bool:
+        return Bool(len(self.value))
+
+    def equals(self, other: Object) -> bool:
+        return type(other) is Vector and self.value.tolist() == other.value.tolist()
+
+    def elementwise(self, method: str, other: Object, reflected: bool = False):
+        """Does the operation of method with other on every element"""
+        if isinstance(other, Vector):
+            if len(other.value) != len(self.value):
+                return None, RTError(
+                    other.start_pos,
+                    other.end_pos,
+                    "Vector lengths don't match: "
+                    f"{len(self.value)} and {len(other.value)}",
+                    self.ctx,
+                )
+            right, right_kind = other.value, other.kind
+        elif isinstance(other, Number):
+            right = other.value
+            right_kind = INT if type(right) is int else FLOAT
+        else:
+            return getattr(Object, method)(self, other)
+
+        left, left_kind = self.value, self.kind
+        if reflected:
+            left, left_kind, right, right_kind = right, right_kind, left, left_kind
+
+        kind = result_kind(method, left_kind, right_kind, right)
+        try:
+            data = apply(ELEMENTWISE_OPERATIONS[method], left, right, kind)
+        except ZeroDivisionError:
+            return None, RTError(
+                other.start_pos, other.end_pos, "Division by Zero", self.ctx
+            )
+        except OverflowError:
+            number = "Integer" if kind == INT else "Number"
+            return None, RTError(
+                self.start_pos, self.end_pos, f"{number} too large for a Vector", self.ctx
+            )
+        except (ArithmeticError, TypeError, ValueError) as error:
+            return None, RTError(
+                self.start_pos, self.end_pos, f"Math error in Vector: {error}", self.ctx
+            )
+
+        return Vector(data).set_context(self.ctx), None
+
+    # arithmetic operations
+    def operate_plus(self, other: Object):
+        return self.elementwise("operate_plus", other)
+
+    def operate_minus(self, other: Object):
+        return self.elementwise("operate_minus", other)
+
+    def operate_mul(self, other: Object):
+        return self.elementwise("operate_mul", other)
+
+    def operate_div(self, other: Object):
+        return self.elementwise("operate_div", other)
+
+    def operate_pow(self, other: Object):
+        return self.elementwise("operate_pow", other)
+
+    # boolean operations
+    def compare_eq(self, other: Object):
+        return self.elementwise("compare_eq", other)
+
+    def compare_ne(self, other: Object):
+        return self.elementwise("compare_ne", other)
+
+    def compare_gt(self, other: Object):
+        return self.elementwise("compare_gt", other)
+
+    def compare_lt(self, other: Object):
+        return self.elementwise("compare_lt", other)
+
+    def compare_gte(self, other: Object):
+        return self.elementwise("compare_gte", other)
+
+    def compare_lte(self, other: Object):
+        return self.elementwise("compare_lte", other)
+
+    # operations with a Number on the left, see Object.reflect
+    def reflected_operate_plus(self, other: Number):
+        return self.elementwise("operate_plus", other, True)
+
+    def reflected_operate_minus(self, other: Number):
+        return self.elementwise("operate_minus", other, True)
+
+    def reflected_operate_mul(self, other: Number):
+        return self.elementwise("operate_mul", other, True)
+
+    def reflected_operate_div(self, other: Number):
+        return self.elementwise("operate_div", other, True)
+
+    def reflected_operate_pow(self, other: Number):
+        return self.elementwise("operate_pow", other, True)
+
+    def reflected_compare_eq(self, other: Number):
+        return self.elementwise("compare_eq", other, True)
+
+    def reflected_compare_ne(self, other: Number):
+        return self.elementwise("compare_ne", other, True)
+
+    def reflected_compare_gt(self, other: Number):
+        return self.elementwise("compare_gt", other, True)
+
+    def reflected_compare_lt(self, other: Number):
+        return self.elementwise("compare_lt", other, True)
+
+    def reflected_compare_gte(self, other: Number):
+        return self.elementwise("compare_gte", other, True)
+
+    def reflected_compare_lte(self, other: Number):
+        return self.elementwise("compare_lte", other, True)
+
+    # indexing
+    def get_index(self, index: Object):
+        idx, error = index_value(self, index)
+        if error is not None:
+            return None, error
+        return Number(to_python(self.value[idx])).set_context(self.ctx), None
+
+    def get_slice(self, start: Optional[Object], end: Optional[Object]):
+        bounds, error = slice_bounds(start, end)
+        if error is not None:
+            return None, error
+        return Vector(self.value[bounds]).set_context(self.ctx), None
+
+    def iterate(self):
+        return (Number(to_python(number)) for number in self.value), None
+
+
+def to_python(number):
+    """int or float of an element of the storage of a Vector"""
+    return number.item() if numpy is not None else number
+
+
+def vector_data(obj: Object, name: str):
+    """
+    (storage, None) of a Vector or of a List made into one, else (None, error).
+    The items of a Buffer are read where they are, without copying them
+    """
+    if isinstance(obj, Vector):
+        return obj.value, None
+    if isinstance(obj, Buffer):
+        return (numpy.asarray(obj.value) if numpy is not None else obj.value), None
+    if isinstance(obj, List):
+        res = Vector.converter(obj)
+        if res.error:
+            return None, res.error
+        return res.value.value, None
+    return None, RTError(
+        obj.start_pos,
+        obj.end_pos,
+        f"{name}() takes a Vector, a List or a Buffer, not {obj.type_name}",
+        obj.ctx,
+    )
+
+
+def builtin_vrange(start: Object, end: Object):
+    for bound in (start, end):
+        if not (isinstance(bound, Number) and type(bound.value) is int):
+            return RTResult().failure(
+                RTError(
+                    bound.start_pos,
+                    bound.end_pos,
+                    f"Range bounds must be integers, got {bound}",
+                    bound.ctx,
+                )
+            )
+
+    if numpy is not None:
+        data = numpy.arange(start.value, end.value, dtype=numpy.int64)
+    else:
+        data = array(INT, range(start.value, end.value))
+    return RTResult().success(Vector(data))
+
+
+def builtin_sum(obj: Object):
+    if isinstance(obj, Sequence):
+        return sum_items(obj)
+    data, error = vector_data(obj, "sum")
+    if error is not None:
+        return RTResult().failure(error)
+    if numpy is None:
+        return RTResult().success(Number(sum(data)))
+    if data.dtype.kind not in "iub":
+        with numpy.errstate(all="ignore"):  # inf - inf is nan, like in Python
+            total = data.sum().item() if len(data) else 0
+        return RTResult().success(Number(total))
+    if int_bound(data) * len(data) > INT_MAX:
+        # it could wrap around in 64 bits, Python integers can't
+        return RTResult().success(Number(sum(data.tolist())))
+    # summed in 64 bits, not in the bits of the items of a Buffer
+    return RTResult().success(Number(data.sum(dtype=numpy.int64).item()))
+
+
+def sum_items(obj: Sequence):
+    """Sum of the items of a Sequence, taken one at a time"""
+    total = 0
+    try:
+        for item in obj.value:
+            if not isinstance(item, Number):
+                return RTResult().failure(
+                    RTError(
+                        obj.start_pos,
+                        obj.end_pos,
+                        f"sum() can only add Numbers, not {item.type_name}",
+                        obj.ctx,
+                    )
+                )
+            total += item.value
+    except SequenceError as error:
+        return RTResult().failure(error.error)
+    return RTResult().success(Number(total))
+
+
+def reduce_non_empty(obj: Object, name: str, function):
+    data, error = vector_data(obj, name)
+    if error is not None:
+        return RTResult().failure(error)
+    if not len(data):
+        return RTResult().failure(
+            RTError(obj.start_pos, obj.end_pos, f"{name}() of an empty Vector", obj.ctx)
+        )
+    return RTResult().success(Number(function(data)))
+
+
+def builtin_min(obj: Object):
+    if numpy is not None:
+        return reduce_non_empty(obj, "min", lambda data: data.min().item())
+    return reduce_non_empty(obj, "min", partial(nan_or, min))
+
+
+def builtin_max(obj: Object):
+    if numpy is not None:
+        return reduce_non_empty(obj, "max", lambda data: data.max().item())
+    return reduce_non_empty(obj, "max", partial(nan_or, max))
+
+
+def nan_or(function, data):
+    """function of data, nan if data holds nan, like numpy gives"""
+    kind = data.typecode if isinstance(data, array) else data.format  # of a Buffer
+    if kind in "efd" and any(map(math.isnan, data)):
+        return math.nan
+    return function(data)
+
+
+def builtin_mean(obj: Object):
+    if numpy is not None:
+        return reduce_non_empty(obj, "mean", numpy_mean)
+    return reduce_non_empty(obj, "mean", mean)
+
+
+def numpy_mean(data) -> float:
+    with numpy.errstate(all="ignore"):
+        return data.mean().item()
+
+
+def mean(data) -> float:
+    try:
+        return math.fsum(data) / len(data)
+    except (ValueError, OverflowError):
+        # inf and -inf, or a sum too large, nan or inf like with numpy
+        return sum(data) / len(data)
+
+
+def builtin_dot(a: Object, b: Object):
+    left, error = vector_data(a, "dot")
+    if error is None:
+        right, error = vector_data(b, "dot")
+    if error is not None:
+        return RTResult().failure(error)
+
+    if len(left) != len(right):
+        return RTResult().failure(
+            RTError(
+                b.start_pos,
+                b.end_pos,
+                f"Vector lengths don't match: {len(left)} and {len(right)}",
+                b.ctx,
+            )
+        )
+    if numpy is None:
+        return RTResult().success(Number(sum(map(operator.mul, left, right))))
+    if left.dtype.kind in "iub" and right.dtype.kind in "iub":
+        if int_bound(left) * int_bound(right) * len(left) > INT_MAX:
+            # it could wrap around in 64 bits, Python integers can't
+            products = map(operator.mul, left.tolist(), right.tolist())
+            return RTResult().success(Number(sum(products)))
+        # in 64 bits, not in the bits of the items of a Buffer
+        left = left.astype(numpy.int64, copy=False)
+        right = right.astype(numpy.int64, copy=False)
+    with numpy.errstate(all="ignore"):
+        return RTResult().success(Number(numpy.dot(left, right).item()))
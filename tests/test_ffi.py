@@ -0,0 +1,18 @@
+import io
+
+from cyan.ffi import native
+from cyan.program import Session, compile
+
+
+@native
+def boom(x: int):
+    raise ValueError("no")
+
+
+def test_native_failure_in_pipeline():
+    code = "for x in map(boom, [1, 2]) { out(x) }"
+    _, error = compile(code).run(Session(stdout=io.StringIO(), stdin=io.StringIO()))
+    assert error.info == "ValueError in boom(): no"
+    # the position of boom in the code
+    assert (error.start_pos.idx, error.end_pos.idx) == (13, 17)
+    assert "in boom" in repr(error)
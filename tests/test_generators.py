@@ -0,0 +1,32 @@
+import io
+
+from cyan.program import Session, compile
+
+
+def run(code):
+    """(output, error) of code run in a new Session"""
+    output = io.StringIO()
+    _, error = compile(code).run(Session(stdout=output, stdin=io.StringIO()))
+    return output.getvalue(), error
+
+
+def test_yield_statements():
+    output, error = run(
+        "fun g() {\n"
+        "    yield 1\n"
+        "    if true then { yield 2 } else { 0 }\n"
+        "    for i in 3..5 { yield i }\n"
+        "}\n"
+        "out(List(g()))"
+    )
+    assert error is None
+    assert output == "[1, 2, 3, 4]\n"
+
+
+def test_yield_inside_expression():
+    output, error = run(
+        "fun g() { out(if true then { yield 1 } else { 2 }) }\n"
+        "out(List(g()))"
+    )
+    assert output == ""
+    assert error.info == "yield is not allowed inside an expression"
@@ -0,0 +1,12 @@
+import io
+
+from cyan.program import Session, compile
+
+
+def test_inlined_calls_leave_no_names():
+    session = Session(stdout=io.StringIO(), stdin=io.StringIO())
+    code = "fun add(a, b) { a + b }\nlet x = add(1, 2)\nout(x)"
+    _, error = compile(code, opt_level=2).run(session)
+    assert error is None
+    assert session.get("x") == 3
+    assert set(session.symbols.symbol_map) == {"stdout", "stdin", "add", "x"}
@@ -0,0 +1,29 @@
+import io
+
+from cyan.program import Session, compile
+
+
+def write_jsonl(tmp_path, records):
+    """(text written, error) of writing records to a JSON lines file"""
+    path = tmp_path / "records.jsonl"
+    code = f'let f = open("{path}", "w")\nwrite_jsonl(f, {records})'
+    _, error = compile(code).run(Session(stdout=io.StringIO(), stdin=io.StringIO()))
+    return path.read_text(), error
+
+
+def test_keys_written_as_text(tmp_path):
+    text, error = write_jsonl(tmp_path, '[{1: 2, true: 3, none: 4, "a": [1.5]}]')
+    assert error is None
+    assert text == '{"1": 2, "true": 3, "null": 4, "a": [1.5]}\n'
+
+
+def test_keys_that_are_the_same_in_json(tmp_path):
+    _, error = write_jsonl(tmp_path, '[{1: "a", "1": "b"}]')
+    assert error.info == "Two keys of a Map are both '1' in JSON"
+
+
+def test_nan_and_infinity(tmp_path):
+    for records in ('[{"x": Num("nan")}]', '[[Num("inf")]]', '[{Num("inf"): 1}]'):
+        text, error = write_jsonl(tmp_path, records)
+        assert error.info == "Can't write NaN or Infinity as JSON"
+        assert text == ""
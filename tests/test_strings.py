@@ -0,0 +1,16 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from cyan.types import String
+
+
+def test_rope_shared_by_threads():
+    rope, _ = String("x" * 300).operate_plus(String("y" * 300))
+
+    def add(piece):
+        added, _ = rope.operate_plus(String(piece))
+        return added.value == "x" * 300 + "y" * 300 + piece
+
+    pieces = [str(i) * 10 for i in range(10)] * 200
+    with ThreadPoolExecutor(8) as pool:
+        assert all(pool.map(add, pieces))
+    assert rope.value == "x" * 300 + "y" * 300